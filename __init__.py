@@ -13,6 +13,7 @@
 
 # Blender Imports
 import bpy
+from bpy_extras.io_utils import ExportHelper
 
 # Resonitelink Imports
 from resonitelink.models.datamodel import *
@@ -22,15 +23,28 @@ from resonitelink import ResoniteLinkClient, ResoniteLinkWebsocketClient
 from resonitelink.exceptions import ResoniteLinkException
 
 # Other imports
+import os
 import logging
 import asyncio
 import threading
+import time
+import functools
 import traceback
-from collections.abc import Callable
+import numpy as np
+from collections.abc import Awaitable, Callable, Hashable
 from typing import Any
 
 # Add-on file imports
 from .interop import *
+from .send_scheduler import *
+from .command_batcher import *
+from .dirty_tracking import *
+from .live_sync import *
+from .scene_snapshot import *
+from .send_stats import *
+from .session_cleanup import *
+from .animation_data import *
+from .main_thread import *
 
 class ResoniteLinkController:
 
@@ -47,23 +61,37 @@ class ResoniteLinkController:
     @classmethod
     def ShutdownAll(cls):
         for controller in ResoniteLinkController.sceneToResoniteLinkController.values():
-            controller.shutdown = True
+            controller.requestShutdown()
 
     def __init__(self, scene : bpy.types.Scene):
         ResoniteLinkController.sceneToResoniteLinkController[scene] = self
+        self.scene = scene
+        SlotRegistry.DropDeleted(bpy.data.scenes)
+        self.registry = SlotRegistry.ForScene(scene) # slot data of everything sent from this scene
         self.logger = logging.getLogger("ResoniteLink")
         #self.logger.setLevel(logging.DEBUG)
+        self.dirtyTracker = DirtyTracker()
+        self.autoSendScheduled = False
+        self.baking = False # stepping through the frames, the depsgraph updates that causes aren't changes
+        self.liveSync = LiveSync(self)
+        self.loop : asyncio.AbstractEventLoop = None
+        self.actionQueue : asyncio.Queue = None
+        self.lastStats : SendStats = None # timings of the last send, shown in the panel
         self.resetState()
 
     def resetState(self):
         
         self.clientError = False
-        self.queuedActions : list[Callable[[bpy.types.Context], None]] = []
+        self.pendingActions = 0 # queued or running, guarded by lock
+        self.maxQueueDepth = 0
+        self.lastActionWait = 0.0 # seconds between queueing the last action and it starting
         self.shutdown = False
         self.clientStarted = False
         self.clientError = False
         self.lock = threading.Lock()
         self.lastError = ""
+        self.actionFailed = False # the last action raised, its traceback is in lastError, the connection is still up
+        self.fullSendDone = False # changes can only be sent on their own once everything was sent
     
     def startResoLink(self, context):
 
@@ -79,9 +107,13 @@ class ResoniteLinkController:
         self.client = ResoniteLinkWebsocketClient(logger=self.logger)
         self.client.on_started(self.mainLoopAsync)
         self.client.on_stopped(self.onStoppedAsync)
+        self.batcher = CommandBatcher(self.client)
 
         self.resetState() # allowing re-using the same instance after it has thrown an error
 
+        # slots recorded in the scene need to be checked again against this connection
+        self.registry.mapping.validated = False
+
         try:
             asyncio.run(self.client.start(port))
         except Exception as e:
@@ -93,165 +125,479 @@ class ResoniteLinkController:
 
     async def mainLoopAsync(self, client : ResoniteLinkClient):
 
+        self.loop = asyncio.get_running_loop()
+        self.actionQueue = asyncio.Queue()
         self.clientStarted = True
 
         #raise Exception("Test exception")
 
-        while (True):
+        while not self.shutdown:
+
+            # None is queued to wake the loop up for shutting down
+            item = await self.actionQueue.get()
+            if item is None:
+                continue
 
-            if len(self.queuedActions) > 0:
+            queuedTime, act = item
+            self.lastActionWait = time.perf_counter() - queuedTime
+            self.logger.log(logging.INFO, f"Starting action after {self.lastActionWait * 1000:.3f} ms, {self.actionQueue.qsize()} more queued")
+            try:
+                await act()
+                self.actionFailed = False
+            except Exception as e:
+                # one failed send must not stop the actions queued after it
+                self.lastError = "".join(line for line in traceback.format_exception(e))
+                self.logger.log(logging.ERROR, "Error in queued action:\n" + self.lastError)
+                self.actionFailed = True
+            finally:
                 self.lock.acquire()
-                while len(self.queuedActions) > 0:
-                    act = self.queuedActions[0]
-                    await act()
-                    self.queuedActions.remove(act)
+                self.pendingActions -= 1
                 self.lock.release()
 
-            if self.shutdown:
-                await self.client.stop()
-                break
+        await self.client.stop()
+
+    # can be called from any thread
+    def queueAction(self, act : Callable[[], Awaitable]) -> bool:
+        if self.loop is None or self.loop.is_closed() or self.actionQueue is None or self.shutdown:
+            return False
+        self.lock.acquire()
+        self.pendingActions += 1
+        self.maxQueueDepth = max(self.maxQueueDepth, self.pendingActions)
+        self.lock.release()
+        self.loop.call_soon_threadsafe(self.actionQueue.put_nowait, (time.perf_counter(), act))
+        return True
 
-            await asyncio.sleep(1)
+    # can be called from any thread
+    def requestShutdown(self):
+        self.shutdown = True
+        if self.loop is not None and self.actionQueue is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.actionQueue.put_nowait, None)
+
+    def isBusy(self) -> bool:
+        return self.pendingActions > 0
 
     async def onStoppedAsync(self, client : ResoniteLinkClient):
 
         self.clientStarted = False
     
-    async def sendSceneAsync(self, context : bpy.types.Context):
-
-        self.logger.log(logging.INFO, "context debug: " + context.scene.name)
-
-        scene = context.scene
+    # queues a send unless one is already queued or running, returns False if nothing was queued and the changes weren't handed over
+    def queueSend(self, incremental : bool = False, dirty : DirtySet = None) -> bool:
+        if not self.isBusy():
+            return self.queueAction(lambda: self.sendSceneAsync(self.scene, incremental=incremental, dirty=dirty))
+        if dirty is not None:
+            # a send is already queued or running, hand the changes back to the next one
+            self.dirtyTracker.merge(dirty)
+            return True
+        return False
+
+    def queueIncrementalSend(self):
+        # called from the depsgraph handler on the main thread
+        if self.autoSendScheduled:
+            return
+        self.autoSendScheduled = True
+
+        def tryQueue():
+            if self.shutdown or not self.clientStarted:
+                self.autoSendScheduled = False
+                return None
+            if not self.queueSend(incremental=True):
+                return 0.1 # a send is running, try again shortly
+            self.autoSendScheduled = False
+            return None
+
+        MainThreadTimers.Register(tryQueue, 0.1)
+
+    async def sendSceneAsync(self, scene : bpy.types.Scene, incremental : bool = False, dirty : DirtySet = None):
+
+        # Anything that changes from here on is picked up by the next send
+        if dirty is None:
+            dirty = self.dirtyTracker.take()
+        incremental = incremental and self.fullSendDone
+
+        # Nothing below reads from Blender, the scene is captured on the main thread.
+        # Meshes keep being read while the first ones upload.
+        stats = SendStats(incremental)
+        self.batcher.stats = stats
+        snapshot = await SnapshotCapture(scene, dirty if incremental else None, stats=stats).captureAsync()
+
+        self.logger.log(logging.DEBUG, "context debug: " + snapshot.name)
+
+        # Adopt what previous sessions created, if it still exists
+        registry = snapshot.registry
+        sceneSlotData = SceneSlotData.Get(registry, snapshot.key)
+        adoptingMapping = not registry.mapping.validated
+        if adoptingMapping:
+            registry.mapping.load(snapshot.mappingData)
+            for fingerprint, url in registry.mapping.assets.items():
+                if fingerprint.startswith("texture/"):
+                    TextureAssetSlotData.assetCache.put(fingerprint, url)
+                else:
+                    MeshAssetSlotData.assetCache.put(fingerprint, url)
+
+        # Everything sent for the scene is below its root slot, which is read with all of its children in one request.
+        # Slots that are gone are created again right away instead of failing an update first.
+        with stats.phase("validate slots"):
+            rootId = None
+            if sceneSlotData is not None and sceneSlotData.slot is not None:
+                rootId = sceneSlotData.slot.id
+            elif adoptingMapping and snapshot.mappingKey in registry.mapping.entries:
+                rootId = registry.mapping.entries[snapshot.mappingKey]['slot']
+            hierarchy = await SlotHierarchy.QueryAsync(self.batcher, rootId) if rootId is not None else None
+
+            if adoptingMapping:
+                if hierarchy is not None:
+                    registry.mapping.filterExisting(hierarchy.slotIds, hierarchy.componentIds)
+                else:
+                    await registry.mapping.validateAsync(self.batcher)
 
-        # Create/Update the scene root slot
-        sceneSlotData = SceneSlotData.Get(scene)
-        if sceneSlotData is None:
-            sceneSlotData = SceneSlotData(scene)
-            ID_SlotData.Clear()
-            ID_SlotData.Add(scene, sceneSlotData)
-            await sceneSlotData.instantiateAsync(self.client, context)
-        else:
-            try:
-                await sceneSlotData.updateAsync(self.client, context)
-            except:
-                # slot was probably deleted
-                ID_SlotData.Clear()
-                ID_SlotData.Add(scene, sceneSlotData)
-                await sceneSlotData.instantiateAsync(self.client, context)
-
-        # Store the current evaluated dependency graph
-        depsgraph = bpy.context.evaluated_depsgraph_get()
-
-        for obj in scene.objects:
-            self.logger.log(logging.INFO, f"{obj.name}, {obj.type}")
-            self.logger.log(logging.INFO, f"- track axis: {obj.track_axis}")
-            self.logger.log(logging.INFO, f"- up axis: {obj.up_axis}")
-            self.logger.log(logging.INFO, f"- hide render: {obj.hide_render}")
-            self.logger.log(logging.INFO, f"- hide viewport: {obj.hide_viewport}") # doesn't update?
-            self.logger.log(logging.INFO, f"- visible: {obj.visible_get()}")
+            registry.staleCount = 0
+            if hierarchy is not None and sceneSlotData is not None and sceneSlotData.slot is not None:
+                if not hierarchy.exists:
+                    sceneSlotData.slot = None
+                else:
+                    incomplete = registry.markStale(hierarchy)
+                    await SessionCleanup(registry, snapshot.maxInFlight).deleteSlotsAsync(self.batcher, incomplete)
+                    if registry.staleCount > 0:
+                        self.logger.log(logging.INFO, f"{registry.staleCount} slots are gone from Resonite and will be sent again")
+            snapshot.slotsValidated = hierarchy is not None and hierarchy.componentIds is not None
+
+        # Create/Update the scene root slot, only the slot data of this scene is affected if it's gone
+        sceneRecreated = False
+        with stats.phase("scene slot"):
+            if sceneSlotData is None:
+                sceneSlotData = SceneSlotData(snapshot)
+                registry.clear()
+                registry.add(snapshot.key, sceneSlotData)
+                await sceneSlotData.instantiateOrRestoreAsync(self.batcher, snapshot)
+                sceneRecreated = True
+            else:
+                sceneSlotData.snapshot = snapshot
+                if sceneSlotData.slot is not None and not snapshot.slotsValidated:
+                    try:
+                        await sceneSlotData.updateAsync(self.batcher, snapshot)
+                    except:
+                        # slot was probably deleted
+                        sceneSlotData.slot = None
+                elif sceneSlotData.slot is not None:
+                    await sceneSlotData.updateAsync(self.batcher, snapshot)
+
+                if sceneSlotData.slot is None:
+                    # everything that was below the root slot is gone with it
+                    registry.clear()
+                    registry.add(snapshot.key, sceneSlotData)
+                    await sceneSlotData.instantiateAsync(self.batcher, snapshot)
+                    sceneRecreated = True
+
+        if (sceneRecreated or registry.staleCount > 0) and incremental:
+            # everything has to be sent again, which the changes alone don't describe
+            incremental = False
+            stats.incremental = False
+            slotsValidated = snapshot.slotsValidated
+            snapshot = await SnapshotCapture(scene, stats=stats).captureAsync()
+            snapshot.slotsValidated = slotsValidated
+
+        # The shared asset slots are needed by most jobs, make sure they exist before anything runs concurrently
+        await AssetSlotData.getAssetsSlotRootAsync(self.batcher, snapshot)
+
+        # Parents are sent before their children, and mesh and material assets before the renderers using them.
+        # Everything else is sent concurrently.
+        scheduler = SendScheduler(maxInFlight=snapshot.maxInFlight, stats=stats)
+        previewUsers : dict[Any, tuple[MeshSnapshot, list[ObjectSnapshot]]] = {} # objects showing the preview of a mesh
+
+        if incremental:
+            for matSnapshot in snapshot.changedMaterials:
+                self.addMaterialJobs(scheduler, matSnapshot, snapshot)
+            self.logger.log(logging.INFO, f"Sending changes of {len(snapshot.objects)} objects and {len(dirty.materials)} materials")
+
+        for objSnapshot in snapshot.objects:
+            obj = objSnapshot.id
+            objKey = ("object", obj)
+            parentDeps = [("object", objSnapshot.parent.id)] if objSnapshot.parent is not None else []
+
+            if objSnapshot.transformOnly:
+                objectSlotData = ObjectSlotData.Get(registry, objSnapshot.key)
+                objectSlotData.snapshot = objSnapshot
+                scheduler.add(objKey, functools.partial(self.sendTransformAsync, objectSlotData, snapshot), parentDeps, label=objSnapshot.name)
+                continue
 
             # check if it's a type that stores mesh data 
-            if obj.type in ["MESH", "CURVE", "SURFACE", "META", "FONT", "CURVES", "POINTCLOUD", "VOLUME", "GREASEPENCIL"]:
+            if objSnapshot.hasGeometry:
 
-                self.logger.log(logging.INFO, f"IS A MESH: {obj.session_uid}")
+                self.logger.log(logging.DEBUG, f"IS A MESH: {objSnapshot.sessionUid}")
 
                 # Grease pencil technically could work but needs extra code to handle it
-                if obj.type == "GREASEPENCIL":
+                if objSnapshot.type == "GREASEPENCIL":
                     continue
 
                 newInstance = False
                 # Set up the mesh slot data for this object
-                meshObjectSlotData = MeshObjectSlotData.Get(obj)
+                meshObjectSlotData = MeshObjectSlotData.Get(registry, objSnapshot.key)
                 # if meshObjectSlotData is not None and 
 
                 # Only show objects that are active in the render
-                if obj.hide_render:
+                if objSnapshot.hideRender:
                     if meshObjectSlotData is not None:
                         # mesh was sent previously
                         if not meshObjectSlotData.hidden:
                             meshObjectSlotData.hidden = True
-                            try:
-                                await self.client.update_component(
-                                    meshObjectSlotData.meshRenderer,
-                                    Enabled=Field_Bool(value=False)
-                                )
-                            except:
-                                # renderer component probably got deleted
-                                pass
+                            scheduler.add(objKey, functools.partial(self.hideMeshObjectAsync, meshObjectSlotData, snapshot), parentDeps, label=objSnapshot.name)
+                    continue
+
+                if objSnapshot.mesh is None:
+                    self.logger.log(logging.DEBUG, f"mesh has no vertices, skipping") # can happen in the case of metaballs- one of them will contain the whole mesh and the rest will be empty
                     continue
                 
                 if meshObjectSlotData is None:
                     # New slot data
-                    meshObjectSlotData = MeshObjectSlotData(obj)
-                    ID_SlotData.Add(obj, meshObjectSlotData)
+                    meshObjectSlotData = MeshObjectSlotData(objSnapshot)
+                    registry.add(objSnapshot.key, meshObjectSlotData)
                     newInstance = True
                 elif not isinstance(meshObjectSlotData, MeshObjectSlotData):
-                    temp = meshObjectSlotData.slot
-                    meshObjectSlotData = MeshObjectSlotData(obj)
-                    meshObjectSlotData.slot = temp
-                    ID_SlotData.Add(obj, meshObjectSlotData)
+                    previous = meshObjectSlotData
+                    meshObjectSlotData = MeshObjectSlotData(objSnapshot)
+                    for attr in ObjectSlotData.componentAttrs:
+                        setattr(meshObjectSlotData, attr, getattr(previous, attr))
+                    registry.add(objSnapshot.key, meshObjectSlotData)
+                    meshObjectSlotData.slot = previous.slot
                     #newInstance = True
+                else:
+                    meshObjectSlotData.snapshot = objSnapshot
 
-                # Evaluate mesh data with all current modifiers
-                eval_obj : bpy.types.Object = obj.evaluated_get(depsgraph)
-
-                # if obj.type == "GREASEPENCIL":
-                #     gp : bpy.types.GreasePencil = eval_obj.data
-                #     drawing : bpy.types.GreasePencilDrawing = gp.layers[0].frames[0].drawing
-                #     logger.log(logging.INFO, f"grease pencil strokes: {drawing.strokes}") # strokes is documented on this page: https://developer.blender.org/docs/release_notes/4.3/grease_pencil_migration/
+                meshObjectSlotData.hidden = False
 
-                #mesh = eval_obj.to_mesh() # this can throw a RuntimeError in some cases, like for Grease pencil objects whose mesh data can't be accessed this way
+                # Materials and meshes shared between objects are only sent once
+                assetDeps = []
+                for matSnapshot in objSnapshot.materials:
+                    assetDeps.append(self.addMaterialJobs(scheduler, matSnapshot, snapshot))
+                if len(objSnapshot.materials) == 0:
+                    if "defaultMaterial" not in scheduler:
+                        scheduler.add("defaultMaterial", functools.partial(MaterialAssetSlotData.AddDefaultMaterialAsync, self.batcher, snapshot), label="Default material")
+                    assetDeps.append("defaultMaterial")
+
+                # skinned renderers point at the slots of the bones
+                if objSnapshot.mesh.armature is not None:
+                    assetDeps.append(("object", objSnapshot.mesh.armature.id))
+
+                meshKey = ("mesh", objSnapshot.mesh.id)
+                if meshKey not in scheduler:
+                    # large meshes are sent as a preview first, except for skinned ones which only have a single level
+                    proxy = snapshot.lodMode != 'OFF' and objSnapshot.mesh.vertexCount >= snapshot.lodMinVertices and objSnapshot.mesh.armature is None
+                    scheduler.add(meshKey, functools.partial(MeshAssetSlotData.AddOrUpdateAsync, objSnapshot.mesh, self.batcher, snapshot, proxy), label=f"Mesh {objSnapshot.mesh.name}")
+                    if proxy:
+                        previewUsers[objSnapshot.mesh.id] = (objSnapshot.mesh, [])
+                if objSnapshot.mesh.id in previewUsers:
+                    previewUsers[objSnapshot.mesh.id][1].append(objSnapshot)
+                assetDeps.append(meshKey)
+
+                scheduler.add(objKey, functools.partial(self.sendMeshObjectAsync, meshObjectSlotData, objSnapshot, newInstance, snapshot), parentDeps + assetDeps, label=objSnapshot.name)
+            else:
+                self.logger.log(logging.DEBUG, f"NOT A MESH: {objSnapshot.sessionUid}")
 
-                mesh = eval_obj.data
+                scheduler.add(objKey, functools.partial(self.sendObjectAsync, objSnapshot, snapshot), parentDeps, label=objSnapshot.name)
 
-                if len(mesh.vertices) == 0:
-                    self.logger.log(logging.INFO, f"mesh has no vertices, skipping") # can happen in the case of metaballs- one of them will contain the whole mesh and the rest will be empty
-                    #eval_obj.to_mesh_clear()
-                    continue
+        # Full meshes replace the previews once everything else was sent
+        for meshId, (meshSnapshot, users) in previewUsers.items():
+            userKeys = [("object", objSnapshot.id) for objSnapshot in users]
+            scheduler.add(("fullMesh", meshId), functools.partial(self.sendFullMeshAsync, meshSnapshot, users, snapshot), [("mesh", meshId)] + userKeys, priority=1, label=f"Full mesh {meshSnapshot.name}")
 
-                meshObjectSlotData.hidden = False
+        self.batcher.resetStats()
+        self.batcher.latencyListener = scheduler.recordLatency
+        try:
+            failures = await scheduler.runAsync()
+        finally:
+            self.batcher.latencyListener = None
+        for key, error in failures.items():
+            self.logger.log(logging.ERROR, f"Failed to send {key}: {error}")
+        self.logger.log(logging.INFO, f"Batching: {self.batcher.requestCount} requests in {self.batcher.batchCount} batches, {self.batcher.mergedCount} updates merged, {len(self.batcher.failures)} failed")
+
+        meshCache = MeshAssetSlotData.assetCache
+        self.logger.log(logging.INFO, f"Mesh asset cache: {meshCache.hits} hits, {meshCache.misses} misses, {len(meshCache.entries)} entries")
+        textureCache = TextureAssetSlotData.assetCache
+        if len(snapshot.textures) > 0:
+            self.logger.log(logging.INFO, f"Texture asset cache: {textureCache.hits} hits, {textureCache.misses} misses, {len(textureCache.entries)} entries")
+
+        # Delete the slots of removed objects and of assets nothing uses anymore,
+        # and whatever a previous session created for IDs that are gone now
+        if len(failures) == 0:
+            leftovers = registry.mapping.takeAll() if adoptingMapping and not incremental else None
+            with stats.phase("remove orphans"):
+                await SessionCleanup(registry, snapshot.maxInFlight).collectAsync(self.batcher, snapshot, leftovers)
+
+        # Remember what was created so the next session can re-use it
+        registry.reindexComponents()
+        registry.mapping.save(scene, ID_SlotData.CollectMapping(registry), dict(meshCache.entries) | dict(textureCache.entries))
+
+        stats.finish()
+        self.batcher.stats = None
+        self.lastStats = stats
+        for line in stats.summaryLines():
+            self.logger.log(logging.INFO, line)
+        if snapshot.traceDir is not None:
+            self.saveTrace(stats, snapshot.traceDir)
+
+        if len(failures) > 0:
+            raise next(iter(failures.values()))
+        if not incremental:
+            self.fullSendDone = True
+        self.logger.log(logging.INFO, f"Done!")
+        return snapshot
+
+    def addMaterialJobs(self, scheduler : SendScheduler, matSnapshot : MaterialSnapshot, snapshot : SceneSnapshot) -> Hashable:
+        # Materials, and the images they show, are shared between objects and only sent once.
+        # Renderers only wait for the material, its textures are assigned whenever they were imported.
+        matKey = ("material", matSnapshot.id)
+        if matKey in scheduler:
+            return matKey
+        scheduler.add(matKey, functools.partial(MaterialAssetSlotData.AddOrUpdateAsync, matSnapshot, self.batcher, snapshot), label=f"Material {matSnapshot.name}")
+
+        matSlotData = MaterialAssetSlotData.Get(snapshot.registry, matSnapshot.key)
+        if len(matSnapshot.textures) == 0 and (matSlotData is None or not matSlotData.textured):
+            return matKey
+        textureDeps = []
+        if TextureAssetSlotData.Supported(self.batcher):
+            for textureSnapshot in matSnapshot.textures.values():
+                textureKey = ("texture", textureSnapshot.id)
+                if textureKey not in scheduler:
+                    scheduler.add(textureKey, functools.partial(TextureAssetSlotData.AddOrUpdateAsync, textureSnapshot, self.batcher, snapshot), label=f"Texture {textureSnapshot.name}")
+                textureDeps.append(textureKey)
+        scheduler.add(("materialTextures", matSnapshot.id), functools.partial(self.setMaterialTexturesAsync, matSnapshot, snapshot), [matKey] + textureDeps, label=f"Textures of {matSnapshot.name}")
+        return matKey
+
+    async def setMaterialTexturesAsync(self, matSnapshot : MaterialSnapshot, context : SceneSnapshot):
+        matSlotData = MaterialAssetSlotData.Get(context.registry, matSnapshot.key)
+        if matSlotData is not None:
+            await matSlotData.setTexturesAsync(self.batcher, context)
+
+    async def compactSessionAsync(self, scene : bpy.types.Scene):
+        # everything is sent first, so that the registry knows every slot that should exist
+        snapshot = await self.sendSceneAsync(scene)
+        await SessionCleanup(snapshot.registry, snapshot.maxInFlight).compactAsync(self.batcher, snapshot)
+
+    # main thread only
+    def bakeAnimation(self, scene : bpy.types.Scene) -> AnimationBake:
+        frames = list(range(scene.frame_start, scene.frame_end + 1, scene.ResoniteLink_bake_step))
+        if len(frames) == 0:
+            # the frame range ends before it starts, there is nothing to bake
+            return AnimationBake(duration=0.0)
+        if frames[-1] != scene.frame_end:
+            frames.append(scene.frame_end)
+        fps = scene.render.fps / scene.render.fps_base
+        bake = AnimationBake(duration=(scene.frame_end - scene.frame_start) / fps)
+        if len(frames) < 2:
+            return bake
+
+        objects = list(scene.objects)
+        start = time.perf_counter()
+        self.baking = True
+        try:
+            matrices = readLocalMatrices(scene, objects, frames)
+        finally:
+            self.baking = False
+        readTime = time.perf_counter() - start
+
+        times = (np.array(frames, dtype=np.float64) - frames[0]) / (frames[-1] - frames[0])
+        for obj, tracks in zip(objects, bakeTracks(matrices, times, scene.ResoniteLink_bake_tolerance)):
+            if len(tracks) > 0:
+                bake.tracks[SlotRegistry.idKey(obj)] = tracks
+        self.logger.log(logging.INFO, f"Baked {len(frames)} frames of {len(objects)} objects in {time.perf_counter() - start:.2f} s "
+                        f"({readTime:.2f} s stepping through frames), {len(bake.tracks)} animated objects, {bake.keyCount} keys after reduction")
+        return bake
+
+    async def sendAnimationAsync(self, bake : AnimationBake, context : SceneSnapshot):
+        if not ObjectSlotData.AnimationSupported():
+            self.logger.log(logging.WARNING, "Animations can't be described with this ResoniteLink.py version")
+            return
 
-                matCount = len(mesh.materials)
-                meshObjectSlotData.matData = [] # rebuild the list of materials from scratch in case they changed
-                if matCount > 0:
-                    i = 0
-                    for mat in mesh.materials:
-                        if len(meshObjectSlotData.matData) < i+1 or meshObjectSlotData.matData[i].id != mat:
-                            await meshObjectSlotData.addOrUpdateMaterialAsync(mat, self.client, context)
-                        i += 1
-                
-                await meshObjectSlotData.addOrUpdateMeshAsync(mesh, self.client, context)
+        # objects that stopped moving are released as well
+        objects = [data for data in context.registry.values()
+                   if isinstance(data, ObjectSlotData) and data.slot is not None and (data.key in bake.tracks or len(data.drivenMembers()) > 0)]
 
-                if newInstance:
-                    await meshObjectSlotData.instantiateAsync(self.client, context)
-                else:
-                    try:
-                        await meshObjectSlotData.updateAsync(self.client, context)
-                    except:
-                        # slot was probably deleted
-                        await meshObjectSlotData.instantiateAsync(self.client, context)
+        async def send(objectSlotData : ObjectSlotData) -> int:
+            try:
+                driven = await objectSlotData.setAnimationAsync(self.batcher, context, bake.tracks.get(objectSlotData.key, {}), bake.duration)
+                await objectSlotData.updateTransformAsync(self.batcher, context)
+                return driven
+            except Exception as e:
+                self.logger.log(logging.WARNING, f"Could not send the animation of {objectSlotData.snapshot.name}: {e}")
+                return 0
+
+        driven = await asyncio.gather(*(send(objectSlotData) for objectSlotData in objects))
+        context.registry.reindexComponents()
+        context.registry.mapping.save(context.scene, ID_SlotData.CollectMapping(context.registry),
+                                      dict(MeshAssetSlotData.assetCache.entries) | dict(TextureAssetSlotData.assetCache.entries))
+        self.logger.log(logging.INFO, f"Sent a {bake.duration:.2f} s animation, {sum(driven)} members of {sum(1 for n in driven if n > 0)} objects are driven in Resonite")
+
+    def saveTrace(self, stats : SendStats, directory : str):
+        name = time.strftime("resonitelink_send_%Y%m%d_%H%M%S", time.localtime(stats.startWallTime))
+        path = os.path.join(directory, f"{name}_{int(stats.startWallTime * 1000) % 1000:03d}.json")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            stats.saveChromeTrace(path)
+            self.logger.log(logging.INFO, f"Send trace saved to {path}")
+        except OSError as e:
+            self.logger.log(logging.WARNING, f"Could not save the send trace: {e}")
+
+    async def sendTransformAsync(self, objectSlotData : ObjectSlotData, context : SceneSnapshot):
+        await objectSlotData.updateOrInstantiateAsync(self.batcher, context, objectSlotData.updateTransformAsync)
+
+    async def sendFullMeshAsync(self, meshSnapshot : MeshSnapshot, users : list[ObjectSnapshot], context : SceneSnapshot):
+        meshSlotData = MeshAssetSlotData.Get(context.registry, meshSnapshot.key)
+        await meshSlotData.sendMeshAsync(self.batcher, context)
+
+        renderers = [MeshObjectSlotData.Get(context.registry, objSnapshot.key) for objSnapshot in users]
+        renderers = [meshObjectSlotData for meshObjectSlotData in renderers if meshObjectSlotData is not None and meshObjectSlotData.meshRenderer is not None]
+        await asyncio.gather(*(meshObjectSlotData.showFullMeshAsync(self.batcher, context) for meshObjectSlotData in renderers))
+
+        # the preview asset can be unloaded once nothing shows it anymore
+        if context.lodMode != 'LOD_GROUP' and all(meshObjectSlotData.proxyRenderer is None for meshObjectSlotData in renderers):
+            await meshSlotData.releaseProxyAsync(self.batcher, context)
+
+    async def hideMeshObjectAsync(self, meshObjectSlotData : MeshObjectSlotData, context : SceneSnapshot):
+        if meshObjectSlotData.slot is None:
+            # gone from Resonite, it's created hidden or not at all once the object is shown again
+            return
+        try:
+            await meshObjectSlotData.hideAsync(self.batcher, context)
+        except:
+            if context.slotsValidated:
+                raise
+            # renderer component probably got deleted
 
-                self.logger.log(logging.INFO, f"{obj.name}, {obj.type} = {meshObjectSlotData.slot.id}")
+    async def sendMeshObjectAsync(self, meshObjectSlotData : MeshObjectSlotData, obj : ObjectSnapshot, newInstance : bool, context : SceneSnapshot):
 
-                #eval_obj.to_mesh_clear()
-            else:
-                self.logger.log(logging.INFO, f"NOT A MESH: {obj.session_uid}")
+        # rebuild the list of materials from scratch in case they changed
+        meshObjectSlotData.matData = [MaterialAssetSlotData.Get(context.registry, mat.key) for mat in obj.materials]
+        meshObjectSlotData.meshData = MeshAssetSlotData.Get(context.registry, obj.mesh.key)
 
-                objectSlotData = ObjectSlotData.Get(obj)
-                if objectSlotData is None:
-                    objectSlotData = ObjectSlotData(obj)
-                    ID_SlotData.Add(obj, objectSlotData)
-                    await objectSlotData.instantiateAsync(self.client, context)
-                else:
-                    try:
-                        await objectSlotData.updateAsync(self.client, context)
-                    except:
-                        # slot was probably deleted
-                        await objectSlotData.instantiateAsync(self.client, context)
+        if newInstance:
+            await meshObjectSlotData.instantiateOrRestoreAsync(self.batcher, context)
+        else:
+            await meshObjectSlotData.updateOrInstantiateAsync(self.batcher, context)
+
+        self.logger.log(logging.DEBUG, f"{obj.name}, {obj.type} = {meshObjectSlotData.slot.id}")
+
+    async def sendObjectAsync(self, obj : ObjectSnapshot, context : SceneSnapshot):
+        # armatures get a slot for each of their bones
+        slotDataType = ArmatureSlotData if obj.type == "ARMATURE" else ObjectSlotData
+        objectSlotData = ObjectSlotData.Get(context.registry, obj.key)
+        if objectSlotData is None:
+            objectSlotData = slotDataType(obj)
+            context.registry.add(obj.key, objectSlotData)
+            await objectSlotData.instantiateOrRestoreAsync(self.batcher, context)
+        elif slotDataType is ArmatureSlotData and not isinstance(objectSlotData, ArmatureSlotData):
+            # made as a plain parent slot before
+            previous = objectSlotData
+            objectSlotData = slotDataType(obj)
+            for attr in ObjectSlotData.componentAttrs:
+                setattr(objectSlotData, attr, getattr(previous, attr))
+            context.registry.add(obj.key, objectSlotData)
+            objectSlotData.slot = previous.slot
+            await objectSlotData.updateOrInstantiateAsync(self.batcher, context)
+        else:
+            objectSlotData.snapshot = obj
+            await objectSlotData.updateOrInstantiateAsync(self.batcher, context)
 
-                self.logger.log(logging.INFO, f"{obj.name}, {obj.type} = {objectSlotData.slot.id}")
-        
-        self.logger.log(logging.INFO, f"Done!")
+        self.logger.log(logging.DEBUG, f"{obj.name}, {obj.type} = {objectSlotData.slot.id}")
 
 
 class ResoniteLinkMainPanel(bpy.types.Panel):
@@ -279,15 +625,76 @@ class ResoniteLinkMainPanel(bpy.types.Panel):
         row = layout.row()
         row.label(text="Connection status: " + ("Connected" if controller.clientStarted and not controller.clientError else "Not connected" if not controller.clientError else "ERROR"))
 
+        if controller.clientStarted:
+            row = layout.row()
+            row.label(text=f"Queued actions: {controller.pendingActions} (max {controller.maxQueueDepth}), last wait {controller.lastActionWait * 1000:.2f} ms")
+            if controller.actionFailed:
+                row = layout.row()
+                row.label(text="The last action failed, see the last error", icon='ERROR')
+
+        if controller.lastStats is not None:
+            box = layout.box()
+            for line in controller.lastStats.summaryLines():
+                box.label(text=line)
+            row = box.row()
+            row.operator("scene.exporttrace_resonitelink")
+
         row = layout.row()
         row.prop(context.scene, "ResoniteLink_port")
 
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_max_in_flight")
+
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_chunk_vertex_budget")
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_chunk_size_mb")
+
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_lod_mode")
+        if context.scene.ResoniteLink_lod_mode != 'OFF':
+            row = layout.row()
+            row.prop(context.scene, "ResoniteLink_lod_ratio")
+            row = layout.row()
+            row.prop(context.scene, "ResoniteLink_lod_min_vertices")
+
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_texture_max_size")
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_texture_cache_dir")
+
         row = layout.row()
         row.operator("scene.connect_resonitelink")
 
         row = layout.row()
         row.operator("scene.sendscene_resonitelink")
 
+        row = layout.row()
+        row.operator("scene.sendchanges_resonitelink")
+
+        row = layout.row()
+        row.operator("scene.compactsession_resonitelink")
+
+        row = layout.row()
+        row.operator("scene.sendanimation_resonitelink")
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_bake_step")
+        row.prop(context.scene, "ResoniteLink_bake_tolerance")
+
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_auto_send")
+
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_live_mode")
+        if context.scene.ResoniteLink_live_mode:
+            row = layout.row()
+            row.prop(context.scene, "ResoniteLink_live_rate")
+            row = layout.row()
+            row.prop(context.scene, "ResoniteLink_live_geometry_delay")
+
+        row = layout.row()
+        row.prop(context.scene, "ResoniteLink_trace_dir")
+
         row = layout.row()
         row.operator("scene.disconnect_resonitelink")
 
@@ -302,7 +709,7 @@ class ErrorDialogOperator(bpy.types.Operator):
     @classmethod
     def poll(cls, context):
         controller = ResoniteLinkController.Get(context.scene)
-        return controller.clientError
+        return controller.clientError or controller.actionFailed
 
     def execute(self, context):
         controller = ResoniteLinkController.Get(context.scene)
@@ -324,7 +731,7 @@ class DisconnectOperator(bpy.types.Operator):
     def execute(self, context):        # execute() is called when running the operator.
 
         controller = ResoniteLinkController.Get(context.scene)
-        controller.shutdown = True
+        controller.requestShutdown()
 
         return {'FINISHED'}            # Lets Blender know the operator finished successfully.
 
@@ -357,38 +764,196 @@ class SendSceneOperator(bpy.types.Operator):
     @classmethod
     def poll(cls, context):
         controller = ResoniteLinkController.Get(context.scene)
-        return context.scene is not None and controller.clientStarted == True and not (controller.lock.locked() or len(controller.queuedActions) > 0) and not controller.shutdown
+        return context.scene is not None and controller.clientStarted == True and not controller.isBusy() and not controller.shutdown
 
     def execute(self, context):        # execute() is called when running the operator.
         controller = ResoniteLinkController.Get(context.scene)
 
-        controller.lock.acquire()
+        controller.queueAction(lambda: controller.sendSceneAsync(controller.scene))
 
-        controller.queuedActions.append(lambda: controller.sendSceneAsync(context))
+        return {'FINISHED'}            # Lets Blender know the operator finished successfully.
 
-        controller.lock.release()
+class SendChangesOperator(bpy.types.Operator):
+    """Sends only the objects and materials that changed since the last send"""
+    bl_idname = "scene.sendchanges_resonitelink"
+    bl_label = "Send Changes"
+    bl_options = {'REGISTER'}
 
-        return {'FINISHED'}            # Lets Blender know the operator finished successfully.
+    @classmethod
+    def poll(cls, context):
+        controller = ResoniteLinkController.Get(context.scene)
+        return SendSceneOperator.poll(context) and controller.fullSendDone
+
+    def execute(self, context):
+        controller = ResoniteLinkController.Get(context.scene)
+
+        controller.queueAction(lambda: controller.sendSceneAsync(controller.scene, incremental=True))
+
+        return {'FINISHED'}
+
+
+class CompactSessionOperator(bpy.types.Operator):
+    """Sends the scene, then deletes every slot below the scene root in Resonite that isn't part of it anymore"""
+    bl_idname = "scene.compactsession_resonitelink"
+    bl_label = "Compact Session"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return SendSceneOperator.poll(context)
+
+    def execute(self, context):
+        controller = ResoniteLinkController.Get(context.scene)
+
+        controller.queueAction(lambda: controller.compactSessionAsync(controller.scene))
+
+        return {'FINISHED'}
+
+
+class SendAnimationOperator(bpy.types.Operator):
+    """Bakes the transforms of the objects over the frame range and sends them, so that the animation plays in Resonite on its own"""
+    bl_idname = "scene.sendanimation_resonitelink"
+    bl_label = "Send Animation"
+    bl_options = {'REGISTER'}
+
+    @classmethod
+    def poll(cls, context):
+        return SendChangesOperator.poll(context)
+
+    def execute(self, context):
+        controller = ResoniteLinkController.Get(context.scene)
+        if controller.scene.frame_end < controller.scene.frame_start:
+            self.report({'ERROR'}, "The frame range ends before it starts")
+            return {'CANCELLED'}
+
+        # the frames are stepped through here, the websocket thread only gets the tracks
+        bake = controller.bakeAnimation(controller.scene)
+        snapshot = SceneSnapshot(controller.scene)
+        controller.queueAction(lambda: controller.sendAnimationAsync(bake, snapshot))
+
+        return {'FINISHED'}
+
+
+class ExportTraceOperator(bpy.types.Operator, ExportHelper):
+    """Saves the timings of the last send as a Chrome trace, which chrome://tracing and Perfetto can open"""
+    bl_idname = "scene.exporttrace_resonitelink"
+    bl_label = "Export Send Trace"
+    bl_options = {'REGISTER'}
+
+    filename_ext = ".json"
+    filter_glob : bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        controller = ResoniteLinkController.Get(context.scene)
+        return controller.lastStats is not None
+
+    def execute(self, context):
+        controller = ResoniteLinkController.Get(context.scene)
+        try:
+            controller.lastStats.saveChromeTrace(self.filepath)
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not save the trace: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Send trace saved to {self.filepath}")
+        return {'FINISHED'}
+
+
+def onLiveModeChanged(self, context : bpy.types.Context):
+    controller = ResoniteLinkController.Get(context.scene)
+    if context.scene.ResoniteLink_live_mode:
+        controller.liveSync.start()
+    else:
+        controller.liveSync.stop()
+
+@bpy.app.handlers.persistent
+def onDepsgraphUpdatePost(scene : bpy.types.Scene, depsgraph : bpy.types.Depsgraph):
+    controller = ResoniteLinkController.sceneToResoniteLinkController.get(scene, None)
+    if controller is None or not controller.clientStarted or controller.baking:
+        return
+    controller.dirtyTracker.record(depsgraph)
+    if controller.liveSync.running:
+        # live sync picks the changes up on its next tick
+        return
+    if scene.ResoniteLink_auto_send and controller.fullSendDone and controller.dirtyTracker.hasChanges():
+        controller.queueIncrementalSend()
+
+@bpy.app.handlers.persistent
+def onLoadPost(*args):
+    # the scenes of the previous file are gone, and the scenes of this one have new session_uids
+    SlotRegistry.DropDeleted(bpy.data.scenes)
 
 def register():
     bpy.utils.register_class(SendSceneOperator)
+    bpy.utils.register_class(SendChangesOperator)
     bpy.utils.register_class(ResoniteLinkMainPanel)
     bpy.utils.register_class(ConnectOperator)
     bpy.utils.register_class(DisconnectOperator)
     bpy.utils.register_class(ErrorDialogOperator)
+    bpy.utils.register_class(ExportTraceOperator)
+    bpy.utils.register_class(CompactSessionOperator)
+    bpy.utils.register_class(SendAnimationOperator)
     #bpy.types.Scene.ResoniteLink_port = bpy.props.IntProperty(name="Websocket Port", default=2000, min=2000, max=65535)
     bpy.types.Scene.ResoniteLink_port = bpy.props.StringProperty(name="Websocket Port", default="2000")
+    bpy.types.Scene.ResoniteLink_auto_send = bpy.props.BoolProperty(name="Send Changes Automatically", description="Send changed objects as soon as they are edited", default=False)
+    bpy.app.handlers.depsgraph_update_post.append(onDepsgraphUpdatePost)
+    bpy.app.handlers.load_post.append(onLoadPost)
+    bpy.types.Scene.ResoniteLink_live_mode = bpy.props.BoolProperty(name="Live Mode", description="Stream transforms to Resonite while objects are being moved. Needs a full send first", default=False, update=onLiveModeChanged)
+    bpy.types.Scene.ResoniteLink_live_rate = bpy.props.FloatProperty(name="Live Update Rate", description="How many times per second transforms are sampled", default=30.0, min=1.0, max=120.0)
+    bpy.types.Scene.ResoniteLink_live_geometry_delay = bpy.props.FloatProperty(name="Geometry Delay", description="Seconds geometry has to stay unchanged before it is sent", default=0.5, min=0.0, max=10.0, unit='TIME_ABSOLUTE')
+    bpy.types.Scene.ResoniteLink_max_in_flight = bpy.props.IntProperty(name="Max Requests In Flight", description="Upper limit for concurrent sends, lowered automatically when Resonite responds slowly", default=16, min=1, max=256)
+    bpy.types.Scene.ResoniteLink_chunk_vertex_budget = bpy.props.IntProperty(name="Max Vertices Per Mesh", description="Meshes with more vertices are split into chunks that are sent one at a time", default=1000000, min=1000)
+    bpy.types.Scene.ResoniteLink_lod_mode = bpy.props.EnumProperty(
+        name="Previews",
+        description="Send decimated previews of large meshes first, so the whole scene shows up quickly",
+        items=[
+            ('OFF', "Off", "Send every mesh at full resolution right away"),
+            ('SWAP', "Swap", "Replace the previews with the full meshes once they are sent"),
+            ('LOD_GROUP', "LOD Group", "Keep the previews as the lower level of an LOD group"),
+        ],
+        default='OFF'
+    )
+    bpy.types.Scene.ResoniteLink_lod_ratio = bpy.props.FloatProperty(name="Preview Detail", description="Fraction of the vertices kept in previews", default=0.05, min=0.001, max=0.5)
+    bpy.types.Scene.ResoniteLink_lod_min_vertices = bpy.props.IntProperty(name="Preview Above Vertices", description="Only meshes with at least this many vertices get a preview", default=20000, min=0)
+    bpy.types.Scene.ResoniteLink_chunk_size_mb = bpy.props.IntProperty(name="Max Mesh Size (MB)", description="Meshes whose vertex data is larger are split into chunks that are sent one at a time", default=64, min=1, max=2048)
+    bpy.types.Scene.ResoniteLink_texture_max_size = bpy.props.IntProperty(name="Max Texture Size", description="Larger images are downscaled until neither side exceeds this many pixels", default=2048, min=16, max=16384)
+    bpy.types.Scene.ResoniteLink_texture_cache_dir = bpy.props.StringProperty(name="Texture Cache Folder", description="Encoded textures are kept in this folder, leave empty to use the add-on's own folder", default="", subtype='DIR_PATH')
+    bpy.types.Scene.ResoniteLink_bake_step = bpy.props.IntProperty(name="Bake Frame Step", description="Sample the transforms on every this many frames when baking the animation", default=1, min=1, max=100)
+    bpy.types.Scene.ResoniteLink_bake_tolerance = bpy.props.FloatProperty(name="Key Tolerance", description="How far the reduced keys may stray from the baked transforms, in meters for positions and scale factors for scales", default=0.001, min=0.0, max=1.0, precision=4)
+    bpy.types.Scene.ResoniteLink_trace_dir = bpy.props.StringProperty(name="Trace Folder", description="Save a Chrome trace of every send to this folder, leave empty to only keep the last one", default="", subtype='DIR_PATH')
 
 def unregister():
 
     bpy.utils.unregister_class(SendSceneOperator)
+    bpy.utils.unregister_class(SendChangesOperator)
     bpy.utils.unregister_class(ResoniteLinkMainPanel)
     bpy.utils.unregister_class(ConnectOperator)
     bpy.utils.unregister_class(DisconnectOperator)
     bpy.utils.unregister_class(ErrorDialogOperator)
+    bpy.utils.unregister_class(ExportTraceOperator)
+    bpy.utils.unregister_class(CompactSessionOperator)
+    bpy.utils.unregister_class(SendAnimationOperator)
     del bpy.types.Scene.ResoniteLink_port
+    del bpy.types.Scene.ResoniteLink_max_in_flight
+    del bpy.types.Scene.ResoniteLink_chunk_vertex_budget
+    del bpy.types.Scene.ResoniteLink_chunk_size_mb
+    del bpy.types.Scene.ResoniteLink_lod_mode
+    del bpy.types.Scene.ResoniteLink_lod_ratio
+    del bpy.types.Scene.ResoniteLink_lod_min_vertices
+    del bpy.types.Scene.ResoniteLink_texture_max_size
+    del bpy.types.Scene.ResoniteLink_texture_cache_dir
+    del bpy.types.Scene.ResoniteLink_trace_dir
+    del bpy.types.Scene.ResoniteLink_bake_step
+    del bpy.types.Scene.ResoniteLink_bake_tolerance
+    del bpy.types.Scene.ResoniteLink_auto_send
+    del bpy.types.Scene.ResoniteLink_live_mode
+    del bpy.types.Scene.ResoniteLink_live_rate
+    del bpy.types.Scene.ResoniteLink_live_geometry_delay
+    bpy.app.handlers.depsgraph_update_post.remove(onDepsgraphUpdatePost)
+    bpy.app.handlers.load_post.remove(onLoadPost)
 
     ResoniteLinkController.ShutdownAll()
+    shutdownTexturePool()
 
 
 # This allows you to run the script directly from Blender's Text editor
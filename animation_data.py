@@ -0,0 +1,247 @@
+# Blender Imports
+import bpy
+
+# Other imports
+import numpy as np
+from collections.abc import Hashable
+
+# Add-on file imports
+from .mesh_data import *
+
+# Animation baking.
+# The frame range is stepped through once on the main thread, reading the local matrix of every object on each frame.
+# Converting to Resonite space and reducing the keys runs on whole tracks at a time with NumPy.
+
+class TransformTrack():
+    """The keys of one slot member over the baked frame range, in Resonite space"""
+
+    def __init__(self, times : np.ndarray, values : np.ndarray):
+        self.times = times # float32 (keys,), 0 at the first frame and 1 at the last one
+        self.values = values # float32 (keys, 3) for positions and scales, (keys, 4) xyzw for rotations
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def points(self) -> tuple[tuple[float, tuple[float, ...]], ...]:
+        return tuple((float(time), tuple(float(v) for v in value)) for time, value in zip(self.times, self.values))
+
+
+class AnimationBake():
+    """Tracks of every object whose transform changes over the frame range"""
+
+    def __init__(self, duration : float):
+        self.duration = duration # seconds from the first to the last baked frame
+        self.tracks : dict[Hashable, dict[str, TransformTrack]] = {} # object key -> slot member -> track, only members that change
+
+    @property
+    def keyCount(self) -> int:
+        return sum(len(track) for tracks in self.tracks.values() for track in tracks.values())
+
+
+def readLocalMatrices(scene : bpy.types.Scene, objects : list[bpy.types.Object], frames : list[int]) -> np.ndarray:
+    """
+    Step through the frames and read the local matrix of every object, only call this on the main thread.
+
+    Parameters
+    ----------
+    scene : bpy.types.Scene
+        The scene to step through, its current frame is restored afterwards
+    objects : list[bpy.types.Object]
+        The objects to read
+    frames : list[int]
+        The frames to read them on
+
+    Returns
+    -------
+    matrices : numpy.ndarray
+        float32 (frames, objects, 4, 4)
+    """
+
+    matrices = np.empty((len(frames), len(objects), 4, 4), dtype=np.float32)
+    current = scene.frame_current
+    try:
+        for f, frame in enumerate(frames):
+            scene.frame_set(frame)
+            # Blender has no bulk accessor for matrices, one conversion per object and frame
+            for i, obj in enumerate(objects):
+                matrices[f, i] = obj.matrix_local
+    finally:
+        scene.frame_set(current)
+    return matrices
+
+def decomposeMatrices(matrices : np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split transform matrices into translations, rotations and scales, like Matrix.decompose() does for one.
+
+    Parameters
+    ----------
+    matrices : numpy.ndarray
+        float32 (..., 4, 4)
+
+    Returns
+    -------
+    translations : numpy.ndarray
+        float32 (..., 3)
+    rotations : numpy.ndarray
+        float32 (..., 4), quaternions as w, x, y, z
+    scales : numpy.ndarray
+        float32 (..., 3), always positive, negative scales come out as a rotation like they do for the slots
+    """
+
+    translations = matrices[..., :3, 3]
+    basis = matrices[..., :3, :3].astype(np.float64)
+    scales = np.linalg.norm(basis, axis=-2)
+    r = basis / np.maximum(scales, 1e-12)[..., None, :]
+
+    # Shepperd's method, every branch is computed and the one with the largest diagonal term is picked
+    trace = r[..., 0, 0] + r[..., 1, 1] + r[..., 2, 2]
+    candidates = np.stack([
+        np.stack([1.0 + trace, r[..., 2, 1] - r[..., 1, 2], r[..., 0, 2] - r[..., 2, 0], r[..., 1, 0] - r[..., 0, 1]], axis=-1),
+        np.stack([r[..., 2, 1] - r[..., 1, 2], 1.0 + r[..., 0, 0] - r[..., 1, 1] - r[..., 2, 2], r[..., 0, 1] + r[..., 1, 0], r[..., 0, 2] + r[..., 2, 0]], axis=-1),
+        np.stack([r[..., 0, 2] - r[..., 2, 0], r[..., 0, 1] + r[..., 1, 0], 1.0 - r[..., 0, 0] + r[..., 1, 1] - r[..., 2, 2], r[..., 1, 2] + r[..., 2, 1]], axis=-1),
+        np.stack([r[..., 1, 0] - r[..., 0, 1], r[..., 0, 2] + r[..., 2, 0], r[..., 1, 2] + r[..., 2, 1], 1.0 - r[..., 0, 0] - r[..., 1, 1] + r[..., 2, 2]], axis=-1),
+    ], axis=-2)
+    best = np.argmax(np.stack([trace, r[..., 0, 0], r[..., 1, 1], r[..., 2, 2]], axis=-1), axis=-1)
+    rotations = np.take_along_axis(candidates, best[..., None, None], axis=-2)[..., 0, :]
+    rotations /= np.linalg.norm(rotations, axis=-1, keepdims=True)
+    return translations.astype(np.float32), rotations.astype(np.float32), scales.astype(np.float32)
+
+def b2u_quaternion_array(q : np.ndarray) -> np.ndarray:
+    """
+    Convert an array of Blender quaternions to Unity quaternions, the same rotation b2u_euler2quaternion gives.
+
+    Parameters
+    ----------
+    q : numpy.ndarray
+        The Blender quaternions as w, x, y, z, shape (n, 4)
+
+    Returns
+    -------
+    q : numpy.ndarray
+        The Unity quaternions as x, y, z, w, shape (n, 4)
+    """
+
+    out = np.empty(q.shape, dtype=np.float32)
+    out[:, 0] = q[:, 1]
+    out[:, 1] = -q[:, 3]
+    out[:, 2] = q[:, 2]
+    out[:, 3] = q[:, 0]
+    return out
+
+def b2u_scale_array(s : np.ndarray) -> np.ndarray:
+    """
+    Convert an array of Blender scales to Unity scales.
+
+    Parameters
+    ----------
+    s : numpy.ndarray
+        The Blender scales, shape (n, 3)
+
+    Returns
+    -------
+    s : numpy.ndarray
+        The Unity scales, shape (n, 3)
+    """
+
+    return np.ascontiguousarray(s[:, [0, 2, 1]], dtype=np.float32)
+
+def alignQuaternions(q : np.ndarray) -> np.ndarray:
+    # q and -q are the same rotation, flip them so that every key is in the same hemisphere as the one before
+    # and interpolating between two keys takes the short way around
+    # q is (keys, ..., 4), every track along the first axis is aligned on its own
+    signs = np.where(np.sum(q[1:] * q[:-1], axis=-1) < 0.0, -1.0, 1.0)
+    signs = np.concatenate([np.ones((1,) + signs.shape[1:]), np.cumprod(signs, axis=0)])
+    return q * signs[..., None].astype(np.float32)
+
+def reduceKeys(times : np.ndarray, values : np.ndarray, tolerance : float) -> np.ndarray:
+    """
+    Pick the keys needed to interpolate tracks linearly without straying from them by more than the tolerance.
+
+    Like Ramer-Douglas-Peucker, segments are split at the key that strays furthest until every one of them is within
+    the tolerance. All segments of all tracks are split in the same pass, a track of n keys takes about log n passes.
+
+    Parameters
+    ----------
+    times : numpy.ndarray
+        float (n,), increasing, shared by all tracks
+    values : numpy.ndarray
+        float (tracks, n, k)
+    tolerance : float
+        The largest distance between a track and its interpolated keys
+
+    Returns
+    -------
+    keep : numpy.ndarray
+        bool (tracks, n), the first and last key of every track are always kept
+    """
+
+    trackCount, count = values.shape[:2]
+    keep = np.zeros((trackCount, count), dtype=bool)
+    keep[:, 0] = keep[:, -1] = True
+    if count <= 2:
+        return keep
+    index = np.arange(count)
+    rows = np.arange(trackCount)[:, None]
+    while True:
+        # the kept keys on either side of every key
+        prev = np.maximum.accumulate(np.where(keep, index, 0), axis=1)
+        next = np.minimum.accumulate(np.where(keep, index, count - 1)[:, ::-1], axis=1)[:, ::-1]
+        span = times[next] - times[prev]
+        t = np.divide(times - times[prev], span, out=np.zeros(span.shape), where=span > 0)[..., None]
+        start = values[rows, prev]
+        interpolated = start + (values[rows, next] - start) * t
+        errors = np.linalg.norm(values - interpolated, axis=2)
+        errors[keep] = 0.0
+        if not np.any(errors > tolerance):
+            return keep
+
+        # split every segment at its largest error, segments are told apart by the key they start at
+        segments = (rows * count + prev).ravel()
+        largest = np.zeros(trackCount * count)
+        np.maximum.at(largest, segments, errors.ravel())
+        keep |= (errors > tolerance) & (errors == largest[segments].reshape(errors.shape))
+
+def bakeTracks(matrices : np.ndarray, times : np.ndarray, tolerance : float) -> list[dict[str, TransformTrack]]:
+    """
+    Turn the local matrices of objects into reduced tracks of their slot members.
+
+    Parameters
+    ----------
+    matrices : numpy.ndarray
+        float32 (frames, objects, 4, 4) from readLocalMatrices
+    times : numpy.ndarray
+        float (frames,) the time of every frame, from 0 at the first one to 1 at the last one
+    tolerance : float
+        Largest error of the reduced tracks, in meters for positions, as a scale factor for scales
+        and as the distance between unit quaternions for rotations, which is about half the angle in radians
+
+    Returns
+    -------
+    tracks : list[dict[str, TransformTrack]]
+        The tracks of every object, members that stay within the tolerance of their first value have none
+    """
+
+    frameCount, objectCount = matrices.shape[:2]
+    times = np.asarray(times, dtype=np.float64)
+    translations, rotations, scales = decomposeMatrices(matrices)
+
+    # every conversion runs on all frames of all objects at once
+    flat = frameCount * objectCount
+    rotations = b2u_quaternion_array(rotations.reshape(flat, 4)).reshape(frameCount, objectCount, 4)
+    members = {
+        'position': b2u_coords_array(translations.reshape(flat, 3)).reshape(frameCount, objectCount, 3),
+        'rotation': alignQuaternions(rotations),
+        'scale': b2u_scale_array(scales.reshape(flat, 3)).reshape(frameCount, objectCount, 3),
+    }
+
+    result = [{} for _ in range(objectCount)]
+    for member, values in members.items():
+        values = values.transpose(1, 0, 2) # (objects, frames, k)
+        moving = np.flatnonzero(np.any(np.linalg.norm(values - values[:, :1], axis=2) > tolerance, axis=1))
+        if len(moving) == 0:
+            continue
+        keep = reduceKeys(times, values[moving].astype(np.float64), tolerance)
+        for row, i in enumerate(moving):
+            keys = np.flatnonzero(keep[row])
+            result[i][member] = TransformTrack(times[keys].astype(np.float32), np.ascontiguousarray(values[i, keys]))
+    return result
@@ -0,0 +1,226 @@
+"""
+Headless batch export, sends many .blend files to Resonite without opening the UI.
+
+    blender --background --python batch_export.py -- --port 2000 --workers 4 library/*.blend
+    python batch_export.py --blender /path/to/blender --port 2000 --workers 4 --summary summary.json library/*.blend
+
+The files are split between several Blender worker processes, each of them opens its files one after the other
+and sends them like "Send Scene" does. Meshes and textures are deduplicated between all workers through a shared
+folder of asset URLs. Once every worker is done, a JSON summary with the timings and failures of every file is
+printed to stdout, the output of the workers goes to stderr. The exit code is 1 if any file failed.
+
+The add-on has to be installed and enabled in Blender, or at least its wheels installed, for the workers to send anything.
+"""
+
+# Other imports
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import traceback
+import subprocess
+import importlib.util
+import concurrent.futures
+from collections.abc import Callable
+
+try:
+    # not available when the workers are launched from a plain Python
+    import bpy
+except ImportError:
+    bpy = None
+
+addonDir = os.path.dirname(os.path.abspath(__file__))
+
+
+def parseArgs(argv : list[str] = None):
+    if argv is None:
+        # Blender leaves its own arguments in sys.argv, the script's come after --
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(description="Send .blend files to Resonite through ResoniteLink, without the UI")
+    parser.add_argument("files", nargs="+", help=".blend files to send")
+    parser.add_argument("--port", type=int, default=2000, help="the ResoniteLink websocket port")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)), help="Blender processes sending at the same time")
+    parser.add_argument("--blender", default=None, help="the Blender executable, defaults to the one running this script")
+    parser.add_argument("--asset-dir", default=None, help="folder the workers share imported asset URLs through, keep it between runs to reuse them. A temporary one by default")
+    parser.add_argument("--summary", default=None, help="also write the JSON summary to this file")
+    parser.add_argument("--save", action="store_true", help="save every file after sending it, so the next run updates the same slots")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds a single file may take to connect and send")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# Launcher, runs the workers and collects their results.
+
+def runWorkers(args) -> dict:
+    blender = args.blender or (bpy.app.binary_path if bpy is not None else None)
+    if blender is None:
+        raise SystemExit("Pass the Blender executable with --blender when not running inside Blender")
+
+    files = [os.path.abspath(path) for path in args.files]
+    workerCount = max(1, min(args.workers, len(files)))
+    assetDir = args.asset_dir or tempfile.mkdtemp(prefix="resonitelink_assets_")
+    resultDir = tempfile.mkdtemp(prefix="resonitelink_batch_")
+    start = time.perf_counter()
+
+    workers = []
+    try:
+        for i in range(workerCount):
+            assigned = files[i::workerCount]
+            resultPath = os.path.join(resultDir, f"worker{i}.json")
+            command = [blender, "--background", "--online-mode", "--python", os.path.abspath(__file__), "--",
+                       "--worker", "--result", resultPath, "--port", str(args.port), "--asset-dir", assetDir, "--timeout", str(args.timeout)]
+            if args.save:
+                command.append("--save")
+            process = subprocess.Popen(command + assigned, stdout=sys.stderr, stderr=sys.stderr)
+            workers.append((process, resultPath, assigned))
+
+        results = []
+        for process, resultPath, assigned in workers:
+            returnCode = process.wait()
+            try:
+                with open(resultPath, "r") as f:
+                    results += json.load(f)['files']
+            except (OSError, ValueError, KeyError):
+                results += [{'file': path, 'ok': False, 'error': f"Worker exited with code {returnCode} without a result"} for path in assigned]
+    finally:
+        shutil.rmtree(resultDir, ignore_errors=True)
+        if args.asset_dir is None:
+            shutil.rmtree(assetDir, ignore_errors=True)
+
+    order = {path: i for i, path in enumerate(files)}
+    results.sort(key=lambda result: order.get(result['file'], len(order)))
+    failed = [result['file'] for result in results if not result['ok']]
+    return {
+        'ok': len(failed) == 0,
+        'workers': workerCount,
+        'seconds': time.perf_counter() - start,
+        'files': results,
+        'failed': failed,
+        'meshCacheHits': sum(result.get('meshCacheHits', 0) for result in results),
+        'textureCacheHits': sum(result.get('textureCacheHits', 0) for result in results),
+    }
+
+
+# Worker, runs inside Blender and sends its files one after the other.
+
+def loadAddon():
+    # the installed extension is registered already, otherwise the add-on next to this script is loaded and registered
+    for module in list(sys.modules.values()):
+        if hasattr(module, "ResoniteLinkController") and hasattr(module, "register"):
+            return module
+    spec = importlib.util.spec_from_file_location("resonitelink_batch", os.path.join(addonDir, "__init__.py"), submodule_search_locations=[addonDir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    module.register()
+    return module
+
+def waitFor(addon, condition : Callable[[], bool], timeout : float, what : str):
+    # nothing runs Blender's timers while this script runs, the add-on's main thread work is done here
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if addon.MainThreadTimers.RunPending() == 0:
+            time.sleep(0.002)
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"Timed out after {timeout:.0f} s waiting for {what}")
+
+def exportFile(addon, path : str, args) -> dict:
+    result = {'file': path, 'ok': False, 'error': None}
+    meshCache = addon.MeshAssetSlotData.assetCache
+    textureCache = addon.TextureAssetSlotData.assetCache
+    meshHits, textureHits = meshCache.hits, textureCache.hits
+    controller = None
+    thread = None
+    start = time.perf_counter()
+    try:
+        bpy.ops.wm.open_mainfile(filepath=path)
+        scene = bpy.context.scene
+        scene.ResoniteLink_port = str(args.port)
+        result['openSeconds'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        controller = addon.ResoniteLinkController.Get(scene)
+        thread = threading.Thread(target=controller.startResoLink, args=[bpy.context])
+        thread.start()
+        waitFor(addon, lambda: controller.clientStarted or controller.clientError or not thread.is_alive(), args.timeout, "the connection")
+        if not controller.clientStarted:
+            raise ConnectionError(controller.lastError or f"Could not connect to ResoniteLink on port {args.port}")
+        result['connectSeconds'] = time.perf_counter() - start
+
+        sent = concurrent.futures.Future()
+        async def send():
+            try:
+                sent.set_result(await controller.sendSceneAsync(scene))
+            except Exception as e:
+                sent.set_exception(e)
+        controller.queueAction(send)
+        waitFor(addon, sent.done, args.timeout, "the send")
+        # the slot mapping is written to the scene by a main thread timer
+        addon.MainThreadTimers.RunPending()
+
+        stats = controller.lastStats
+        if stats is not None:
+            result['sendSeconds'] = stats.duration
+            result['phases'] = stats.phaseTotals()
+            result['requests'] = stats.requestCount
+            result['failedRequests'] = stats.failedRequests
+            result['bytesSent'] = stats.bytesSent
+        sent.result()
+
+        if args.save:
+            bpy.ops.wm.save_mainfile()
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = "".join(traceback.format_exception_only(e)).strip()
+        traceback.print_exc()
+    finally:
+        if controller is not None:
+            controller.requestShutdown()
+        if thread is not None:
+            try:
+                waitFor(addon, lambda: not thread.is_alive(), 10.0, "the connection to close")
+            except TimeoutError:
+                pass
+    result['meshCacheHits'] = meshCache.hits - meshHits
+    result['textureCacheHits'] = textureCache.hits - textureHits
+    return result
+
+def runWorker(args) -> dict:
+    addon = loadAddon()
+    addon.MainThreadTimers.headless = True
+    addon.MeshAssetSlotData.assetCache.shared = addon.SharedAssetStore(os.path.join(args.asset_dir, "meshes"))
+    addon.TextureAssetSlotData.assetCache.shared = addon.SharedAssetStore(os.path.join(args.asset_dir, "textures"))
+    return {'files': [exportFile(addon, os.path.abspath(path), args) for path in args.files]}
+
+
+def main(argv : list[str] = None) -> int:
+    args = parseArgs(argv)
+    if args.worker:
+        if bpy is None:
+            raise SystemExit("Workers only run inside Blender")
+        output = runWorker(args)
+        if args.result is not None:
+            with open(args.result, "w") as f:
+                json.dump(output, f)
+        return 0 if all(result['ok'] for result in output['files']) else 1
+
+    summary = runWorkers(args)
+    text = json.dumps(summary, indent=2)
+    print(text, flush=True)
+    if args.summary is not None:
+        with open(args.summary, "w") as f:
+            f.write(text)
+    return 0 if summary['ok'] else 1
+
+if __name__ == "__main__":
+    code = main()
+    if bpy is not None and bpy.app.background:
+        # Blender would keep going with its own command line otherwise
+        sys.stdout.flush()
+        os._exit(code)
+    sys.exit(code)
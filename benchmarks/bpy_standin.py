@@ -0,0 +1,416 @@
+# Other imports
+import sys
+import math
+import time
+import types
+import threading
+import numpy as np
+
+# Lightweight stand-in for the parts of the bpy and mathutils API that the add-on touches,
+# so that mesh extraction can be benchmarked and whole sends can be run without Blender.
+# Collections are backed by numpy arrays, foreach_get is a plain copy like it is in Blender,
+# and indexing returns element views for the per-loop legacy path.
+
+class Vector(tuple):
+    x = property(lambda self: self[0])
+    y = property(lambda self: self[1])
+    z = property(lambda self: self[2])
+
+    def to_tuple(self) -> tuple:
+        return tuple(self)
+
+
+class Quaternion():
+
+    def __init__(self, w : float, x : float, y : float, z : float):
+        self.w = w
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def __matmul__(self, other : 'Quaternion') -> 'Quaternion':
+        return Quaternion(
+            self.w * other.w - self.x * other.x - self.y * other.y - self.z * other.z,
+            self.w * other.x + self.x * other.w + self.y * other.z - self.z * other.y,
+            self.w * other.y - self.x * other.z + self.y * other.w + self.z * other.x,
+            self.w * other.z + self.x * other.y - self.y * other.x + self.z * other.w
+        )
+
+
+class Euler():
+
+    def __init__(self, angles=(0.0, 0.0, 0.0), order : str = "XYZ"):
+        self.x, self.y, self.z = angles
+        self.order = order
+
+    def to_quaternion(self) -> Quaternion:
+        axes = {
+            'X': Quaternion(math.cos(self.x / 2), math.sin(self.x / 2), 0.0, 0.0),
+            'Y': Quaternion(math.cos(self.y / 2), 0.0, math.sin(self.y / 2), 0.0),
+            'Z': Quaternion(math.cos(self.z / 2), 0.0, 0.0, math.sin(self.z / 2)),
+        }
+        # the first axis of the order is applied first
+        q = Quaternion(1.0, 0.0, 0.0, 0.0)
+        for axis in self.order:
+            q = axes[axis] @ q
+        return q
+
+
+class Matrix():
+    """A transform made of a translation and an XYZ euler rotation, without scale"""
+
+    def __init__(self, location=(0.0, 0.0, 0.0), rotation=(0.0, 0.0, 0.0)):
+        self.translation = Vector(location)
+        self.rotation = rotation
+
+    def to_euler(self, order : str = "XYZ") -> Euler:
+        # only exact for rotations around a single axis, which is all the generated scenes use
+        return Euler(self.rotation, order)
+
+    def to_scale(self) -> Vector:
+        return Vector((1.0, 1.0, 1.0))
+
+    def copy(self) -> 'Matrix':
+        return Matrix(tuple(self.translation), self.rotation)
+
+
+class Element():
+    """One item of a Collection, reads its attributes from the backing arrays"""
+
+    def __init__(self, collection : 'Collection', index : int):
+        self._collection = collection
+        self._index = index
+
+    def __getattr__(self, attr : str):
+        if attr not in self._collection._arrays:
+            raise AttributeError(attr)
+        value = self._collection._arrays[attr][self._index]
+        if isinstance(value, np.ndarray):
+            return Vector(value.tolist())
+        return value.item()
+
+
+class Collection():
+
+    def __init__(self, length : int, **arrays : np.ndarray):
+        self._length = length
+        self._arrays = arrays
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index : int) -> Element:
+        if index < 0 or index >= self._length:
+            raise IndexError(index)
+        return Element(self, index)
+
+    def __iter__(self):
+        return (Element(self, i) for i in range(self._length))
+
+    def foreach_get(self, attr : str, out : np.ndarray):
+        out[:] = self._arrays[attr].ravel()
+
+
+class Layer():
+
+    def __init__(self, name : str, data : Collection, domain : str = 'CORNER'):
+        self.name = name
+        self.data = data
+        self.domain = domain
+
+
+class Mesh():
+    """
+    An evaluated, already triangulated mesh.
+
+    Parameters
+    ----------
+    positions : numpy.ndarray
+        float32 (vertCount, 3)
+    polyLoopTotals : numpy.ndarray
+        int32 (polyCount,), the number of corners of every polygon, polygons use consecutive loops
+    loopVerts : numpy.ndarray
+        int32 (loopCount,)
+    normals : numpy.ndarray
+        float32 (loopCount, 3)
+    triLoops : numpy.ndarray
+        int32 (triCount, 3)
+    triPolys : numpy.ndarray
+        int32 (triCount,)
+    materials : numpy.ndarray
+        int32 (polyCount,)
+    uvs : list[numpy.ndarray]
+        float32 (loopCount, 2) per uv layer
+    colors : numpy.ndarray
+        float32 (vertCount or loopCount, 4) or None
+    colorDomain : str
+        'POINT' or 'CORNER'
+    """
+
+    def __init__(self, name : str, positions, polyLoopTotals, loopVerts, normals, triLoops, triPolys, materials, uvs, colors=None, colorDomain='CORNER'):
+        self.name = name
+        self.name_full = name
+        self.id_type = "MESH"
+        self.original = self
+        self.session_uid = id(self)
+        self.materials : list['Material'] = []
+        self.vertices = Collection(len(positions), co=positions)
+        self.polygons = Collection(len(polyLoopTotals), loop_total=polyLoopTotals, material_index=materials)
+        self.loop_triangles = Collection(len(triLoops), loops=triLoops, polygon_index=triPolys)
+        self.loop_triangle_polygons = Collection(len(triLoops), value=triPolys)
+        self.uv_layers = [Layer(f"UVMap{i}" if i > 0 else "UVMap", Collection(len(loopVerts), uv=uv)) for i, uv in enumerate(uvs)]
+        self.color_attributes = []
+        if colors is not None:
+            self.color_attributes.append(Layer("Color", Collection(len(colors), color=colors), colorDomain))
+
+        self.loops = Collection(len(loopVerts), vertex_index=loopVerts, normal=normals)
+
+    def evaluated_get(self, depsgraph : 'Depsgraph') -> 'Mesh':
+        return self
+
+    def calc_loop_triangles(self):
+        pass
+
+    def calc_tangents(self):
+        # a fixed tangent frame is enough to exercise the code, the values aren't checked
+        loopCount = len(self.loops)
+        tangents = np.zeros((loopCount, 3), dtype=np.float32)
+        tangents[:, 0] = 1.0
+        self.loops._arrays['tangent'] = tangents
+        self.loops._arrays['bitangent_sign'] = np.where(np.arange(loopCount) % 7 == 0, -1.0, 1.0).astype(np.float32)
+
+    def free_tangents(self):
+        self.loops._arrays.pop('tangent', None)
+        self.loops._arrays.pop('bitangent_sign', None)
+
+    @property
+    def vertexCount(self) -> int:
+        return len(self.vertices)
+
+
+class ID():
+
+    def __init__(self, name : str, idType : str):
+        self.name = name
+        self.name_full = name
+        self.id_type = idType
+        self.original = self
+        self.session_uid = id(self)
+
+
+class Material(ID):
+
+    def __init__(self, name : str, baseColor=(0.8, 0.8, 0.8, 1.0), image : 'Image' = None):
+        super().__init__(name, "MATERIAL")
+        self.node_tree = NodeTree.Principled(baseColor, image)
+
+
+class Pixels():
+
+    def __init__(self, data : np.ndarray):
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def foreach_get(self, out : np.ndarray):
+        out[:] = self.data
+
+
+class Image(ID):
+    """An RGBA image filled with noise, so that no two images hash the same unless they were made with the same seed"""
+
+    def __init__(self, name : str, width : int, height : int, seed : int = 0, isData : bool = False):
+        super().__init__(name, "IMAGE")
+        self.size = (width, height)
+        self.channels = 4
+        self.pixels = Pixels(np.random.default_rng(seed).random(width * height * 4, dtype=np.float32))
+        self.colorspace_settings = types.SimpleNamespace(name="Non-Color" if isData else "sRGB", is_data=isData)
+
+
+class NodeSocket():
+
+    def __init__(self, name : str, default_value = None):
+        self.name = name
+        self.default_value = default_value
+        self.links : list[types.SimpleNamespace] = []
+
+    @property
+    def is_linked(self) -> bool:
+        return len(self.links) > 0
+
+
+class NodeSockets(list):
+
+    def get(self, name : str, default = None) -> NodeSocket:
+        return next((socket for socket in self if socket.name == name), default)
+
+
+class Node():
+
+    def __init__(self, type : str, inputs : list[NodeSocket], image : 'Image' = None):
+        self.type = type
+        self.inputs = NodeSockets(inputs)
+        self.image = image
+
+
+class NodeTree():
+
+    def __init__(self, nodes : list[Node]):
+        self.nodes = nodes
+
+    @classmethod
+    def Principled(cls, baseColor, image : 'Image' = None) -> 'NodeTree':
+        baseColorSocket = NodeSocket("Base Color", baseColor)
+        nodes = [Node('BSDF_PRINCIPLED', [baseColorSocket, NodeSocket("Metallic", 0.0), NodeSocket("Roughness", 0.5), NodeSocket("Normal")])]
+        if image is not None:
+            texture = Node('TEX_IMAGE', [NodeSocket("Vector")], image)
+            baseColorSocket.links.append(types.SimpleNamespace(from_node=texture))
+            nodes.append(texture)
+        return NodeTree(nodes)
+
+
+class Object(ID):
+
+    def __init__(self, name : str, data : Mesh = None, parent : 'Object' = None, location=(0.0, 0.0, 0.0), rotation=(0.0, 0.0, 0.0)):
+        super().__init__(name, "OBJECT")
+        self.data = data
+        self.type = "MESH" if data is not None else "EMPTY"
+        self.parent = parent
+        self.matrix_local = Matrix(location, rotation)
+        self.matrix_world = Matrix(location, rotation) # parents are ignored, only skinning reads it
+        self.parent_type = 'OBJECT'
+        self.modifiers = []
+        self.hide_render = False
+        self.hide_viewport = False
+        self.track_axis = 'POS_Y'
+        self.up_axis = 'Z'
+
+    def evaluated_get(self, depsgraph : 'Depsgraph') -> 'Object':
+        return self
+
+    def visible_get(self) -> bool:
+        return not self.hide_viewport
+
+
+scenes : list['Scene'] = [] # bpy.data.scenes, every scene that was made
+
+class Scene(ID):
+    """A scene with the add-on's properties at their defaults, override them as attributes"""
+
+    def __init__(self, name : str, objects : list[Object]):
+        super().__init__(name, "SCENE")
+        scenes.append(self)
+        self.objects = objects
+        self.properties : dict = {}
+        self.ResoniteLink_port = "2000"
+        self.ResoniteLink_max_in_flight = 16
+        self.ResoniteLink_chunk_vertex_budget = 1000000
+        self.ResoniteLink_chunk_size_mb = 64
+        self.ResoniteLink_lod_mode = 'OFF'
+        self.ResoniteLink_lod_ratio = 0.05
+        self.ResoniteLink_lod_min_vertices = 20000
+        self.ResoniteLink_texture_max_size = 2048
+        self.ResoniteLink_texture_cache_dir = ""
+        self.ResoniteLink_trace_dir = ""
+        self.ResoniteLink_auto_send = False
+        self.ResoniteLink_live_mode = False
+
+    def get(self, key : str, default=None):
+        return self.properties.get(key, default)
+
+    def __getitem__(self, key : str):
+        return self.properties[key]
+
+    def __setitem__(self, key : str, value):
+        self.properties[key] = value
+
+
+class Depsgraph():
+
+    def __init__(self):
+        self.object_instances = [] # generated scenes have no instances
+        self.updates = []
+
+
+class Timers():
+    """bpy.app.timers, the registered functions run whenever the thread standing in for the main thread calls pump"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending : list = []
+
+    def register(self, func, first_interval : float = 0, persistent : bool = False):
+        self.lock.acquire()
+        self.pending.append((time.perf_counter() + first_interval, func))
+        self.lock.release()
+
+    def is_registered(self, func) -> bool:
+        return any(f == func for _, f in self.pending)
+
+    def unregister(self, func):
+        self.lock.acquire()
+        self.pending = [(due, f) for due, f in self.pending if f != func]
+        self.lock.release()
+
+    def pump(self):
+        now = time.perf_counter()
+        self.lock.acquire()
+        due = [(t, f) for t, f in self.pending if t <= now]
+        self.pending = [(t, f) for t, f in self.pending if t > now]
+        self.lock.release()
+        for _, func in due:
+            interval = func()
+            if interval is not None:
+                self.register(func, interval)
+
+
+def install():
+    """Register the stand-in bpy and mathutils modules, unless the real ones can be imported"""
+
+    try:
+        import bpy
+        return
+    except ImportError:
+        pass
+
+    bpy = types.ModuleType("bpy")
+    bpy.types = types.SimpleNamespace(**{name: type(name, (), {}) for name in [
+        'Context', 'DepsgraphObjectInstance', 'MeshLoopTriangle', 'NodeSocket', 'Panel', 'Operator', 'PoseBone', 'PropertyGroup',
+    ]})
+    bpy.types.Image = Image
+    bpy.types.ID = ID
+    bpy.types.Mesh = Mesh
+    bpy.types.Object = Object
+    bpy.types.Scene = Scene
+    bpy.types.Material = Material
+    bpy.types.Depsgraph = Depsgraph
+    bpy.props = types.SimpleNamespace(**{name: (lambda *args, **kwargs: None) for name in [
+        'StringProperty', 'IntProperty', 'FloatProperty', 'BoolProperty', 'EnumProperty', 'PointerProperty',
+    ]})
+    bpy.app = types.SimpleNamespace(
+        timers=Timers(),
+        handlers=types.SimpleNamespace(persistent=lambda func: func, depsgraph_update_post=[], load_post=[], save_pre=[]),
+        online_access=True,
+        background=True,
+        version=(4, 2, 0)
+    )
+    depsgraph = Depsgraph()
+    bpy.context = types.SimpleNamespace(evaluated_depsgraph_get=lambda: depsgraph, scene=None)
+    bpy.data = types.SimpleNamespace(materials=[], objects=[], meshes=[], scenes=scenes)
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+    bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+    sys.modules["bpy"] = bpy
+
+    bpy_extras = types.ModuleType("bpy_extras")
+    bpy_extras.io_utils = types.ModuleType("bpy_extras.io_utils")
+    bpy_extras.io_utils.ExportHelper = type("ExportHelper", (), {})
+    sys.modules["bpy_extras"] = bpy_extras
+    sys.modules["bpy_extras.io_utils"] = bpy_extras.io_utils
+
+    mathutils = types.ModuleType("mathutils")
+    mathutils.Euler = Euler
+    mathutils.Matrix = Matrix
+    mathutils.Quaternion = Quaternion
+    mathutils.Vector = Vector
+    sys.modules["mathutils"] = mathutils
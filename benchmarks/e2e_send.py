@@ -0,0 +1,173 @@
+"""
+End-to-end send benchmark: drives ResoniteLinkController against the local stand-in server.
+
+Generates scenes of increasing size from the stand-in bpy, connects the controller to a stand-in server running
+in the same process and sends every scene twice, once from scratch and once more with nothing changed.
+Needs ResoniteLink.py and websockets installed.
+
+    python benchmarks/e2e_send.py --objects 10 100 1000 --latency-ms 5
+    python benchmarks/e2e_send.py --objects 200 --bandwidth-mbps 50 --failure-rate 0.01 --log requests.jsonl
+    python benchmarks/e2e_send.py --objects 100 --texture-size 1024
+
+Options that aren't listed here are passed on to the stand-in server, see standin_server.py --help.
+"""
+
+# Other imports
+import os
+import sys
+import time
+import json
+import types
+import asyncio
+import argparse
+import threading
+import importlib.util
+
+benchmarksDir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, benchmarksDir)
+
+# Benchmark imports
+import bpy_standin
+bpy_standin.install()
+import bpy
+from meshes import quadGrid
+from standin_server import StandInServer, parseArgs, serverFromArgs
+
+addonPackage = "resonitelink_addon"
+
+def importAddon() -> types.ModuleType:
+    # imported as a package under its own name, like Blender does for extensions
+    spec = importlib.util.spec_from_file_location(addonPackage, os.path.join(os.path.dirname(benchmarksDir), "__init__.py"),
+                                                  submodule_search_locations=[os.path.dirname(benchmarksDir)])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[addonPackage] = addon
+    spec.loader.exec_module(addon)
+    return addon
+
+def buildScene(objectCount : int, uniqueMeshes : int, meshSize : int, textureSize : int, port : int) -> bpy.types.Scene:
+    # four materials shared by the meshes, each showing an image of its own if there are textures
+    materials = []
+    for i in range(4):
+        image = bpy.types.Image(f"Texture{i}", textureSize, textureSize, seed=i) if textureSize > 0 else None
+        materials.append(bpy.types.Material(f"Material{i}", image=image))
+
+    meshes = []
+    for i in range(uniqueMeshes):
+        mesh = quadGrid(meshSize, seed=i)
+        mesh.name = mesh.name_full = f"Mesh{i}"
+        mesh.materials = [materials[i % 4]]
+        meshes.append(mesh)
+
+    # every tenth object is an empty, the rest are parented to the empty before them
+    objects = []
+    parent = None
+    for i in range(objectCount):
+        if i % 10 == 0:
+            parent = bpy.types.Object(f"Group{i // 10}", location=(i * 0.1, 0.0, 0.0))
+            objects.append(parent)
+        else:
+            objects.append(bpy.types.Object(f"Object{i}", meshes[i % uniqueMeshes], parent, location=(0.0, i * 0.01, 0.0), rotation=(0.0, 0.0, i * 0.1)))
+
+    scene = bpy.types.Scene(f"Scene{objectCount}", objects)
+    scene.ResoniteLink_port = str(port)
+    bpy.data.materials = materials
+    return scene
+
+def waitFor(condition, timeout : float) -> bool:
+    # this thread stands in for Blender's main thread and runs the timers while waiting
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        bpy.app.timers.pump()
+        time.sleep(0.001)
+    return True
+
+def runScene(addon : types.ModuleType, server : StandInServer, scene : bpy.types.Scene, timeout : float) -> list[dict]:
+    addon.SlotRegistry.ForScene(scene).clear()
+    addon.MeshAssetSlotData.assetCache.clear()
+    addon.TextureAssetSlotData.assetCache.clear()
+    server.reset()
+
+    controller = addon.ResoniteLinkController(scene)
+    context = types.SimpleNamespace(scene=scene)
+    clientThread = threading.Thread(target=controller.startResoLink, args=(context,), daemon=True)
+    clientThread.start()
+    if not waitFor(lambda: controller.clientStarted or controller.clientError, timeout):
+        raise TimeoutError("The client did not connect")
+    if controller.clientError:
+        raise RuntimeError(controller.lastError)
+
+    results = []
+    for label in ["first send", "repeat send"]:
+        requestsBefore = len(server.records)
+        start = time.perf_counter()
+        controller.lastStats = None
+        if not controller.queueSend():
+            raise RuntimeError("The send could not be queued")
+        if not waitFor(lambda: controller.lastStats is not None and not controller.isBusy(), timeout):
+            raise TimeoutError(f"The {label} did not finish")
+        wallTime = time.perf_counter() - start
+
+        stats = controller.lastStats
+        records = server.records[requestsBefore:]
+        roundTrips = [record.respondedTime - record.receivedTime for record in records if record.respondedTime is not None]
+        results.append({
+            'objects': len(scene.objects),
+            'send': label,
+            'wallTime': wallTime,
+            'requests': stats.requestCount,
+            'failedRequests': stats.failedRequests,
+            'skippedUpdates': stats.skippedUpdates,
+            'serverRequests': len(records),
+            'serverBytes': sum(record.byteCount for record in records),
+            'meanServerTime': sum(roundTrips) / len(roundTrips) if len(roundTrips) > 0 else 0.0,
+            'meanClientRoundTrip': sum(stats.requestTimes.values()) / stats.requestCount if stats.requestCount > 0 else 0.0,
+            'phases': stats.phaseTotals(),
+        })
+        print(f"{len(scene.objects):>6} objects, {label:<12} {wallTime:>8.3f} s, {stats.requestCount:>6} requests "
+              f"({stats.failedRequests} failed), {results[-1]['serverBytes'] / (1024 * 1024):>8.2f} MiB, "
+              f"round trip {results[-1]['meanClientRoundTrip'] * 1000:.2f} ms", flush=True)
+
+    controller.requestShutdown()
+    waitFor(lambda: not clientThread.is_alive(), timeout)
+    return results
+
+def main(argv : list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end send benchmark against the ResoniteLink stand-in", add_help=False)
+    parser.add_argument("--objects", type=int, nargs="+", default=[10, 100, 1000], help="scene sizes to send")
+    parser.add_argument("--unique-meshes", type=int, default=10, help="meshes shared between the objects")
+    parser.add_argument("--mesh-size", type=int, default=64, help="vertices along each side of the generated grids")
+    parser.add_argument("--texture-size", type=int, default=0, help="pixels along each side of the material images, 0 for untextured materials")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds a send may take")
+    parser.add_argument("--save", default=None, help="write the results to this JSON file")
+    args, serverArgv = parser.parse_known_args(argv)
+    serverArgs = parseArgs(serverArgv)
+
+    try:
+        addon = importAddon()
+    except ImportError as e:
+        print(f"The add-on can't be imported ({e}), ResoniteLink.py needs to be installed")
+        return 1
+
+    server = serverFromArgs(serverArgs)
+    ready = threading.Event()
+    serverThread = threading.Thread(target=lambda: asyncio.run(server.serveAsync(serverArgs.host, serverArgs.port, ready=ready)), daemon=True)
+    serverThread.start()
+    ready.wait()
+
+    results = []
+    for objectCount in args.objects:
+        scene = buildScene(objectCount, min(args.unique_meshes, objectCount), args.mesh_size, args.texture_size, serverArgs.port)
+        results += runScene(addon, server, scene, args.timeout)
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if serverArgs.log is not None:
+        server.saveLog(serverArgs.log)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# Other imports
+import numpy as np
+
+# Benchmark imports
+from bpy_standin import Mesh
+
+# The original per-loop mesh extraction, hashing every corner into a dictionary one by one.
+# It is not part of the add-on anymore, it is kept here as the reference that the vectorized
+# extraction in mesh_data.py must match, and to time the two against each other.
+
+def b2u_coords(x, y, z):
+    # the scalar conversion the add-on used, the same as b2u_coords_array
+    return -x, z, -y
+
+def collectMeshDataLegacy(mesh : Mesh) -> dict:
+    """
+    Extract a mesh corner by corner through RNA like the add-on used to.
+
+    Returns the values the model objects were built from, as plain tuples and lists.
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh to read
+
+    Returns
+    -------
+    data : dict
+        positions, normals, tangents and colors as tuples per vertex, uvs as a flat list per layer,
+        submeshes as a list of triangle indices per material, sorted by material index
+    """
+
+    # Triangulate the evaluated mesh
+    mesh.calc_loop_triangles()
+
+    hasTangents = False
+    # tangent calculation only works for tris and quads, also it needs a UV map
+    if not any(poly.loop_total < 3 or poly.loop_total > 4 for poly in mesh.polygons) and len(mesh.uv_layers) > 0:
+        hasTangents = True
+        mesh.calc_tangents()
+
+    # Get all UV Sets
+    uv_layers = mesh.uv_layers
+
+    # Get vertex color attributes (Limited to the first color group)
+    vertex_colors = -1
+    vertex_color_domain = 'CORNER'  # Default domain
+    if (len(mesh.color_attributes) > 0):
+        vertex_colors = mesh.color_attributes[0]
+        vertex_color_domain = vertex_colors.domain
+
+    # Save a dictionary of unique vertex hashes for fast indexing
+    v_map = {}
+    idmax = 0   # Current maximum vertex ID
+
+    # Create output lists
+    verts = []  # Position data of each vertex (replicated)
+    colors = []  # Currently limited to 1 color attribute per vertex
+    normals = []  # Normals per vertex
+    tangents = []  # Tangents per vertex
+    uvs = [[] for _ in uv_layers]  # List of uv lists per uv set
+    submeshes = []  # List of lists of triangle indices, per material
+
+    # Loop through all triangles and store their indices according
+    # to their material ID
+    tri_map = {}  # A dictionary of material ID mapped to triangle indices
+    for tri in mesh.loop_triangles:
+        # Get the material ID for this triangle
+        mat_id = mesh.polygons[tri.polygon_index].material_index
+
+        # If the current material doesn't exist in the map add it
+        if (mat_id not in tri_map):
+            tri_map[mat_id] = []
+
+        # Append triangles to the submesh map (reverse winding order)
+        for loop_idx in reversed(tri.loops):
+            # Extract vertex information
+            vidx = mesh.loops[loop_idx].vertex_index
+            vpos = mesh.vertices[vidx].co
+            vnor = mesh.loops[loop_idx].normal
+            vuvs = [(layer.name, layer.data[loop_idx].uv) for layer in uv_layers]
+            vtan = mesh.loops[loop_idx].tangent
+            vcol = None
+            if (vertex_colors != -1):
+                # Check the domain of the color attribute before assignment
+                col_idx = vidx if (vertex_color_domain == 'POINT') else loop_idx
+                vcol = vertex_colors.data[col_idx].color
+
+            # Construct a unique hash for the vertex
+            vhash = (
+                int(vidx),
+                (vnor.x, vnor.y, vnor.z),
+                tuple((name, uv.x, uv.y) for name, uv in vuvs),
+                (vcol[0], vcol[1], vcol[2], vcol[3]) if (vertex_colors != -1) else None,
+                (vtan.x, vtan.y, vtan.z) if hasTangents else None
+            )
+
+            # Check if the vertex exists uniquely and get its id
+            if (not vhash in v_map):
+                # Store the new index
+                v_map[vhash] = idmax
+                v_tid = idmax
+                idmax = idmax + 1
+
+                # Store new data for this vertex
+                verts.append(b2u_coords(vpos.x, vpos.y, vpos.z))
+                if (vertex_colors != -1):
+                    colors.append((vcol[0], vcol[1], vcol[2], vcol[3]))
+                normals.append(b2u_coords(vnor[0], vnor[1], vnor[2]))
+                if hasTangents:
+                    tangents.append((*b2u_coords(*vtan), -mesh.loops[loop_idx].bitangent_sign))
+                for uid, layer in enumerate(vuvs):
+                    uvs[uid].append(layer[1][0])
+                    uvs[uid].append(layer[1][1])
+            else:
+                # Retrieve the old index
+                v_tid = v_map[vhash]
+
+            # Append the vertex index to the triangle map
+            tri_map[mat_id].append(v_tid)
+
+    # Expand the triangle map into a list of lists (sorted by material id)
+    for mid in sorted(tri_map):
+        submeshes.append(tri_map[mid])
+
+    if hasTangents:
+        mesh.free_tangents()
+
+    return {
+        'positions': verts,
+        'submeshes': submeshes,
+        'colors': colors if (vertex_colors != -1) else None,
+        'normals': normals,
+        'uvs': uvs,
+        'tangents': tangents if hasTangents else None
+    }
+
+def meshBuffersToLegacyData(buffers) -> dict:
+    """The buffers of the vectorized extraction in the form collectMeshDataLegacy returns"""
+
+    def rows(arr : np.ndarray) -> list[tuple] | None:
+        return [tuple(row) for row in arr.tolist()] if arr is not None else None
+
+    return {
+        'positions': rows(buffers.positions),
+        'submeshes': [indices.tolist() for indices in buffers.submeshes],
+        'colors': rows(buffers.colors),
+        'normals': rows(buffers.normals),
+        'uvs': [uv.ravel().tolist() for uv in buffers.uvs],
+        'tangents': rows(buffers.tangents)
+    }
@@ -0,0 +1,194 @@
+# Other imports
+import numpy as np
+
+# Benchmark imports
+from bpy_standin import Mesh
+
+# Generated meshes covering the cases the extraction code branches on:
+# quads and triangles, shared and split normals, one or several materials and uv layers,
+# and colors stored per point or per corner.
+
+def quadGrid(size : int, materialCount : int = 1, uvLayers : int = 1, colorDomain : str = None, uvSeams : bool = False, seed : int = 0) -> Mesh:
+    """
+    A wavy grid of size x size vertices made of quads.
+
+    Parameters
+    ----------
+    size : int
+        Vertices along each side
+    materialCount : int
+        Polygons get a random material index below this
+    uvLayers : int
+        Number of uv layers
+    colorDomain : str
+        None for no color attribute, otherwise 'POINT' or 'CORNER'
+    uvSeams : bool
+        Give every quad its own uv island, so no corners can be merged
+    seed : int
+        Seed for the material indices and colors
+
+    Returns
+    -------
+    mesh : Mesh
+        The stand-in mesh
+    """
+
+    rng = np.random.default_rng(seed)
+    u, v = np.meshgrid(np.linspace(0.0, 1.0, size, dtype=np.float32), np.linspace(0.0, 1.0, size, dtype=np.float32))
+    height = 0.05 * np.sin(u * 12.0) * np.cos(v * 9.0)
+    positions = np.stack([u, v, height], axis=-1).reshape(-1, 3).astype(np.float32)
+
+    # quads in counter-clockwise corner order
+    i, j = np.meshgrid(np.arange(size - 1), np.arange(size - 1))
+    a = (j * size + i).ravel()
+    quads = np.stack([a, a + 1, a + 1 + size, a + size], axis=1).astype(np.int32)
+    polyCount = len(quads)
+    loopVerts = quads.ravel()
+
+    # smooth shading, every corner of a vertex has the same normal
+    gradU = 0.05 * 12.0 * np.cos(u * 12.0) * np.cos(v * 9.0)
+    gradV = -0.05 * 9.0 * np.sin(u * 12.0) * np.sin(v * 9.0)
+    vertNormals = np.stack([-gradU, -gradV, np.ones_like(u)], axis=-1).reshape(-1, 3)
+    vertNormals /= np.linalg.norm(vertNormals, axis=1, keepdims=True)
+    normals = vertNormals.astype(np.float32)[loopVerts]
+
+    uvs = []
+    for layer in range(uvLayers):
+        if uvSeams:
+            corner = np.tile(np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype=np.float32), (polyCount, 1))
+            uvs.append(corner * (layer + 1))
+        else:
+            uvs.append(positions[loopVerts, :2] * (layer + 1))
+
+    colors = None
+    if colorDomain == 'POINT':
+        colors = rng.random((len(positions), 4), dtype=np.float32)
+    elif colorDomain == 'CORNER':
+        colors = rng.random((len(loopVerts), 4), dtype=np.float32)
+
+    starts = np.arange(polyCount, dtype=np.int32) * 4
+    triLoops = np.empty((polyCount * 2, 3), dtype=np.int32)
+    triLoops[0::2] = np.stack([starts, starts + 1, starts + 2], axis=1)
+    triLoops[1::2] = np.stack([starts, starts + 2, starts + 3], axis=1)
+    triPolys = np.repeat(np.arange(polyCount, dtype=np.int32), 2)
+
+    return Mesh(
+        f"grid{size}",
+        positions=positions,
+        polyLoopTotals=np.full(polyCount, 4, dtype=np.int32),
+        loopVerts=loopVerts,
+        normals=normals,
+        triLoops=triLoops,
+        triPolys=triPolys,
+        materials=rng.integers(0, materialCount, polyCount, dtype=np.int32),
+        uvs=uvs,
+        colors=colors,
+        colorDomain=colorDomain or 'CORNER'
+    )
+
+def icosphere(subdivisions : int, flat : bool = False) -> Mesh:
+    """
+    A unit sphere made of triangles, by subdividing an icosahedron.
+
+    Parameters
+    ----------
+    subdivisions : int
+        Number of times every triangle is split into four
+    flat : bool
+        Use face normals, so every corner becomes its own vertex
+
+    Returns
+    -------
+    mesh : Mesh
+        The stand-in mesh
+    """
+
+    t = (1.0 + 5.0 ** 0.5) / 2.0
+    positions = np.array([
+        [-1, t, 0], [1, t, 0], [-1, -t, 0], [1, -t, 0],
+        [0, -1, t], [0, 1, t], [0, -1, -t], [0, 1, -t],
+        [t, 0, -1], [t, 0, 1], [-t, 0, -1], [-t, 0, 1],
+    ], dtype=np.float64)
+    faces = np.array([
+        [0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+        [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+        [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+        [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1],
+    ], dtype=np.int64)
+
+    for _ in range(subdivisions):
+        # one midpoint per unique edge
+        edges = np.sort(np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]), axis=1)
+        uniqueEdges, edgeIndex = np.unique(edges, axis=0, return_inverse=True)
+        edgeIndex = edgeIndex.reshape(3, -1).T + len(positions)
+        positions = np.concatenate([positions, positions[uniqueEdges].mean(axis=1)])
+        a, b, c = faces.T
+        ab, bc, ca = edgeIndex.T
+        faces = np.concatenate([
+            np.stack([a, ab, ca], axis=1), np.stack([b, bc, ab], axis=1),
+            np.stack([c, ca, bc], axis=1), np.stack([ab, bc, ca], axis=1),
+        ])
+
+    positions /= np.linalg.norm(positions, axis=1, keepdims=True)
+    positions = positions.astype(np.float32)
+    loopVerts = faces.ravel().astype(np.int32)
+    polyCount = len(faces)
+
+    if flat:
+        faceNormals = np.cross(positions[faces[:, 1]] - positions[faces[:, 0]], positions[faces[:, 2]] - positions[faces[:, 0]])
+        faceNormals /= np.linalg.norm(faceNormals, axis=1, keepdims=True)
+        normals = np.repeat(faceNormals.astype(np.float32), 3, axis=0)
+    else:
+        normals = positions[loopVerts]
+
+    # spherical mapping, seams where the longitude wraps
+    p = positions[loopVerts]
+    uv = np.stack([np.arctan2(p[:, 1], p[:, 0]) / (2 * np.pi) + 0.5, np.arcsin(np.clip(p[:, 2], -1, 1)) / np.pi + 0.5], axis=1)
+
+    return Mesh(
+        f"icosphere{subdivisions}",
+        positions=positions,
+        polyLoopTotals=np.full(polyCount, 3, dtype=np.int32),
+        loopVerts=loopVerts,
+        normals=normals,
+        triLoops=np.arange(polyCount * 3, dtype=np.int32).reshape(polyCount, 3),
+        triPolys=np.arange(polyCount, dtype=np.int32),
+        materials=np.zeros(polyCount, dtype=np.int32),
+        uvs=[uv.astype(np.float32)],
+    )
+
+def benchmarkMeshes(scale : float = 1.0) -> dict[str, Mesh]:
+    """
+    The meshes the suite runs on, keyed by the name used in the results.
+
+    Parameters
+    ----------
+    scale : float
+        Multiplies the vertex counts, so that quick runs can use smaller meshes
+
+    Returns
+    -------
+    meshes : dict[str, Mesh]
+        The generated meshes
+    """
+
+    side = lambda size: max(4, int(size * scale ** 0.5))
+    subdivisions = 6 if scale >= 1.0 else (5 if scale >= 0.25 else 4)
+    return {
+        "grid": quadGrid(side(320)),
+        "sphere_smooth": icosphere(subdivisions),
+        "sphere_flat": icosphere(subdivisions, flat=True),
+        "multi_material": quadGrid(side(320), materialCount=8),
+        "multi_uv_seams": quadGrid(side(224), uvLayers=4, uvSeams=True),
+        "colors_point": quadGrid(side(320), colorDomain='POINT'),
+        "colors_corner": quadGrid(side(320), colorDomain='CORNER'),
+    }
+
+def legacyMeshes() -> dict[str, Mesh]:
+    """Small meshes for the per-loop reference implementation, which is far too slow for the big ones"""
+
+    return {
+        "grid": quadGrid(48),
+        "multi_material": quadGrid(48, materialCount=8),
+        "colors_point": quadGrid(48, colorDomain='POINT'),
+    }
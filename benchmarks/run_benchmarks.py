@@ -0,0 +1,310 @@
+"""
+Headless microbenchmarks for the mesh extraction and coordinate conversion hot paths.
+
+Runs without Blender, using the stand-in bpy from bpy_standin.py and the meshes from meshes.py.
+The benchmarks that go through interop.py also need ResoniteLink.py installed, they are skipped otherwise.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --quick --save baseline.json
+    python benchmarks/run_benchmarks.py --quick --compare baseline.json
+
+With --compare the exit code is 1 if any benchmark got slower, or needs more memory,
+than the baseline by more than the tolerance.
+"""
+
+# Other imports
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import platform
+import importlib
+import statistics
+import tracemalloc
+import numpy as np
+from collections.abc import Callable
+
+benchmarksDir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, benchmarksDir)
+
+# Benchmark imports
+import bpy_standin
+bpy_standin.install()
+from meshes import benchmarkMeshes, legacyMeshes
+from legacy_extraction import collectMeshDataLegacy
+
+addonPackage = "resonitelink_addon"
+
+def importAddonModule(name : str) -> types.ModuleType:
+    # the add-on uses relative imports, load its modules as a package without running __init__.py and registering anything
+    if addonPackage not in sys.modules:
+        package = types.ModuleType(addonPackage)
+        package.__path__ = [os.path.dirname(benchmarksDir)]
+        sys.modules[addonPackage] = package
+    return importlib.import_module(f"{addonPackage}.{name}")
+
+
+class BenchmarkResult():
+
+    def __init__(self, name : str, times : list[float], peakBytes : int, items : int, unit : str):
+        self.name = name
+        self.seconds = min(times)
+        self.median = statistics.median(times)
+        self.peakBytes = peakBytes
+        self.items = items # vertices or calls processed by one run
+        self.unit = unit
+
+    @property
+    def rate(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else float('inf')
+
+    def toJson(self) -> dict:
+        return {
+            'seconds': self.seconds,
+            'median': self.median,
+            'peakBytes': self.peakBytes,
+            'items': self.items,
+            'unit': self.unit,
+            'rate': self.rate,
+        }
+
+    def __str__(self) -> str:
+        return f"{self.name:<40} {self.seconds * 1000:>10.2f} ms {self.peakBytes / (1024 * 1024):>9.2f} MiB {self.rate / 1e6:>9.2f} M {self.unit}/s"
+
+
+class BenchmarkSuite():
+
+    def __init__(self, repeat : int, only : str = None):
+        self.repeat = repeat
+        self.only = only
+        self.results : dict[str, BenchmarkResult] = {}
+        self.skipped : list[str] = []
+
+    def run(self, name : str, func : Callable, items : int, unit : str = "vert", repeat : int = None):
+        if self.only is not None and self.only not in name:
+            return
+        repeat = repeat or self.repeat
+
+        # timing and memory are measured in separate runs, tracemalloc slows down allocations a lot
+        func() # warm up
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+
+        result = BenchmarkResult(name, times, peak, items, unit)
+        self.results[name] = result
+        print(result, flush=True)
+
+    def skip(self, name : str, reason : str):
+        if self.only is not None and self.only not in name:
+            return
+        self.skipped.append(name)
+        print(f"{name:<40} skipped, {reason}", flush=True)
+
+
+def runMeshBenchmarks(suite : BenchmarkSuite, mesh_data : types.ModuleType, interop : types.ModuleType, scale : float):
+    for meshName, mesh in benchmarkMeshes(scale).items():
+        vertices = mesh.vertexCount
+        arrays = mesh_data.readMeshArrays(mesh)
+        buffers = mesh_data.buildMeshBuffers(arrays)
+
+        suite.run(f"{meshName}/read", lambda: mesh_data.readMeshArrays(mesh), vertices)
+        suite.run(f"{meshName}/dedup", lambda: mesh_data.buildMeshBuffers(arrays), vertices)
+        suite.run(f"{meshName}/fingerprint", lambda: mesh_data.meshFingerprint(arrays), vertices)
+        suite.run(f"{meshName}/encode", lambda: mesh_data.encodeMeshPayload(buffers), vertices)
+        if interop is not None:
+            payload = mesh_data.encodeMeshPayload(buffers)
+            suite.run(f"{meshName}/message", lambda: interop.MeshAssetSlotData.meshPayloadToMessage(payload).raw_binary_payload, vertices)
+        else:
+            suite.skip(f"{meshName}/message", "ResoniteLink.py is not installed")
+
+    # the per-loop v_map implementation, next to the vectorized one on the same meshes
+    for meshName, mesh in legacyMeshes().items():
+        vertices = mesh.vertexCount
+        suite.run(f"legacy_{meshName}/collectMeshDataLegacy", lambda: collectMeshDataLegacy(mesh), vertices, repeat=1)
+        suite.run(f"legacy_{meshName}/extractMeshBuffers", lambda: mesh_data.extractMeshBuffers(mesh), vertices)
+
+def runSkinningBenchmarks(suite : BenchmarkSuite, mesh_data : types.ModuleType, scale : float):
+    # vertex group influences like an armature with automatic weights leaves them, 1 to 6 per vertex
+    vertCount = max(1000, int(200000 * scale))
+    rng = np.random.default_rng(0)
+    perVertex = rng.integers(1, 7, vertCount)
+    vertices = np.repeat(np.arange(vertCount, dtype=np.int32), perVertex)
+    bones = rng.integers(0, 64, len(vertices)).astype(np.int32)
+    weights = rng.random(len(vertices), dtype=np.float32)
+    suite.run("skin/reduceBoneWeights", lambda: mesh_data.reduceBoneWeights(vertices, bones, weights, vertCount), vertCount)
+
+def runAnimationBenchmarks(suite : BenchmarkSuite, animation_data : types.ModuleType, scale : float):
+    # objects swaying on all axes over a few seconds, so every track keeps a good part of its keys
+    frames = 250
+    objectCount = max(10, int(400 * scale))
+    times = np.linspace(0.0, 1.0, frames)
+    phases = np.random.default_rng(0).random(objectCount)
+    angles = np.sin(2.0 * np.pi * (times[:, None] * 3.0 + phases[None, :]))
+    matrices = np.zeros((frames, objectCount, 4, 4), dtype=np.float32)
+    matrices[..., 0, 0] = np.cos(angles)
+    matrices[..., 0, 1] = -np.sin(angles)
+    matrices[..., 1, 0] = np.sin(angles)
+    matrices[..., 1, 1] = np.cos(angles)
+    matrices[..., 2, 2] = 1.0 + 0.5 * angles
+    matrices[..., :3, 3] = angles[..., None]
+    matrices[..., 3, 3] = 1.0
+    suite.run("animation/bakeTracks", lambda: animation_data.bakeTracks(matrices, times, 0.001), frames * objectCount, "key")
+
+def runConversionBenchmarks(suite : BenchmarkSuite, mesh_data : types.ModuleType, interop : types.ModuleType, scale : float):
+    count = max(1000, int(100000 * scale))
+    rng = np.random.default_rng(0)
+    points = rng.random((count, 3), dtype=np.float32)
+    suite.run("convert/b2u_coords_array", lambda: mesh_data.b2u_coords_array(points), count)
+
+    if interop is None:
+        for name in ["b2u_coords", "b2u_scale", "b2u_euler2quaternion", "getSlotKwargs"]:
+            suite.skip(f"convert/{name}", "ResoniteLink.py is not installed")
+        return
+
+    values = points.tolist()
+    euler = [bpy_standin.Euler(v) for v in values]
+
+    def convertAll(func : Callable, args : list):
+        for a in args:
+            func(*a)
+
+    suite.run("convert/b2u_coords", lambda: convertAll(interop.b2u_coords, values), count, "call")
+    suite.run("convert/b2u_scale", lambda: convertAll(interop.b2u_scale, values), count, "call")
+    suite.run("convert/b2u_euler2quaternion", lambda: [interop.b2u_euler2quaternion(e) for e in euler], count, "call")
+
+    # slot data of objects parented to the scene, the parent lookup goes through the id to slot data map
+    scene = types.SimpleNamespace(id="Scene", key="Scene", name="Scene", type="SCENE", mappingKey="SCENE:Scene")
+    registry = interop.SlotRegistry.ForScene(scene.key)
+    registry.clear()
+    registry.add(scene.key, interop.SceneSlotData(scene))
+    objects = []
+    for i, v in enumerate(values[:count // 10]):
+        snapshot = types.SimpleNamespace(
+            id=f"Object{i}", key=f"Object{i}", name=f"Object{i}", type="MESH", mappingKey=f"OBJECT:Object{i}",
+            localPos=v, localEuler=bpy_standin.Euler(v), localScale=(1.0, 1.0, 1.0), parent=None, scene=scene.id, sceneKey=scene.key
+        )
+        objects.append(interop.ObjectSlotData(snapshot))
+    suite.run("convert/getSlotKwargs", lambda: [slotData.getSlotKwargs() for slotData in objects], len(objects), "call")
+    registry.clear()
+
+def compareResults(results : dict, baseline : dict, tolerance : float, minBytes : int, listMissing : bool = True) -> list[str]:
+    """
+    Compare results against a saved baseline.
+
+    Parameters
+    ----------
+    results : dict
+        The benchmark results, as saved by --save
+    baseline : dict
+        A previously saved result file
+    tolerance : float
+        Allowed relative increase in time and memory, 0.25 allows 25% slower
+    minBytes : int
+        Memory increases smaller than this are ignored, they are mostly noise
+    listMissing : bool
+        Also list the baseline benchmarks that weren't run
+
+    Returns
+    -------
+    regressions : list[str]
+        A description of every benchmark that got worse
+    """
+
+    regressions = []
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name, None)
+        if previous is None:
+            continue
+        timeRatio = current['seconds'] / previous['seconds'] if previous['seconds'] > 0 else 1.0
+        memoryDelta = current['peakBytes'] - previous['peakBytes']
+        memoryRatio = current['peakBytes'] / previous['peakBytes'] if previous['peakBytes'] > 0 else 1.0
+        status = "ok"
+        if timeRatio > 1.0 + tolerance:
+            status = "SLOWER"
+            regressions.append(f"{name} took {timeRatio:.2f}x as long as the baseline")
+        if memoryRatio > 1.0 + tolerance and memoryDelta > minBytes:
+            status = "MORE MEMORY" if status == "ok" else status + ", MORE MEMORY"
+            regressions.append(f"{name} needed {memoryRatio:.2f}x the memory of the baseline")
+        print(f"{name:<40} {timeRatio:>6.2f}x time {memoryRatio:>6.2f}x memory  {status}")
+
+    if listMissing:
+        for name in sorted(set(baseline['results']) - set(results['results'])):
+            print(f"{name:<40} not run")
+    return regressions
+
+def main(argv : list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mesh extraction and coordinate conversion benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller meshes and fewer repeats")
+    parser.add_argument("--scale", type=float, default=None, help="multiplies the size of the generated meshes")
+    parser.add_argument("--repeat", type=int, default=None, help="timed runs per benchmark, the fastest one is reported")
+    parser.add_argument("--only", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--save", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="compare against a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression for --compare")
+    parser.add_argument("--min-memory-kb", type=int, default=1024, help="ignore memory regressions smaller than this")
+    args = parser.parse_args(argv)
+
+    scale = args.scale if args.scale is not None else (0.1 if args.quick else 1.0)
+    repeat = args.repeat if args.repeat is not None else (3 if args.quick else 5)
+
+    mesh_data = importAddonModule("mesh_data")
+    animation_data = importAddonModule("animation_data")
+    try:
+        interop = importAddonModule("interop")
+    except ImportError as e:
+        print(f"interop.py can't be imported ({e}), its benchmarks are skipped")
+        interop = None
+
+    suite = BenchmarkSuite(repeat, args.only)
+    runMeshBenchmarks(suite, mesh_data, interop, scale)
+    runSkinningBenchmarks(suite, mesh_data, scale)
+    runAnimationBenchmarks(suite, animation_data, scale)
+    runConversionBenchmarks(suite, mesh_data, interop, scale)
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'scale': scale,
+            'repeat': repeat,
+            'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'results': {name: result.toJson() for name, result in suite.results.items()},
+        'skipped': suite.skipped,
+    }
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved {len(suite.results)} results to {args.save}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('scale') != scale:
+            print(f"Warning: the baseline was run with scale {baseline['meta'].get('scale')}, this run uses {scale}")
+        regressions = compareResults(results, baseline, args.tolerance, args.min_memory_kb * 1024, args.only is None)
+        if len(regressions) > 0:
+            print(f"{len(regressions)} regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regressions")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+"""
+Local stand-in for the ResoniteLink websocket server, for measuring and testing sends without Resonite.
+
+Implements the part of the protocol the add-on uses: adding, updating, getting and removing slots and components,
+and importing meshes (as JSON or as raw data followed by a binary frame). Slots and components are only stored,
+nothing is simulated beyond answering with the ids and asset URLs a real session would.
+
+Latency, a bandwidth cap and failure injection make it possible to see how a send behaves on a slow or unreliable host,
+and every request is recorded with its size and timing.
+
+    python benchmarks/standin_server.py --port 2000 --latency-ms 20 --bandwidth-mbps 100 --log requests.jsonl
+"""
+
+# Other imports
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from websockets.asyncio.server import serve, ServerConnection
+from websockets.exceptions import ConnectionClosed
+
+
+class RequestRecord():
+
+    def __init__(self, messageType : str, messageId : str, receivedTime : float, byteCount : int):
+        self.messageType = messageType
+        self.messageId = messageId
+        self.receivedTime = receivedTime # perf_counter seconds, after the bandwidth delay
+        self.respondedTime : float = None
+        self.byteCount = byteCount # text frame plus the binary frame of raw imports
+        self.success = False
+        self.injectedFailure = False
+
+    def toJson(self, startTime : float) -> dict:
+        return {
+            'type': self.messageType,
+            'messageId': self.messageId,
+            'received': self.receivedTime - startTime,
+            'responded': self.respondedTime - startTime if self.respondedTime is not None else None,
+            'bytes': self.byteCount,
+            'success': self.success,
+            'injectedFailure': self.injectedFailure,
+        }
+
+
+class StandInServer():
+    """
+    Answers ResoniteLink requests from an in-memory session.
+
+    Parameters
+    ----------
+    latency : float
+        Seconds every response is delayed by
+    jitter : float
+        Up to this many seconds are added to the latency at random
+    bandwidth : float
+        Bytes per second the incoming link can carry, frames queue up behind each other, 0 for unlimited
+    failureRate : float
+        Chance of answering a request with an error instead of handling it
+    failureTypes : list[str]
+        Only inject failures into these message types, None for all of them
+    disconnectAfter : int
+        Close the connection after this many requests, 0 to never do so
+    seed : int
+        Seed for the jitter and the failure injection
+    """
+
+    # raw imports are followed by a binary frame holding the data
+    rawImportTypes = ('importMeshRawData', 'importTexture2DRawData')
+
+    def __init__(self, latency : float = 0.0, jitter : float = 0.0, bandwidth : float = 0.0, failureRate : float = 0.0,
+                 failureTypes : list[str] = None, disconnectAfter : int = 0, seed : int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.failureRate = failureRate
+        self.failureTypes = failureTypes
+        self.disconnectAfter = disconnectAfter
+        self.random = random.Random(seed)
+        self.logger = logging.getLogger("ResoniteLinkStandIn")
+
+        self.slots : dict[str, dict] = {}
+        self.components : dict[str, dict] = {}
+        self.assetCount = 0
+        self.nextId = 0
+        self.records : list[RequestRecord] = []
+        self.startTime = time.perf_counter()
+        self.linkFreeTime = 0.0 # when the incoming link finishes carrying the frames received so far
+
+        self.handlers = {
+            'requestSessionData': self.handleSessionData,
+            'getSlot': self.handleGetSlot,
+            'addSlot': self.handleAddSlot,
+            'updateSlot': self.handleUpdateSlot,
+            'removeSlot': self.handleRemoveSlot,
+            'getComponent': self.handleGetComponent,
+            'addComponent': self.handleAddComponent,
+            'updateComponent': self.handleUpdateComponent,
+            'removeComponent': self.handleRemoveComponent,
+            'importMeshJSON': self.handleImportAsset,
+            'importMeshRawData': self.handleImportAsset,
+            'importTexture2DRawData': self.handleImportAsset,
+        }
+        self.reset()
+
+    def reset(self):
+        """Start a new, empty session, the recorded requests are kept"""
+        self.slots = {"Root": {'id': "Root", 'name': {'value': "Root"}, 'parent': {'targetId': None}}}
+        self.components = {}
+        self.assetCount = 0
+
+    def allocateId(self, prefix : str) -> str:
+        self.nextId += 1
+        return f"{prefix}{self.nextId:X}"
+
+    @staticmethod
+    def targetId(reference) -> str:
+        return reference.get('targetId', None) if isinstance(reference, dict) else reference
+
+    def descendants(self, slotId : str) -> list[str]:
+        children = [id for id, slot in self.slots.items() if StandInServer.targetId(slot.get('parent', None)) == slotId]
+        return children + [grandchild for child in children for grandchild in self.descendants(child)]
+
+    # Handlers return the fields added to the response, or raise KeyError for unknown ids
+
+    def handleSessionData(self, message : dict) -> dict:
+        return {'$type': "sessionData", 'resoniteVersion': "stand-in", 'uniqueSessionId': "standin-session"}
+
+    def handleGetSlot(self, message : dict) -> dict:
+        slotId = message['slotId']
+        if slotId not in self.slots:
+            raise KeyError(slotId)
+        # the whole session is indexed once per request, a hierarchy query of the scene root reads most of it
+        children : dict[str, list[str]] = {}
+        for id, slot in self.slots.items():
+            children.setdefault(StandInServer.targetId(slot.get('parent', None)), []).append(id)
+        components : dict[str, list[dict]] = {}
+        for compId, comp in self.components.items():
+            components.setdefault(comp['slot'], []).append({'id': compId, 'componentType': comp['data'].get('componentType', None)})
+        return {'$type': "slotData", 'data': self.slotData(slotId, message.get('depth', 0), children, components)}
+
+    def slotData(self, slotId : str, depth : int, children : dict[str, list[str]], components : dict[str, list[dict]]) -> dict:
+        # a negative depth includes the whole hierarchy
+        data = dict(self.slots[slotId], components=components.get(slotId, []))
+        if depth == 0:
+            return data
+        return dict(data, children=[self.slotData(child, depth - 1, children, components) for child in children.get(slotId, [])])
+
+    def handleAddSlot(self, message : dict) -> dict:
+        data = dict(message['data'])
+        data['id'] = data.get('id', None) or self.allocateId("Slot_")
+        if StandInServer.targetId(data.get('parent', None)) is None:
+            data['parent'] = {'targetId': "Root"}
+        self.slots[data['id']] = data
+        return {'data': {'id': data['id']}}
+
+    def handleUpdateSlot(self, message : dict) -> dict:
+        data = message['data']
+        self.slots[data['id']].update(data)
+        return {}
+
+    def handleRemoveSlot(self, message : dict) -> dict:
+        slotId = message['slotId']
+        removed = [slotId] + self.descendants(slotId)
+        for id in removed:
+            self.slots.pop(id)
+        for compId in [compId for compId, comp in self.components.items() if comp['slot'] in removed]:
+            self.components.pop(compId)
+        return {}
+
+    def handleGetComponent(self, message : dict) -> dict:
+        return {'$type': "componentData", 'data': self.components[message['componentId']]['data']}
+
+    def handleAddComponent(self, message : dict) -> dict:
+        slotId = message['containerSlotId']
+        if slotId not in self.slots:
+            raise KeyError(slotId)
+        data = dict(message['data'])
+        data['id'] = data.get('id', None) or self.allocateId("Component_")
+        self.components[data['id']] = {'slot': slotId, 'data': data}
+        return {'data': {'id': data['id']}}
+
+    def handleUpdateComponent(self, message : dict) -> dict:
+        data = message['data']
+        component = self.components[data['id']]['data']
+        component.setdefault('members', {}).update(data.get('members', {}))
+        return {}
+
+    def handleRemoveComponent(self, message : dict) -> dict:
+        self.components.pop(message['componentId'])
+        return {}
+
+    def handleImportAsset(self, message : dict) -> dict:
+        self.assetCount += 1
+        return {'$type': "assetData", 'assetURL': f"local://standin/{message['$type']}/{self.assetCount}"}
+
+    async def receiveAsync(self, byteCount : int):
+        # frames are carried over the link one after the other
+        if self.bandwidth <= 0:
+            return
+        now = time.perf_counter()
+        self.linkFreeTime = max(now, self.linkFreeTime) + byteCount / self.bandwidth
+        await asyncio.sleep(self.linkFreeTime - now)
+
+    async def respondAsync(self, connection : ServerConnection, message : dict, record : RequestRecord):
+        await asyncio.sleep(self.latency + self.random.random() * self.jitter)
+
+        response = {'$type': "response", 'sourceMessageId': record.messageId, 'success': True, 'errorInfo': None}
+        if self.failureRate > 0 and (self.failureTypes is None or record.messageType in self.failureTypes) and self.random.random() < self.failureRate:
+            record.injectedFailure = True
+            response['success'] = False
+            response['errorInfo'] = "Injected failure"
+        else:
+            handler = self.handlers.get(record.messageType, None)
+            try:
+                if handler is None:
+                    raise NotImplementedError(f"Message type {record.messageType} is not supported by the stand-in")
+                response.update(handler(message))
+            except KeyError as e:
+                response['success'] = False
+                response['errorInfo'] = f"Not found: {e}"
+            except Exception as e:
+                response['success'] = False
+                response['errorInfo'] = str(e)
+
+        record.success = response['success']
+        record.respondedTime = time.perf_counter()
+        try:
+            await connection.send(json.dumps(response))
+        except ConnectionClosed:
+            pass
+
+    async def handleConnectionAsync(self, connection : ServerConnection):
+        self.logger.log(logging.INFO, f"Client connected from {connection.remote_address}")
+        tasks : set[asyncio.Task] = set()
+        awaitingData : list[tuple[dict, RequestRecord]] = [] # raw imports waiting for their binary frame
+        try:
+            async for frame in connection:
+                await self.receiveAsync(len(frame))
+
+                if isinstance(frame, bytes):
+                    if len(awaitingData) == 0:
+                        self.logger.log(logging.WARNING, f"Binary frame of {len(frame)} bytes without a raw import")
+                        continue
+                    message, record = awaitingData.pop(0)
+                    record.byteCount += len(frame)
+                else:
+                    message = json.loads(frame)
+                    record = RequestRecord(message.get('$type', None), message.get('messageId', None), time.perf_counter(), len(frame))
+                    self.records.append(record)
+                    if record.messageType in StandInServer.rawImportTypes:
+                        awaitingData.append((message, record))
+                        continue
+
+                task = asyncio.create_task(self.respondAsync(connection, message, record))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+                if self.disconnectAfter > 0 and len(self.records) >= self.disconnectAfter:
+                    self.logger.log(logging.INFO, f"Closing the connection after {len(self.records)} requests")
+                    await connection.close()
+                    break
+        except ConnectionClosed:
+            pass
+        if len(tasks) > 0:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.logger.log(logging.INFO, f"Client disconnected, {self.summary()}")
+
+    def summary(self) -> str:
+        counts = {}
+        for record in self.records:
+            counts[record.messageType] = counts.get(record.messageType, 0) + 1
+        failed = sum(1 for record in self.records if not record.success)
+        byteCount = sum(record.byteCount for record in self.records)
+        return (f"{len(self.records)} requests ({', '.join(f'{type} {count}' for type, count in counts.items())}), "
+                f"{failed} failed, {byteCount / (1024 * 1024):.2f} MiB received, {len(self.slots)} slots, {len(self.components)} components, {self.assetCount} assets")
+
+    def saveLog(self, path : str):
+        """Write every recorded request as one JSON object per line"""
+        with open(path, "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record.toJson(self.startTime)) + "\n")
+
+    async def serveAsync(self, host : str, port : int, ready : asyncio.Event = None, stop : asyncio.Event = None):
+        # no message size limit, mesh imports can be hundreds of megabytes
+        async with serve(self.handleConnectionAsync, host, port, max_size=None):
+            self.logger.log(logging.INFO, f"ResoniteLink stand-in listening on ws://{host}:{port}")
+            if ready is not None:
+                ready.set()
+            await (stop.wait() if stop is not None else asyncio.get_running_loop().create_future())
+
+
+def parseArgs(argv : list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local ResoniteLink stand-in server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay of every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra delay of up to this much")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="incoming bandwidth cap in megabits per second, 0 for unlimited")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="chance of answering a request with an error")
+    parser.add_argument("--failure-types", nargs="*", default=None, help="only fail these message types")
+    parser.add_argument("--disconnect-after", type=int, default=0, help="close the connection after this many requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log", default=None, help="write every request to this JSON lines file on exit")
+    return parser.parse_args(argv)
+
+def serverFromArgs(args : argparse.Namespace) -> StandInServer:
+    return StandInServer(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        bandwidth=args.bandwidth_mbps * 1000000 / 8,
+        failureRate=args.failure_rate,
+        failureTypes=args.failure_types,
+        disconnectAfter=args.disconnect_after,
+        seed=args.seed
+    )
+
+def main(argv : list[str] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    args = parseArgs(argv)
+    server = serverFromArgs(args)
+    try:
+        asyncio.run(server.serveAsync(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.summary())
+        if args.log is not None:
+            server.saveLog(args.log)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
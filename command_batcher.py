@@ -0,0 +1,180 @@
+# Resonitelink Imports
+from resonitelink import ResoniteLinkWebsocketClient
+
+# Other imports
+import re
+import time
+import asyncio
+import inspect
+import logging
+import functools
+from typing import Any
+from collections.abc import Callable
+
+# Add-on file imports
+from .send_stats import *
+
+class BatchedCommand():
+
+    def __init__(self, method : str, target : Any, args : tuple, kwargs : dict[str, Any], future : asyncio.Future):
+        self.method = method
+        self.target = target # slot or component proxy the command operates on, None for add_slot
+        self.args = args
+        self.kwargs = kwargs
+        self.futures = [future] # merged commands share one request and resolve together
+
+
+class CommandBatcher():
+    """
+    Sits between the slot data classes and the websocket client, and coalesces slot and component operations.
+
+    Operations issued during the same iteration of the event loop are collected into one batch. Updates of the same slot
+    or component within a batch are merged into a single request, and the batch is submitted as a whole instead of waiting
+    for a response before sending the next request. Each caller gets back its own result (the new proxy for creates)
+    or its own exception, a failing item never aborts the rest of the batch.
+
+    Everything other than add/update slot/component is passed straight through to the client.
+
+    The round-trip time of every request is reported to latencyListener, except for imports,
+    which take as long as their payload takes to upload. Messages passed to send_message are counted under the
+    name of their type, import_mesh_raw_data for ImportMeshRawData.
+    """
+
+    updateMethods = ('update_slot', 'update_component')
+    unmeasuredPrefix = "import_"
+
+    def __init__(self, client : ResoniteLinkWebsocketClient, maxBatchSize : int = 256):
+        self.client = client
+        self.maxBatchSize = maxBatchSize
+        self.pending : list[BatchedCommand] = []
+        self.flushScheduled = False
+        self.logger = logging.getLogger("ResoniteLink")
+
+        self.batchCount = 0
+        self.requestCount = 0
+        self.mergedCount = 0
+        self.failures : list[tuple[str, Exception]] = []
+        self.stats : SendStats = None # requests are counted in here while a send is running
+        self.latencyListener : Callable[[str, float], None] = None # method, seconds, set while a send is running
+
+    def __getattr__(self, name : str) -> Any:
+        attr = getattr(self.client, name)
+        if (self.stats is None and self.latencyListener is None) or not inspect.iscoroutinefunction(attr):
+            return attr
+
+        # requests that aren't batched are counted too
+        @functools.wraps(attr)
+        async def counted(*args, **kwargs):
+            stats = self.stats
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await attr(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self.requestFinished(stats, CommandBatcher.requestName(name, args), time.perf_counter() - start, failed)
+        return counted
+
+    @staticmethod
+    def requestName(method : str, args : tuple) -> str:
+        if method == 'send_message' and len(args) > 0:
+            return re.sub(r"(?<!^)(?=[A-Z])", "_", type(args[0]).__name__).lower()
+        return method
+
+    def add_slot(self, **kwargs) -> asyncio.Future:
+        return self.enqueue('add_slot', None, (), kwargs)
+
+    def update_slot(self, slot = None, **kwargs) -> asyncio.Future:
+        return self.enqueue('update_slot', slot, (), kwargs)
+
+    def add_component(self, slot, component_type : str, **members) -> asyncio.Future:
+        return self.enqueue('add_component', slot, (component_type,), members)
+
+    def update_component(self, component, **members) -> asyncio.Future:
+        return self.enqueue('update_component', component, (), members)
+
+    def enqueue(self, method : str, target : Any, args : tuple, kwargs : dict[str, Any]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append(BatchedCommand(method, target, args, kwargs, future))
+
+        if len(self.pending) >= self.maxBatchSize:
+            self.flush()
+        elif not self.flushScheduled:
+            # let every task that is ready this iteration add its commands first
+            self.flushScheduled = True
+            loop.call_soon(self.flush)
+
+        return future
+
+    def flush(self):
+        self.flushScheduled = False
+        batch = self.pending
+        self.pending = []
+        if len(batch) > 0:
+            asyncio.get_running_loop().create_task(self.submitBatchAsync(batch))
+
+    def coalesce(self, batch : list[BatchedCommand]) -> list[BatchedCommand]:
+        merged : list[BatchedCommand] = []
+        updates : dict[tuple[str, str], BatchedCommand] = {}
+        for cmd in batch:
+            if cmd.method in CommandBatcher.updateMethods:
+                key = (cmd.method, cmd.target.id)
+                first = updates.get(key, None)
+                if first is not None:
+                    # later values win, just like they would if both requests were sent
+                    first.kwargs.update(cmd.kwargs)
+                    first.futures += cmd.futures
+                    self.mergedCount += 1
+                    continue
+                updates[key] = cmd
+            merged.append(cmd)
+        return merged
+
+    async def submitAsync(self, cmd : BatchedCommand) -> Any:
+        func = getattr(self.client, cmd.method)
+        stats = self.stats
+        start = time.perf_counter()
+        failed = True
+        try:
+            if cmd.target is None:
+                result = await func(*cmd.args, **cmd.kwargs)
+            else:
+                result = await func(cmd.target, *cmd.args, **cmd.kwargs)
+            failed = False
+            return result
+        finally:
+            self.requestFinished(stats, cmd.method, time.perf_counter() - start, failed)
+
+    def requestFinished(self, stats : SendStats, method : str, duration : float, failed : bool):
+        if stats is not None:
+            stats.countRequest(method, duration, failed)
+        listener = self.latencyListener
+        if listener is not None and not failed and not method.startswith(CommandBatcher.unmeasuredPrefix):
+            listener(method, duration)
+
+    async def submitBatchAsync(self, batch : list[BatchedCommand]):
+        commands = self.coalesce(batch)
+        self.batchCount += 1
+        self.requestCount += len(commands)
+
+        results = await asyncio.gather(*(self.submitAsync(cmd) for cmd in commands), return_exceptions=True)
+
+        for cmd, result in zip(commands, results):
+            if isinstance(result, BaseException):
+                self.failures.append((cmd.method, result))
+                self.logger.log(logging.WARNING, f"Batched {cmd.method} failed: {result}")
+            for future in cmd.futures:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def resetStats(self):
+        self.batchCount = 0
+        self.requestCount = 0
+        self.mergedCount = 0
+        self.failures = []
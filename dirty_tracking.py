@@ -0,0 +1,67 @@
+# Blender Imports
+import bpy
+
+# Other imports
+import threading
+
+class DirtySet():
+    """What changed in a scene since the last send"""
+
+    def __init__(self):
+        self.geometry : set[str] = set() # names of objects whose evaluated geometry changed
+        self.transform : set[str] = set() # names of objects that moved
+        self.shading : set[str] = set() # names of objects whose shading changed
+        self.materials : set[str] = set() # names of materials that changed
+
+    def __len__(self) -> int:
+        return len(self.objectNames()) + len(self.materials)
+
+    def objectNames(self) -> set[str]:
+        return self.geometry | self.transform | self.shading
+
+    def isTransformOnly(self, name : str) -> bool:
+        return name in self.transform and name not in self.geometry and name not in self.shading
+
+
+class DirtyTracker():
+    """
+    Records the objects and materials touched by depsgraph updates, so that a send only needs to visit those.
+    Written to from the main thread by the depsgraph handler and taken from the websocket thread by sends.
+    """
+
+    def __init__(self):
+        self.dirty = DirtySet()
+        self.lock = threading.Lock()
+
+    def record(self, depsgraph : bpy.types.Depsgraph):
+        self.lock.acquire()
+        for update in depsgraph.updates:
+            id = update.id.original if update.id.original is not None else update.id
+            if isinstance(id, bpy.types.Object):
+                if update.is_updated_geometry:
+                    self.dirty.geometry.add(id.name_full)
+                if update.is_updated_transform:
+                    self.dirty.transform.add(id.name_full)
+                if update.is_updated_shading:
+                    self.dirty.shading.add(id.name_full)
+            elif isinstance(id, bpy.types.Material):
+                self.dirty.materials.add(id.name_full)
+        self.lock.release()
+
+    def hasChanges(self) -> bool:
+        return len(self.dirty) > 0
+
+    def merge(self, other : DirtySet):
+        self.lock.acquire()
+        self.dirty.geometry |= other.geometry
+        self.dirty.transform |= other.transform
+        self.dirty.shading |= other.shading
+        self.dirty.materials |= other.materials
+        self.lock.release()
+
+    def take(self) -> DirtySet:
+        self.lock.acquire()
+        dirty = self.dirty
+        self.dirty = DirtySet()
+        self.lock.release()
+        return dirty
@@ -1,391 +1,1070 @@
 # Blender Imports
 import logging
 from typing import Any
+from collections.abc import Awaitable, Callable, Hashable
 
 import bpy
-from mathutils import Euler
+from mathutils import Euler, Matrix, Vector
 
 # Resonitelink Imports
 from resonitelink.models.datamodel import *
 from resonitelink.proxies.datamodel.slot_proxy import SlotProxy
 from resonitelink.proxies.datamodel.component_proxy import ComponentProxy
-from resonitelink import ResoniteLinkWebsocketClient, TriangleSubmeshRawData
+from resonitelink import ResoniteLinkWebsocketClient, TriangleSubmeshRawData, ImportMeshRawData, AssetData, Bone
 from resonitelink.exceptions import ResoniteLinkException
 
+import os
+import time
+import json
+import uuid
+import asyncio
 import threading
+import contextvars
+import tracemalloc
+from collections import OrderedDict
 
 #from .asset_data import *
+from .mesh_data import *
+from .texture_data import *
+from .slot_mapping import *
+from .slot_registry import *
 
 class ID_SlotData():
 
-    # ToDo: make this dictionary be per-scene
-    idToSlotData : dict[bpy.types.ID, 'ID_SlotData'] = {}
-    lock = threading.Lock()
+    # names of the ComponentProxy attributes that are persisted in the mapping along with the slot
+    componentAttrs : list[str] = []
+    # same for attributes holding a list of ComponentProxy
+    componentListAttrs : list[str] = []
+    # and for attributes holding a list of further SlotProxy below the slot
+    slotListAttrs : list[str] = []
 
-    def __init__(self, id : bpy.types.ID):
-        self.id : bpy.types.ID = id
-        self.slot : SlotProxy = None
+    # The shadow state keeps members as plain values, these turn them into what ResoniteLink.py sends.
+    # Members that aren't listed are sent as they are.
+    memberTypes : dict[str, Callable[[Any], Any]] = {
+        'position': lambda pos: Float3(*pos),
+        'rotation': lambda quat: FloatQ(*quat),
+        'scale': lambda scale: Float3(*scale),
+        'AlbedoColor': lambda color: Field_ColorX(value=ColorX(*color, "Linear")),
+        'Enabled': lambda enabled: Field_Bool(value=enabled),
+        'URL': lambda url: Field_Uri(value=url),
+        'IsNormalMap': lambda isNormalMap: Field_Bool(value=isNormalMap),
+        'AlbedoTexture': lambda texture: Reference(
+            target_id=texture.id if texture is not None else None,
+            target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.ITexture2D>"
+        ),
+        'NormalMap': lambda texture: Reference(
+            target_id=texture.id if texture is not None else None,
+            target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.ITexture2D>"
+        ),
+        'Mesh': lambda meshId: Reference(
+            target_id=meshId,
+            target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Mesh>"
+        ),
+        'Materials': lambda materialIds: SyncList(*[
+            Reference(
+                target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Material>",
+                target_id=materialId
+            ) for materialId in materialIds
+        ]),
+        'LODs': lambda levels: SyncList(*[
+            SyncObject(
+                ScreenRelativeTransitionHeight=Field_Float(value=height),
+                FadeTransitionWidth=Field_Float(value=0.0),
+                Renderers=SyncList(*[
+                    Reference(target_id=rendererId, target_type="[FrooxEngine]FrooxEngine.MeshRenderer") for rendererId in rendererIds
+                ])
+            ) for height, rendererIds in levels
+        ]),
+        'Bones': lambda slotIds: SyncList(*[
+            Reference(target_id=slotId, target_type="[FrooxEngine]FrooxEngine.Slot") for slotId in slotIds
+        ]),
+        'Points': lambda points: SyncList(*[
+            SyncObject(
+                Position=Field_Float(value=time),
+                Value=Field_Float3(value=Float3(*value)) if len(value) == 3 else Field_FloatQ(value=FloatQ(*value))
+            ) for time, value in points
+        ]),
+        'Target': lambda target: Reference(target_id=target[0], target_type=f"[FrooxEngine]FrooxEngine.IField<{target[1]}>"),
+        '_target': lambda fieldId: Reference(target_id=fieldId, target_type="[FrooxEngine]FrooxEngine.IField<float>"),
+        'Speed': lambda speed: Field_Float(value=speed),
+        'Repeat': lambda repeat: Field_Float(value=repeat),
+    }
 
-    @classmethod
-    def Get(cls, id : bpy.types.ID) -> 'ID_SlotData':
-        ID_SlotData.lock.acquire()
-        res = ID_SlotData.idToSlotData.get(id, None)
-        ID_SlotData.lock.release()
-        return res
-        
-    @classmethod
-    def Remove(cls, id : bpy.types.ID):
-        ID_SlotData.lock.acquire()
-        ID_SlotData.idToSlotData.pop(id)
-        ID_SlotData.lock.release()
+    # ID_SlotData is only ever used on the websocket thread, everything it sends comes from the snapshot.
+    # id is the original ID the snapshot was taken from, key is what the slot data is registered under.
+    def __init__(self, snapshot : 'IDSnapshot'):
+        self.snapshot = snapshot
+        self.id : bpy.types.ID = snapshot.id
+        self.key : Hashable = snapshot.key
+        self.registry : SlotRegistry = None # set while the slot data is registered
+        self._slot : SlotProxy = None
+
+    @property
+    def slot(self) -> SlotProxy:
+        return self._slot
+
+    @slot.setter
+    def slot(self, slot : SlotProxy):
+        oldSlot = self._slot
+        self._slot = slot
+        if self.registry is not None:
+            self.registry.indexSlot(self, oldSlot, slot)
 
     @classmethod
-    def Clear(cls):
-        ID_SlotData.lock.acquire()
-        ID_SlotData.idToSlotData = {}
-        ID_SlotData.lock.release()
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'ID_SlotData':
+        return registry.get(key)
 
     @classmethod
-    def Add(cls, id : bpy.types.ID, idSlotData : ID_SlotData):
-        ID_SlotData.lock.acquire()
-        ID_SlotData.idToSlotData[id] = idSlotData
-        ID_SlotData.lock.release()
+    def CollectMapping(cls, registry : SlotRegistry) -> dict[str, dict]:
+        entries = {data.snapshot.mappingKey: data.toMappingEntry() for data in registry.values() if data.slot is not None}
+        if registry.assetsSlotRoot is not None:
+            entries["ASSETS"] = {'slot': registry.assetsSlotRoot.id, 'components': {}}
+        if registry.defaultMaterial is not None:
+            entries["DEFAULT_MATERIAL"] = {
+                'slot': registry.defaultMaterialSlot.id,
+                'components': {'matComp': registry.defaultMaterial.id}
+            }
+        return entries
+
+    def toMappingEntry(self) -> dict:
+        return {
+            'slot': self.slot.id,
+            'components': {attr: getattr(self, attr).id for attr in self.componentAttrs if getattr(self, attr, None) is not None},
+            'componentLists': {attr: [comp.id for comp in getattr(self, attr)] for attr in self.componentListAttrs},
+            'slotLists': {attr: [slot.id for slot in getattr(self, attr)] for attr in self.slotListAttrs}
+        }
+
+    # adopts the slot and components recorded for this ID by a previous session, if they still exist
+    def restoreFromMapping(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> bool:
+        entry = context.registry.mapping.take(self.snapshot.mappingKey)
+        if entry is None:
+            return False
+        self.slot = SlotProxy(client, entry['slot'])
+        for attr, compId in entry.get('components', {}).items():
+            setattr(self, attr, ComponentProxy(client, compId))
+        for attr, compIds in entry.get('componentLists', {}).items():
+            setattr(self, attr, [ComponentProxy(client, compId) for compId in compIds])
+        for attr, slotIds in entry.get('slotLists', {}).items():
+            setattr(self, attr, [SlotProxy(client, slotId) for slotId in slotIds])
+        return True
+
+    async def instantiateOrRestoreAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        if self.restoreFromMapping(client, context):
+            if context.slotsValidated:
+                # the mapping only kept complete slots
+                await self.updateAsync(client, context)
+                return
+            try:
+                await self.updateAsync(client, context)
+                return
+            except:
+                # restored slot is incomplete, make a new one
+                pass
+        await self.instantiateAsync(client, context)
+
+    # Takes the create or the update path right away once the send checked which slots still exist,
+    # otherwise an update that fails means the slot was deleted in Resonite
+    async def updateOrInstantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', update : Callable = None):
+        update = update or self.updateAsync
+        if self.slot is None:
+            await self.instantiateAsync(client, context)
+        elif context.slotsValidated:
+            await update(client, context)
+        else:
+            try:
+                await update(client, context)
+            except:
+                # slot was probably deleted
+                await self.instantiateAsync(client, context)
 
     # can be overriden if derived classes need more control over the creation of the slot
-    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
-        self.slot = await client.add_slot(
-                name=self.id.name,
-                tag=self.id.id_type
-            )
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        self.slot = await ID_SlotData.AddSlotAsync(client, context.registry, self.getSlotState(context))
     
     # can be overriden if derived classes need more control over the updating of the slot
-    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
-        await client.update_slot(
-                    self.slot,
-                    name=self.id.name,
-                    tag=self.id.id_type
-                )
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await self.sendChangedAsync(client, context, self.slot, self.getSlotState(context))
+
+    # the members of the slot, as plain values
+    def getSlotState(self, context : 'SceneSnapshot') -> dict[str, Any]:
+        return {'name': self.snapshot.name,
+                'tag': self.snapshot.idType}
+
+    @staticmethod
+    def ToMembers(state : dict[str, Any]) -> dict[str, Any]:
+        return {name: ID_SlotData.memberTypes[name](value) if name in ID_SlotData.memberTypes else value for name, value in state.items()}
+
+    @staticmethod
+    async def AddSlotAsync(client : ResoniteLinkWebsocketClient, registry : SlotRegistry, state : dict[str, Any]) -> SlotProxy:
+        slot = await client.add_slot(**ID_SlotData.ToMembers(state))
+        registry.shadow.record(slot.id, state)
+        return slot
+
+    @staticmethod
+    async def AddComponentAsync(client : ResoniteLinkWebsocketClient, registry : SlotRegistry, slot : SlotProxy, componentType : str, state : dict[str, Any]) -> ComponentProxy:
+        comp = await client.add_component(slot, componentType, **ID_SlotData.ToMembers(state))
+        registry.shadow.record(comp.id, state)
+        return comp
+
+    @staticmethod
+    async def SendChangedAsync(client : ResoniteLinkWebsocketClient, target : SlotProxy | ComponentProxy, state : dict[str, Any],
+                               registry : SlotRegistry, stats : 'SendStats' = None, full : bool = False) -> bool:
+        """
+        Update a slot or component with the members that changed since they were last sent.
+
+        Parameters
+        ----------
+        client : ResoniteLinkWebsocketClient
+            The client, or the batcher in front of it
+        target : SlotProxy | ComponentProxy
+            The slot or component to update
+        state : dict[str, Any]
+            The values its members should have, as plain values
+        registry : SlotRegistry
+            The registry holding the shadow state
+        stats : SendStats
+            Counts the updates that were skipped, if given
+        full : bool
+            Send every member, nothing that failed to arrive is noticed otherwise
+
+        Returns
+        -------
+        sent : bool
+            False if nothing changed and no request was made
+        """
+
+        changed = dict(state) if full else registry.shadow.changed(target.id, state)
+        if len(changed) == 0:
+            if stats is not None:
+                stats.countSkipped()
+            return False
+        registry.shadow.record(target.id, changed)
+        try:
+            if isinstance(target, SlotProxy):
+                await client.update_slot(slot=target, **ID_SlotData.ToMembers(changed))
+            else:
+                await client.update_component(target, **ID_SlotData.ToMembers(changed))
+        except:
+            # unknown what arrived, the next update sends everything
+            registry.shadow.forget(target.id)
+            raise
+        return True
+
+    # Until the send checked that the slot still exists, the update has to be sent in full to find out
+    async def sendChangedAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', target : SlotProxy | ComponentProxy, state : dict[str, Any]) -> bool:
+        return await ID_SlotData.SendChangedAsync(client, target, state, context.registry, context.stats, full=not context.slotsValidated)
         
 
 class AssetSlotData(ID_SlotData):
 
-    assetsSlotRoot : SlotProxy = None
-
-    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await AssetSlotData.getAssetsSlotRootAsync(client, context)
         await super().instantiateAsync(client, context)
-        assetsSlotRoot = await AssetSlotData.getAssetsSlotRootAsync(client, context)
-        await client.update_slot(
-            slot=self.slot,
-            parent=assetsSlotRoot
-        )
         
-    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await AssetSlotData.getAssetsSlotRootAsync(client, context)
         await super().updateAsync(client, context)
-        assetsSlotRoot = await AssetSlotData.getAssetsSlotRootAsync(client, context)
-        await client.update_slot(
-            slot=self.slot,
-            parent=assetsSlotRoot
-        )
+
+    def getSlotState(self, context : 'SceneSnapshot') -> dict[str, Any]:
+        state = super().getSlotState(context)
+        state['parent'] = context.registry.assetsSlotRoot
+        return state
 
     @classmethod
-    async def getAssetsSlotRootAsync(cls, client : ResoniteLinkWebsocketClient, context : bpy.types.Context) -> SlotProxy:
-        if AssetSlotData.assetsSlotRoot is None:
-            AssetSlotData.assetsSlotRoot = await client.add_slot(
-                name="Assets",
-                parent=SceneSlotData.Get(context.scene).slot
-            )
+    async def getAssetsSlotRootAsync(cls, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> SlotProxy:
+        registry = context.registry
+        sceneSlot = SceneSlotData.Get(registry, context.key).slot
+        if registry.assetsSlotRoot is None:
+            entry = registry.mapping.take("ASSETS")
+            if entry is not None:
+                registry.assetsSlotRoot = SlotProxy(client, entry['slot'])
+
+        state = {'name': "Assets", 'parent': sceneSlot}
+        if registry.assetsSlotRoot is None:
+            registry.assetsSlotRoot = await ID_SlotData.AddSlotAsync(client, registry, state)
+        elif context.slotsValidated:
+            await ID_SlotData.SendChangedAsync(client, registry.assetsSlotRoot, state, registry, context.stats)
         else:
             try:
-                await client.update_slot(
-                    AssetSlotData.assetsSlotRoot,
-                    name="Assets",
-                    parent=SceneSlotData.Get(context.scene).slot
-                )
+                await ID_SlotData.SendChangedAsync(client, registry.assetsSlotRoot, state, registry, context.stats, full=True)
             except:
-                AssetSlotData.assetsSlotRoot = None
-                return await AssetSlotData.getAssetsSlotRootAsync(client, context)
-
-        return AssetSlotData.assetsSlotRoot
+                # slot was probably deleted
+                registry.assetsSlotRoot = await ID_SlotData.AddSlotAsync(client, registry, state)
+        return registry.assetsSlotRoot
 
 
 class MaterialAssetSlotData(AssetSlotData):
 
-    defaultMaterial : ComponentProxy = None
+    componentAttrs = ['matComp']
+    # members that reference a texture, the keys of MaterialSnapshot.textureInputs
+    textureMembers = ['AlbedoTexture', 'NormalMap']
 
-    def __init__(self, mat : bpy.types.Material):
+    def __init__(self, mat : 'MaterialSnapshot'):
         super().__init__(mat)
-        
+        self.matComp : ComponentProxy = None
+        self.textured = False # a texture was assigned, it has to be cleared if the material loses it
+
     @classmethod
-    def Get(cls, mat : bpy.types.Material) -> 'MaterialAssetSlotData':
-        return super().Get(mat)
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'MaterialAssetSlotData':
+        return super().Get(registry, key)
+
+    @classmethod
+    async def AddOrUpdateAsync(cls, mat : 'MaterialSnapshot', client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> 'MaterialAssetSlotData':
+        matSlotData = MaterialAssetSlotData.Get(context.registry, mat.key)
+        if matSlotData is None:
+            matSlotData = MaterialAssetSlotData(mat)
+            context.registry.add(mat.key, matSlotData)
+            await matSlotData.instantiateOrRestoreAsync(client, context)
+        else:
+            matSlotData.snapshot = mat
+            await matSlotData.updateOrInstantiateAsync(client, context)
+        return matSlotData
     
-    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
         await super().instantiateAsync(client, context)
-        color = self.findNodeValue("Base Color") # ShaderNodeBsdfPrincipled
-        color = (1,1,1,1) if color is None else color
-        self.matComp = await self.slot.add_component(
+        self.matComp = await ID_SlotData.AddComponentAsync(
+            client,
+            context.registry,
+            self.slot,
             "[FrooxEngine]FrooxEngine.PBS_VertexColorMetallic",
-            AlbedoColor=Field_ColorX(value=ColorX(color[0], color[1], color[2], color[3], "Linear"))
+            self.getMaterialState()
         )
         
-    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
         await super().updateAsync(client, context)
-        color = self.findNodeValue("Base Color") # ShaderNodeBsdfPrincipled
-        color = (1,1,1,1) if color is None else color
-        await self.matComp.update_members(
-            AlbedoColor=Field_ColorX(value=ColorX(color[0], color[1], color[2], color[3], "Linear"))
-        )
-    
-    def findNodeValue(self, nodeName : str) -> Any:
-        mat : bpy.types.Material = self.id
-        for node in mat.node_tree.nodes: # https://docs.blender.org/api/current/bpy.types.ShaderNode.html#shadernode-nodeinternal
-            for input in node.inputs:
-                if input.name == nodeName:
-                    return input.default_value
-        return None
+        await self.sendChangedAsync(client, context, self.matComp, self.getMaterialState())
+
+    def getMaterialState(self) -> dict[str, Any]:
+        color = self.snapshot.baseColor
+        return {'AlbedoColor': (color[0], color[1], color[2], color[3])}
+
+    # Textures are assigned once they were imported, the material is shown with its color until then
+    async def setTexturesAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        if self.matComp is None or (len(self.snapshot.textures) == 0 and not self.textured):
+            return
+        state = {}
+        for member in MaterialAssetSlotData.textureMembers:
+            textureSnapshot = self.snapshot.textures.get(member, None)
+            textureData = TextureAssetSlotData.Get(context.registry, textureSnapshot.key) if textureSnapshot is not None else None
+            state[member] = textureData.textureComp if textureData is not None else None
+        await self.sendChangedAsync(client, context, self.matComp, state)
+        self.textured = any(texture is not None for texture in state.values())
     
     @classmethod
-    async def AddDefaultMaterialAsync(cls, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
-        if MaterialAssetSlotData.defaultMaterial is None:
+    async def AddDefaultMaterialAsync(cls, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        registry = context.registry
+        if registry.defaultMaterial is None:
+            entry = registry.mapping.take("DEFAULT_MATERIAL")
+            if entry is not None and 'matComp' in entry['components']:
+                registry.defaultMaterialSlot = SlotProxy(client, entry['slot'])
+                registry.defaultMaterial = ComponentProxy(client, entry['components']['matComp'])
+                return
             assetsSlot = await AssetSlotData.getAssetsSlotRootAsync(client, context)
-            defaultMatSlot = await client.add_slot(
-                name="Default Material (Debug)",
-                parent=assetsSlot
-            )
-            matComp = await defaultMatSlot.add_component("[FrooxEngine]FrooxEngine.PBS_VertexColorMetallic")
-            MaterialAssetSlotData.defaultMaterial = matComp
+            defaultMatSlot = await ID_SlotData.AddSlotAsync(client, registry, {'name': "Default Material (Debug)", 'parent': assetsSlot})
+            matComp = await ID_SlotData.AddComponentAsync(client, registry, defaultMatSlot, "[FrooxEngine]FrooxEngine.PBS_VertexColorMetallic", {})
+            registry.defaultMaterialSlot = defaultMatSlot
+            registry.defaultMaterial = matComp
+
+class MeshAssetCache():
+    """LRU map of mesh content fingerprints to the asset URLs they were already imported as, or the [url, materials] pairs of their chunks"""
+
+    def __init__(self, maxEntries : int = 1024):
+        self.entries : OrderedDict[str, str | list] = OrderedDict()
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.shared : SharedAssetStore = None # set by batch exports, looked up on a miss and written to along with the entries
+
+    def get(self, fingerprint : str) -> str | list:
+        self.lock.acquire()
+        url = self.entries.get(fingerprint, None)
+        if url is not None:
+            self.hits += 1
+            self.entries.move_to_end(fingerprint)
+        self.lock.release()
+        if url is not None:
+            return url
+
+        url = self.shared.get(fingerprint) if self.shared is not None else None
+        self.lock.acquire()
+        if url is None:
+            self.misses += 1
+        else:
+            # imported by another process
+            self.hits += 1
+            self.entries[fingerprint] = url
+            while len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+        self.lock.release()
+        return url
+
+    def put(self, fingerprint : str, url : str | list):
+        self.lock.acquire()
+        self.entries[fingerprint] = url
+        self.entries.move_to_end(fingerprint)
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+        self.lock.release()
+        if self.shared is not None:
+            self.shared.put(fingerprint, url)
+
+    def clear(self):
+        self.lock.acquire()
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.lock.release()
+
+
+class SharedAssetStore():
+    """
+    Asset URLs kept in a folder that several Blender processes use at the same time, so that the workers
+    of a batch export import every mesh and texture only once between them.
+
+    Every fingerprint is one small file holding its URL as JSON. Files are written to a temporary name and renamed,
+    so a file that exists is always complete. Two workers that miss the same asset at the same time both import it.
+    """
+
+    extension = ".json"
+
+    def __init__(self, directory : str):
+        self.directory = directory
+        self.logger = logging.getLogger("ResoniteLink")
+
+    def path(self, fingerprint : str) -> str:
+        return os.path.join(self.directory, fingerprint.replace("/", "_") + SharedAssetStore.extension)
+
+    def get(self, fingerprint : str) -> str | list:
+        try:
+            with open(self.path(fingerprint), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, fingerprint : str, url : str | list):
+        path = self.path(fingerprint)
+        tempPath = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tempPath, "w") as f:
+                json.dump(url, f)
+            os.replace(tempPath, path)
+        except OSError as e:
+            self.logger.log(logging.WARNING, f"Could not write to the shared asset folder: {e}")
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+
 
 class MeshAssetSlotData(AssetSlotData):
 
-    def __init__(self, mesh : bpy.types.Mesh):
+    assetCache = MeshAssetCache()
+    uploads : dict[str, asyncio.Future] = {} # fingerprint -> import in progress, only used on the websocket thread
+
+    componentAttrs = ['meshComp', 'proxyComp']
+    componentListAttrs = ['chunkComps']
+
+    def __init__(self, mesh : 'MeshSnapshot'):
         super().__init__(mesh)
-        self.meshComp : ComponentProxy = None
+        self.meshComp : ComponentProxy = None # the whole mesh, or its first chunk
+        self.chunkComps : list[ComponentProxy] = [] # StaticMesh of every further chunk
+        self.chunkMaterials : list[list[int]] = [] # material indices of the submeshes of every chunk, empty if not chunked
+        self.fingerprint : str = None # fingerprint of the mesh that meshComp currently points at
+        self.proxyComp : ComponentProxy = None # StaticMesh of the decimated preview
+        self.proxyFingerprint : str = None
+        self.proxyMaterials : list[int] = [] # material indices of the submeshes of the preview
+        self.useProxy = False # only send the preview, the full mesh is sent later with sendMeshAsync
+        self.proxyActive = False # renderers should show the preview until the full mesh arrived
         
     @classmethod
-    def Get(cls, mesh : bpy.types.Mesh) -> 'MeshAssetSlotData':
-        return super().Get(mesh)
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'MeshAssetSlotData':
+        return super().Get(registry, key)
+
+    @classmethod
+    async def AddOrUpdateAsync(cls, mesh : 'MeshSnapshot', client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', proxy : bool = False) -> 'MeshAssetSlotData':
+        meshSlotData = MeshAssetSlotData.Get(context.registry, mesh.key)
+        if meshSlotData is None:
+            meshSlotData = MeshAssetSlotData(mesh)
+            meshSlotData.useProxy = proxy
+            context.registry.add(mesh.key, meshSlotData)
+            await meshSlotData.instantiateOrRestoreAsync(client, context)
+        else:
+            meshSlotData.snapshot = mesh
+            meshSlotData.useProxy = proxy
+            await meshSlotData.updateOrInstantiateAsync(client, context)
+        return meshSlotData
+
+    def toMappingEntry(self) -> dict:
+        entry = super().toMappingEntry()
+        entry['fingerprint'] = self.fingerprint
+        entry['proxyFingerprint'] = self.proxyFingerprint
+        entry['proxyMaterials'] = self.proxyMaterials
+        entry['chunkMaterials'] = self.chunkMaterials
+        return entry
+
+    def restoreFromMapping(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> bool:
+        entry = context.registry.mapping.entries.get(self.snapshot.mappingKey, None)
+        if not super().restoreFromMapping(client, context):
+            return False
+        self.chunkMaterials = entry.get('chunkMaterials', [])
+        if len(self.chunkComps) == max(len(self.chunkMaterials) - 1, 0):
+            self.fingerprint = entry.get('fingerprint', None)
+        self.proxyFingerprint = entry.get('proxyFingerprint', None)
+        self.proxyMaterials = entry.get('proxyMaterials', [])
+        return True
+
+    def meshComps(self) -> list[ComponentProxy]:
+        return ([self.meshComp] if self.meshComp is not None else []) + self.chunkComps
+
+    # the StaticMesh components renderers should currently point at
+    def renderComps(self) -> list[ComponentProxy]:
+        return [self.proxyComp] if self.proxyActive else self.meshComps()
+
+    # and the material indices of their submeshes, empty if they have a submesh for every material
+    def renderMaterials(self) -> list[list[int]]:
+        return [self.proxyMaterials] if self.proxyActive else self.chunkMaterials
     
-    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
         await super().instantiateAsync(client, context)
-        assetUrl = await self.getMeshUrlAsync(client, context)
-        self.meshComp = await self.slot.add_component(
-            "[FrooxEngine]FrooxEngine.StaticMesh",
-            URL=Field_Uri(value=assetUrl)
-        )
+        self.meshComp = None
+        self.chunkComps = []
+        self.fingerprint = None
+        self.proxyComp = None
+        self.proxyFingerprint = None
+        if self.useProxy:
+            await self.sendProxyAsync(client, context)
+        else:
+            await self.sendMeshAsync(client, context)
         
-    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
         await super().updateAsync(client, context)
-        assetUrl = await self.getMeshUrlAsync(client, context)
-        await self.meshComp.update_members(
-            URL=Field_Uri(value=assetUrl)
-        )
+        if self.useProxy:
+            await self.sendProxyAsync(client, context)
+        else:
+            await self.sendMeshAsync(client, context)
 
-    async def getMeshUrlAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context) -> str:
-        meshData = self.collectMeshData()
+    async def sendProxyAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        with context.stats.phase("wait for mesh read", mesh=self.snapshot.name):
+            arrays = await self.snapshot.arraysAsync()
+        loop = asyncio.get_running_loop()
+        with context.stats.phase("fingerprint", mesh=self.snapshot.name):
+            fingerprint = await loop.run_in_executor(None, meshFingerprint, arrays)
 
-        # Import the raw mesh data into Resonite
-        asset_url = await client.import_mesh_raw_data(**meshData)
+        if self.meshComp is not None and self.fingerprint is not None and self.fingerprint.split("/")[0] == fingerprint:
+            # the full mesh is there already, no need for a preview
+            self.proxyActive = False
+            return
 
-        return asset_url
-    
-    def collectMeshData(self) -> dict[str, Any]:
+        # stay well below the chunk budget, corners are only merged within a cluster
+        vertexBudget = chunkVertexBudget(arrays, context.chunkVertexBudget, context.chunkByteBudget)
+        targetVertices = min(int(len(arrays.positions) * context.lodRatio), vertexBudget // 4)
+        fingerprint = f"{fingerprint}/proxy/{targetVertices}"
+
+        if fingerprint != self.proxyFingerprint or self.proxyComp is None:
+            # cached like a mesh with a single chunk, since collapsed triangles can take whole materials with them
+            async def importProxy() -> list[list]:
+                materials = []
+                def build():
+                    buffers = buildMeshBuffers(decimateMeshArrays(arrays, targetVertices))
+                    materials.extend(buffers.submeshMaterials)
+                    return buffers
+                return [[await self.importMeshAsync(client, context, build, " (preview)"), materials]]
+            cached = await MeshAssetSlotData.GetAssetAsync(fingerprint, importProxy)
+            assetUrl, self.proxyMaterials = cached[0]
+
+            if self.proxyComp is None:
+                self.proxyComp = await ID_SlotData.AddComponentAsync(
+                    client, context.registry, self.slot, "[FrooxEngine]FrooxEngine.StaticMesh", {'URL': assetUrl}
+                )
+            else:
+                await self.sendChangedAsync(client, context, self.proxyComp, {'URL': assetUrl})
+            self.proxyFingerprint = fingerprint
+
+        self.proxyActive = True
+
+    async def sendMeshAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        # The arrays are read on the main thread while other meshes upload, hashing and deduplication happen in a worker thread
+        with context.stats.phase("wait for mesh read", mesh=self.snapshot.name):
+            arrays = await self.snapshot.arraysAsync()
+        loop = asyncio.get_running_loop()
+        with context.stats.phase("fingerprint", mesh=self.snapshot.name):
+            fingerprint = await loop.run_in_executor(None, meshFingerprint, arrays)
+
+        vertexBudget = chunkVertexBudget(arrays, context.chunkVertexBudget, context.chunkByteBudget)
+        chunked = needsChunking(arrays, vertexBudget)
+        if chunked:
+            # the same mesh is split differently under a different budget
+            fingerprint = f"{fingerprint}/{vertexBudget}"
 
-        mesh : bpy.types.Mesh = self.id
+        if fingerprint == self.fingerprint and self.meshComp is not None:
+            # StaticMesh already points at this exact mesh
+            self.proxyActive = False
+            return
 
-        # Calculate custom normals
-        if (hasattr(mesh, 'calc_normals_split')):
-            # Old method (4.0)
-            mesh.calc_normals_split()
+        # Only import the mesh if the same data was never imported before and isn't being imported right now
+        if chunked:
+            cached = await MeshAssetSlotData.GetAssetAsync(fingerprint, lambda: self.importChunksAsync(client, context, arrays, vertexBudget))
         else:
-            # TODO: New method
-            #mesh.customdata_custom_splitnormals_add()
-            pass
+            cached = await MeshAssetSlotData.GetAssetAsync(fingerprint, lambda: self.importMeshAsync(client, context, lambda: buildMeshBuffers(arrays)))
 
-        # Triangulate the evaluated mesh
-        mesh.calc_loop_triangles()
-        
-        hasTangents = False
-        # tangent calculation only works for tris and quads, also it needs a UV map
-        if not any(poly.loop_total < 3 or poly.loop_total > 4 for poly in mesh.polygons) and len(mesh.uv_layers) > 0:
-            hasTangents = True
-            mesh.calc_tangents()
-
-        # Get all UV Sets
-        uv_layers = mesh.uv_layers
-        
-        # Get vertex color attributes (Limited to the first color group)
-        vertex_colors = -1
-        vertex_color_domain = 'CORNER'  # Default domain
-        if (hasattr(mesh, 'color_attributes')):
-            # New way with color attributes
-            if (len(mesh.color_attributes) > 0):
-                vertex_colors = mesh.color_attributes[0]
-                vertex_color_domain = vertex_colors.domain
+        if chunked:
+            # chunks are cached as [url, material indices] pairs
+            urls = [url for url, _ in cached]
+            self.chunkMaterials = [materials for _, materials in cached]
         else:
-            # Old way with vertex colors
-            if (len(mesh.vertex_colors) > 0):
-                vertex_colors = mesh.vertex_colors
+            urls = [cached]
+            self.chunkMaterials = []
 
-        # Save a dictionary of unique vertex hashes for fast indexing
-        v_map = {}  # TODO: Make hashing faster probably
-        idmax = 0   # Current maximum vertex ID
-        
-        # Create output lists
-        verts = []  # Position data of each vertex (replicated)
-        colors = []  # Currently limited to 1 color attribute per vertex
-        normals = []  # Normals per vertex
-        tangents = []  # Tangents per vertex
-        uvs = [[] for _ in uv_layers]  # List of uv lists per uv set
-        submeshes = []  # List of lists of triangle indices, per material
-
-        # Loop through all triangles and store their indices according
-        # to their material ID
-        tris : list[bpy.types.MeshLoopTriangle] = mesh.loop_triangles
-        tri_map = {}  # A dictionary of material ID mapped to triangle indices
-        for tri in tris:
-            # Get the material ID for this triangle
-            mat_id = mesh.polygons[tri.polygon_index].material_index
-            
-            # If the current material doesn't exist in the map add it
-            if (mat_id not in tri_map):
-                tri_map[mat_id] = []
-            
-            # Get loop indices
-            tri_loops = tri.loops
-            
-            # Append triangles to the submesh map (reverse winding order)
-            for loop_idx in reversed(tri_loops):
-                # Extract vertex information
-                vidx = mesh.loops[loop_idx].vertex_index
-                vpos = mesh.vertices[vidx].co
-                vnor = mesh.loops[loop_idx].normal
-                vuvs = [(layer.name, layer.data[loop_idx].uv) for layer in uv_layers]
-                vtan = mesh.loops[loop_idx].tangent
-                vcol = None
-                if (vertex_colors != -1):
-                    # Check the domain of the color attribute before assignment
-                    col_idx = vidx if (vertex_color_domain == 'POINT') else loop_idx
-                    vcol = vertex_colors.data[col_idx].color
-                
-                # Construct a unique hash for the vertex
-                vhash = (
-                    int(vidx),
-                    (vnor.x, vnor.y, vnor.z),
-                    tuple((name, uv.x, uv.y) for name, uv in vuvs),
-                    (vcol[0], vcol[1], vcol[2], vcol[3]) if (vertex_colors != -1) else None,
-                    (vtan.x, vtan.y, vtan.z) if hasTangents else None
-                )
-                
-                # Check if the vertex exists uniquely and get its id
-                v_tid = -1
-                if (not vhash in v_map):
-                    # Store the new index
-                    v_map[vhash] = idmax
-                    v_tid = idmax
-                    idmax = idmax + 1
-                    
-                    # Store new data for this vertex
-                    verts.append(Float3(
-                            *b2u_coords(vpos.x, vpos.y, vpos.z)
-                    ))
-                    if (vertex_colors != -1):
-                        colors.append(Color(
-                            vcol[0], vcol[1], vcol[2], vcol[3]
-                        ))
-                    normals.append(Float3(
-                        *b2u_coords(vnor[0], vnor[1], vnor[2])
-                    ))
-                    if hasTangents:
-                        tangents.append(Float4(
-                            *b2u_coords(*vtan), -mesh.loops[loop_idx].bitangent_sign
-                        ))
-                    for uid, layer in enumerate(vuvs):
-                        uvs[uid].append(layer[1][0])
-                        uvs[uid].append(layer[1][1])
-                else:
-                    # Retrieve the old index
-                    v_tid = v_map[vhash]
-                
-                # Append the vertex index to the triangle map
-                tri_map[mat_id].append(v_tid)
-        
-        # Expand the triangle map into a list of lists (sorted by material id)
-        for mid in sorted(tri_map):
-            submeshes.append(tri_map[mid])
-        
-        # Clean up data
-        if (hasattr(mesh, 'calc_normals_split')):
-            mesh.free_normals_split()
+        await self.setMeshUrlsAsync(client, context, urls)
+        self.fingerprint = fingerprint
+        self.proxyActive = False
+
+    @staticmethod
+    async def GetAssetAsync(fingerprint : str, importAsync : Callable[[], Awaitable[str | list]]) -> str | list:
+        cached = MeshAssetSlotData.assetCache.get(fingerprint)
+        if cached is not None:
+            return cached
+        # meshes with the same content that are sent at the same time wait for the first one
+        upload = MeshAssetSlotData.uploads.get(fingerprint, None)
+        if upload is None:
+            async def importAndCache() -> str | list:
+                result = await importAsync()
+                MeshAssetSlotData.assetCache.put(fingerprint, result)
+                return result
+            upload = asyncio.ensure_future(importAndCache())
+            MeshAssetSlotData.uploads[fingerprint] = upload
+            upload.add_done_callback(lambda _: MeshAssetSlotData.uploads.pop(fingerprint, None))
+        return await asyncio.shield(upload)
+
+    async def setMeshUrlsAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', urls : list[str]):
+        existing = self.meshComps()
+
+        async def setUrl(i : int, url : str) -> ComponentProxy:
+            if i < len(existing):
+                await self.sendChangedAsync(client, context, existing[i], {'URL': url})
+                return existing[i]
+            return await ID_SlotData.AddComponentAsync(
+                client, context.registry, self.slot, "[FrooxEngine]FrooxEngine.StaticMesh", {'URL': url}
+            )
+
+        comps = list(await asyncio.gather(*(setUrl(i, url) for i, url in enumerate(urls))))
+
+        # the mesh has fewer chunks than before
+        for comp in existing[len(urls):]:
+            await MeshAssetSlotData.releaseComponentAsync(client, context, comp)
+
+        self.meshComp = comps[0]
+        self.chunkComps = comps[1:]
+
+    # called once every renderer shows the full mesh, unless the preview is kept for an LOD group
+    async def releaseProxyAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        if self.proxyComp is None or self.proxyActive:
+            return
+        await MeshAssetSlotData.releaseComponentAsync(client, context, self.proxyComp)
+        self.proxyComp = None
+        self.proxyFingerprint = None
+        self.proxyMaterials = []
+
+    # Resonite unloads an asset once no StaticMesh points at it anymore
+    @staticmethod
+    async def releaseComponentAsync(client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', comp : ComponentProxy):
+        if hasattr(client, 'remove_component'):
+            await client.remove_component(comp)
+            context.registry.shadow.forget(comp.id)
         else:
-            # mesh.customdata_custom_splitnormals_clear()
-            pass
-        
-        if hasTangents:
-            mesh.free_tangents()
+            await ID_SlotData.SendChangedAsync(client, comp, {'URL': None}, context.registry, context.stats, full=True)
 
-        return {
-            'positions': verts,
-            'submeshes': [
-                TriangleSubmeshRawData(len(tri_indicies)//3, tri_indicies) for tri_indicies in submeshes
-            ],
-            'colors': colors if (vertex_colors != -1) else None,
-            'normals': normals,
-            'uv_channel_dimensions': [2 for _ in uvs],  # Hard coded to U, V (2D)
-            'uvs': uvs,
-            'tangents': tangents if hasTangents else None
-        }
+    async def importChunksAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', arrays : MeshArrays, vertexBudget : int) -> list[list]:
+        # Chunks are built, encoded and uploaded one after the other, so only one of them is in memory at a time
+        chunks = iterMeshChunks(arrays, vertexBudget)
+        result = []
+        while True:
+            materials = []
+            def build():
+                buffers = next(chunks, None)
+                if buffers is not None:
+                    materials.extend(buffers.submeshMaterials)
+                return buffers
+            url = await self.importMeshAsync(client, context, build, f" (chunk {len(result) + 1})")
+            if url is None:
+                break
+            result.append([url, materials])
+        logging.getLogger("ResoniteLink").log(logging.INFO, f"Mesh {self.snapshot.name}: sent as {len(result)} chunks of at most {vertexBudget} vertices")
+        return result
     
+    async def importMeshAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', build : Callable[[], MeshBuffers], label : str = "") -> str:
+
+        def encode():
+            # peak memory is only known while tracemalloc is running, and covers every thread
+            measureMemory = tracemalloc.is_tracing()
+            if measureMemory:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            buffers = build()
+            if buffers is None:
+                return None, 0.0, None
+            encodeStart = time.perf_counter()
+            context.stats.record("build mesh", start, encodeStart - start, mesh=self.snapshot.name + label, vertices=buffers.vertexCount)
+            payload = encodeMeshPayload(buffers)
+            context.stats.record("encode mesh", encodeStart, time.perf_counter() - encodeStart, mesh=self.snapshot.name + label)
+            encodeTime = time.perf_counter() - start
+            peakMemory = tracemalloc.get_traced_memory()[1] if measureMemory else None
+            return payload, encodeTime, peakMemory
+
+        # the context carries the current job over to the worker thread, for the stats
+        payload, encodeTime, peakMemory = await asyncio.get_running_loop().run_in_executor(None, contextvars.copy_context().run, encode)
+        if payload is None:
+            return None
+        context.stats.addBytes(payload.byteSize)
+
+        message = f"Mesh {self.snapshot.name}{label}: {payload.vertexCount} vertices encoded in {encodeTime * 1000:.1f} ms as a {payload.byteSize / 1024:.1f} KiB binary payload"
+        if peakMemory is not None:
+            message += f", peak traced memory {peakMemory / (1024 * 1024):.1f} MiB"
+        logging.getLogger("ResoniteLink").log(logging.INFO, message)
+
+        # Import the raw mesh data into Resonite
+        with context.stats.phase("import mesh", mesh=self.snapshot.name + label, vertices=payload.vertexCount):
+            response = await client.send_message(MeshAssetSlotData.meshPayloadToMessage(payload))
+        if not isinstance(response, AssetData):
+            raise RuntimeError(f"Unexpected response to the import of mesh {self.snapshot.name}{label}: {type(response).__name__}")
+        return response.asset_url
+
+    @staticmethod
+    def meshPayloadToMessage(payload : MeshPayload) -> ImportMeshRawData:
+        # The message keeps its vertex data in the same packed blocks, they are handed over as they are.
+        # Its setters and import_mesh_raw_data of the client take one model object per element instead.
+        submeshes = []
+        for triangleCount, indices in zip(payload.submeshTriangleCounts, payload.submeshes):
+            submesh = TriangleSubmeshRawData(triangle_count=triangleCount)
+            submesh._indices = indices
+            submeshes.append(submesh)
+        message = ImportMeshRawData(uv_channel_dimensions=payload.uvChannelDimensions, submeshes=submeshes)
+        message.vertex_count = payload.vertexCount
+        message.has_normals = True
+        message.has_tangents = payload.tangents is not None
+        message.has_colors = payload.colors is not None
+        message._positions = payload.positions
+        message._normals = payload.normals
+        message._tangents = payload.tangents
+        message._colors = payload.colors
+        message._uvs = payload.uvs
+        if payload.boneWeights is not None:
+            message.bone_weight_count = payload.boneWeightCount
+            message._bone_weights = payload.boneWeights
+            message.bones = [Bone(name=name, bind_pose=Float4x4(*bindPose)) for name, bindPose in zip(payload.boneNames, payload.bindPoses)]
+        return message
+
+
+class TextureAssetSlotData(AssetSlotData):
+    """
+    An image used by materials, imported once and shown by a StaticTexture2D that every material using it references.
+
+    Images are recognized by the hash of their pixels, so an image that's imported already is never encoded or
+    uploaded again, and identical images share the upload. Encoded textures are also kept on disk by that hash,
+    they are only downscaled and encoded again if the cache folder was cleared.
+    """
+
+    # the cache only holds asset urls, the same LRU as for meshes does the job
+    assetCache = MeshAssetCache()
+    uploads : dict[str, asyncio.Future] = {} # fingerprint -> import in progress, only used on the websocket thread
+    diskCaches : dict[str, TextureDiskCache] = {}
+    unsupportedWarned = False
+
+    componentAttrs = ['textureComp']
+
+    def __init__(self, image : 'TextureSnapshot'):
+        super().__init__(image)
+        self.textureComp : ComponentProxy = None
+        self.fingerprint : str = None # fingerprint of the texture that textureComp currently points at
+
+    @classmethod
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'TextureAssetSlotData':
+        return super().Get(registry, key)
+
+    @classmethod
+    def Supported(cls, client : ResoniteLinkWebsocketClient) -> bool:
+        if hasattr(client, 'import_texture_2d_raw_data'):
+            return True
+        if not TextureAssetSlotData.unsupportedWarned:
+            TextureAssetSlotData.unsupportedWarned = True
+            logging.getLogger("ResoniteLink").log(logging.WARNING, "Textures can't be imported with this ResoniteLink.py version, materials only get their colors")
+        return False
+
+    @classmethod
+    def DiskCache(cls, directory : str) -> TextureDiskCache:
+        diskCache = TextureAssetSlotData.diskCaches.get(directory, None)
+        if diskCache is None:
+            diskCache = TextureDiskCache(directory)
+            TextureAssetSlotData.diskCaches[directory] = diskCache
+        return diskCache
+
+    @classmethod
+    async def AddOrUpdateAsync(cls, image : 'TextureSnapshot', client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> 'TextureAssetSlotData':
+        textureSlotData = TextureAssetSlotData.Get(context.registry, image.key)
+        if textureSlotData is None:
+            textureSlotData = TextureAssetSlotData(image)
+            context.registry.add(image.key, textureSlotData)
+            await textureSlotData.instantiateOrRestoreAsync(client, context)
+        else:
+            textureSlotData.snapshot = image
+            await textureSlotData.updateOrInstantiateAsync(client, context)
+        return textureSlotData
+
+    def toMappingEntry(self) -> dict:
+        entry = super().toMappingEntry()
+        entry['fingerprint'] = self.fingerprint
+        return entry
+
+    def restoreFromMapping(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> bool:
+        entry = context.registry.mapping.entries.get(self.snapshot.mappingKey, None)
+        if not super().restoreFromMapping(client, context):
+            return False
+        self.fingerprint = entry.get('fingerprint', None)
+        return True
+
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await super().instantiateAsync(client, context)
+        self.textureComp = None
+        self.fingerprint = None
+        await self.sendTextureAsync(client, context)
+
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await super().updateAsync(client, context)
+        await self.sendTextureAsync(client, context)
+
+    async def sendTextureAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        # The pixels are read on the main thread while meshes upload, hashing and encoding happen on the texture pool
+        with context.stats.phase("wait for image read", image=self.snapshot.name):
+            arrays = await self.snapshot.arraysAsync()
+        if arrays is None:
+            return
+        loop = asyncio.get_running_loop()
+        with context.stats.phase("fingerprint", image=self.snapshot.name):
+            fingerprint = await loop.run_in_executor(getTexturePool(), textureFingerprint, arrays)
+        # the same image is encoded differently under a different size limit
+        fingerprint = f"texture/{fingerprint}/{self.snapshot.maxSize}"
+
+        if fingerprint != self.fingerprint or self.textureComp is None:
+            assetUrl = await self.getAssetUrlAsync(client, context, fingerprint, arrays)
+            state = {'URL': assetUrl, 'IsNormalMap': self.snapshot.isNormalMap}
+            if self.textureComp is None:
+                self.textureComp = await ID_SlotData.AddComponentAsync(client, context.registry, self.slot, "[FrooxEngine]FrooxEngine.StaticTexture2D", state)
+            else:
+                await self.sendChangedAsync(client, context, self.textureComp, state)
+            self.fingerprint = fingerprint
+        else:
+            await self.sendChangedAsync(client, context, self.textureComp, {'IsNormalMap': self.snapshot.isNormalMap})
+
+    async def getAssetUrlAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', fingerprint : str, arrays : ImageArrays) -> str:
+        url = TextureAssetSlotData.assetCache.get(fingerprint)
+        if url is not None:
+            return url
+        # images with the same pixels that are sent at the same time wait for the first one
+        upload = TextureAssetSlotData.uploads.get(fingerprint, None)
+        if upload is None:
+            upload = asyncio.ensure_future(self.importTextureAsync(client, context, fingerprint, arrays))
+            TextureAssetSlotData.uploads[fingerprint] = upload
+            upload.add_done_callback(lambda _: TextureAssetSlotData.uploads.pop(fingerprint, None))
+        return await asyncio.shield(upload)
+
+    async def importTextureAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', fingerprint : str, arrays : ImageArrays) -> str:
+        loop = asyncio.get_running_loop()
+        pool = getTexturePool()
+        diskCache = TextureAssetSlotData.DiskCache(context.textureCacheDir)
+
+        payload = await loop.run_in_executor(pool, diskCache.get, fingerprint)
+        if payload is None:
+            start = time.perf_counter()
+            with context.stats.phase("encode texture", image=self.snapshot.name):
+                payload = await loop.run_in_executor(pool, encodeTexture, arrays, self.snapshot.maxSize)
+            logging.getLogger("ResoniteLink").log(logging.INFO, f"Texture {self.snapshot.name}: {arrays.width}x{arrays.height} encoded as "
+                                                  f"{payload.width}x{payload.height} in {(time.perf_counter() - start) * 1000:.1f} ms")
+            # written in the background, the import doesn't need to wait for it
+            pool.submit(diskCache.put, fingerprint, payload)
+        else:
+            logging.getLogger("ResoniteLink").log(logging.INFO, f"Texture {self.snapshot.name}: {payload.width}x{payload.height} read from the texture cache")
+        context.stats.addBytes(payload.byteSize)
+
+        with context.stats.phase("import texture", image=self.snapshot.name, pixels=payload.width * payload.height):
+            url = await client.import_texture_2d_raw_data(
+                width=payload.width,
+                height=payload.height,
+                color_profile=payload.colorProfile,
+                data=payload.data
+            )
+        TextureAssetSlotData.assetCache.put(fingerprint, url)
+        return url
+
 
 class ObjectSlotData(ID_SlotData):
 
-    def __init__(self, obj : bpy.types.Object):
+    # a baked animation drives slot members with a gradient driver each, whose progress is driven by a panner as its clock
+    componentAttrs = ['positionDriver', 'positionClock', 'rotationDriver', 'rotationClock', 'scaleDriver', 'scaleClock']
+
+    # the slot members an animation can drive, with the type of their values in Resonite
+    animatedMembers = {'position': "float3", 'rotation': "floatQ", 'scale': "float3"}
+    animationWarned = False
+
+    def __init__(self, obj : 'ObjectSnapshot'):
         super().__init__(obj)
+        self.positionDriver : ComponentProxy = None
+        self.positionClock : ComponentProxy = None
+        self.rotationDriver : ComponentProxy = None
+        self.rotationClock : ComponentProxy = None
+        self.scaleDriver : ComponentProxy = None
+        self.scaleClock : ComponentProxy = None
 
     @classmethod
-    def Get(cls, obj : bpy.types.Object) -> 'ObjectSlotData':
-        return super().Get(obj)
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'ObjectSlotData':
+        return super().Get(registry, key)
         
-    def getSlotKwargs(self, context : bpy.types.Context) -> dict[str, Any]:
-        obj : bpy.types.Object = self.id
-        parentSlotData = ObjectSlotData.Get(obj.parent) if obj.parent is not None else SceneSlotData.Get(context.scene)
-        localPos = obj.matrix_local.translation.to_tuple()
-        euler = obj.matrix_local.to_euler("XZY")
-        localRotQ = b2u_euler2quaternion(euler)
-        localScale = obj.matrix_local.to_scale().to_tuple() # could use obj.scale here which seems to preserve negative scale
-        return {'name': obj.name,
-                'position': Float3(*b2u_coords(*localPos)),
-                'rotation': FloatQ(localRotQ.x, localRotQ.y, localRotQ.z, localRotQ.w),
-                'scale': Float3(*b2u_scale(*localScale)),
-                'tag': obj.type,
-                'parent': parentSlotData.slot}
+    def getSlotState(self, context : 'SceneSnapshot' = None) -> dict[str, Any]:
+        obj : 'ObjectSnapshot' = self.snapshot
+        registry = SlotRegistry.ForScene(obj.sceneKey)
+        parentSlotData = ObjectSlotData.Get(registry, obj.parent.key) if obj.parent is not None else SceneSlotData.Get(registry, obj.sceneKey)
+        localRotQ = b2u_euler2quaternion(obj.localEuler)
+        state = {'name': obj.name,
+                 'position': tuple(b2u_coords(*obj.localPos)),
+                 'rotation': (localRotQ.x, localRotQ.y, localRotQ.z, localRotQ.w),
+                 'scale': tuple(b2u_scale(*obj.localScale)),
+                 'tag': obj.type,
+                 'parent': parentSlotData.slot}
+        # driven members can't be written to, the animation places the slot
+        for member in self.drivenMembers():
+            state.pop(member)
+        return state
+
+    def getSlotKwargs(self) -> dict[str, Any]:
+        return ID_SlotData.ToMembers(self.getSlotState())
     
-    async def ensureParentExistsAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
-        obj : bpy.types.Object = self.id
+    async def ensureParentExistsAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        obj : 'ObjectSnapshot' = self.snapshot
         if obj.parent is not None:
-            par = ObjectSlotData.Get(obj.parent)
+            par = ObjectSlotData.Get(context.registry, obj.parent.key)
             if par is None:
                 par = ObjectSlotData(obj.parent)
-                ID_SlotData.Add(obj.parent, par)
+                context.registry.add(obj.parent.key, par)
+                await par.instantiateOrRestoreAsync(client, context)
+            elif par.slot is None:
                 await par.instantiateAsync(client, context)
-            else:
-                try:
-                    await par.updateAsync(client, context)
-                except:
-                    # slot was probably deleted
-                    await par.instantiateAsync(client, context)
+            # otherwise the parent was already sent, parents are always sent before their children
     
-    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
         await self.ensureParentExistsAsync(client, context)
-        self.slot = await client.add_slot(
-            **self.getSlotKwargs(context)
-        )
+        # a new slot isn't animated until the animation is baked again
+        for attr in ObjectSlotData.componentAttrs:
+            setattr(self, attr, None)
+        self.slot = await ID_SlotData.AddSlotAsync(client, context.registry, self.getSlotState(context))
         
-    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await self.updateTransformAsync(client, context)
+
+    # only updates the slot itself, not any of the components on it
+    async def updateTransformAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
         await self.ensureParentExistsAsync(client, context)
-        await client.update_slot(
-            slot=self.slot,
-            **self.getSlotKwargs(context)
-        )
+        await self.sendChangedAsync(client, context, self.slot, self.getSlotState(context))
+
+    def drivenMembers(self) -> list[str]:
+        return [member for member in ObjectSlotData.animatedMembers if getattr(self, f"{member}Driver") is not None]
+
+    # the id of a member of a slot or component read back from Resonite, drives point at members rather than their owner
+    @staticmethod
+    def MemberId(data : Any, name : str) -> str:
+        member = getattr(data, name, None)
+        if member is None and isinstance(getattr(data, 'members', None), dict):
+            member = data.members.get(name, None)
+        return getattr(member, 'id', None)
+
+    @classmethod
+    def AnimationSupported(cls) -> bool:
+        return 'SyncObject' in globals() and 'Field_Float3' in globals() and 'Field_FloatQ' in globals()
+
+    async def setAnimationAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', tracks : dict[str, 'TransformTrack'], duration : float) -> int:
+        """
+        Drive the transform of the slot with baked tracks, so that the animation plays in Resonite on its own.
+
+        Every animated member gets a ValueGradientDriver holding its keys, its progress is driven by a Panner1D
+        that loops from 0 to 1 over the duration. Members without a track stop being driven.
+
+        Parameters
+        ----------
+        client : ResoniteLinkWebsocketClient
+            The client, or the batcher in front of it
+        context : SceneSnapshot
+            The snapshot of the scene the animation was baked in
+        tracks : dict[str, TransformTrack]
+            The track of every member that changes
+        duration : float
+            Seconds one loop of the animation takes
+
+        Returns
+        -------
+        driven : int
+            The number of members the animation drives
+        """
+
+        stopped = [member for member in self.drivenMembers() if member not in tracks]
+        if len(stopped) > 0:
+            await self.stopAnimationAsync(client, context, stopped)
+        if len(tracks) == 0:
+            return 0
+
+        slot = await client.get_slot(self.slot)
+        fieldIds = {member: ObjectSlotData.MemberId(slot, member) for member in tracks}
+        if None in fieldIds.values():
+            if not ObjectSlotData.animationWarned:
+                ObjectSlotData.animationWarned = True
+                logging.getLogger("ResoniteLink").log(logging.WARNING, "This ResoniteLink.py version doesn't report the ids of slot members, animations can't be sent")
+            return 0
+
+        async def setTrack(member : str, track : 'TransformTrack'):
+            driverState = {'Points': track.points(), 'Target': (fieldIds[member], ObjectSlotData.animatedMembers[member])}
+            driver = getattr(self, f"{member}Driver")
+            clock = getattr(self, f"{member}Clock")
+            if driver is None:
+                driver = await ID_SlotData.AddComponentAsync(
+                    client, context.registry, self.slot, f"[FrooxEngine]FrooxEngine.ValueGradientDriver<{ObjectSlotData.animatedMembers[member]}>", driverState
+                )
+                setattr(self, f"{member}Driver", driver)
+            else:
+                await self.sendChangedAsync(client, context, driver, driverState)
+
+            clockState = {'Speed': 1.0 / duration, 'Repeat': 1.0, 'Enabled': True}
+            if clock is None:
+                progressId = ObjectSlotData.MemberId(await client.get_component(driver), 'Progress')
+                clock = await ID_SlotData.AddComponentAsync(
+                    client, context.registry, self.slot, "[FrooxEngine]FrooxEngine.Panner1D", {'_target': progressId, **clockState}
+                )
+                setattr(self, f"{member}Clock", clock)
+            else:
+                await self.sendChangedAsync(client, context, clock, clockState)
+
+        await asyncio.gather(*(setTrack(member, track) for member, track in tracks.items()))
+        # the slot holds whatever the drivers last wrote now
+        context.registry.shadow.forget(self.slot.id)
+        return len(tracks)
+
+    async def stopAnimationAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', members : list[str]):
+        for member in members:
+            for attr in [f"{member}Driver", f"{member}Clock"]:
+                comp = getattr(self, attr)
+                setattr(self, attr, None)
+                if comp is None:
+                    continue
+                try:
+                    if hasattr(client, 'remove_component'):
+                        await client.remove_component(comp)
+                    elif attr.endswith("Driver"):
+                        # releases the member, the clock is left running but drives nothing else
+                        await self.sendChangedAsync(client, context, comp, {'Target': (None, ObjectSlotData.animatedMembers[member]), 'Enabled': False})
+                except Exception:
+                    # already gone
+                    pass
+                context.registry.shadow.forget(comp.id)
+        # the members are written again by the next send
+        context.registry.shadow.forget(self.slot.id)
 
     # def toMeshData(self) -> MeshObjectSlotData:
     #     meshObjectSlotData = MeshObjectSlotData(self.id)
@@ -393,117 +1072,315 @@ class ObjectSlotData(ID_SlotData):
     #     return meshObjectSlotData
 
 
+class ArmatureSlotData(ObjectSlotData):
+    """
+    An armature object, with a slot for every bone below its own slot.
+
+    The bone slots are placed like the posed bones and the renderers of skinned meshes point at them,
+    so posing the armature only updates the transforms of the bones that moved.
+    """
+
+    slotListAttrs = ['boneSlots']
+    removeWarned = False
+
+    def __init__(self, obj : 'ObjectSnapshot'):
+        super().__init__(obj)
+        self.boneSlots : list[SlotProxy] = [] # parents before their children
+        self.boneNames : list[str] = [] # the bone of every slot
+
+    @classmethod
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'ArmatureSlotData':
+        return super().Get(registry, key)
+
+    def toMappingEntry(self) -> dict:
+        entry = super().toMappingEntry()
+        entry['boneNames'] = self.boneNames
+        return entry
+
+    def restoreFromMapping(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> bool:
+        entry = context.registry.mapping.entries.get(self.snapshot.mappingKey, None)
+        if not super().restoreFromMapping(client, context):
+            return False
+        self.boneNames = entry.get('boneNames', [])
+        if len(self.boneNames) != len(self.boneSlots):
+            # slots that can't be matched to their bones are made again
+            self.boneNames = []
+            self.boneSlots = []
+        return True
+
+    def boneSlotIds(self) -> dict[str, str]:
+        return {name: slot.id for name, slot in zip(self.boneNames, self.boneSlots)}
+
+    def poseMatches(self, bones : list['BoneSnapshot']) -> bool:
+        # no bone was added, removed or renamed since the slots were made
+        return len(bones) == len(self.boneNames) and all(bone.name == name for bone, name in zip(bones, self.boneNames))
+
+    def getBoneState(self, bone : 'BoneSnapshot', slots : dict[str, SlotProxy]) -> dict[str, Any]:
+        localRotQ = b2u_euler2quaternion(bone.localEuler)
+        return {'name': bone.name,
+                'position': tuple(b2u_coords(*bone.localPos)),
+                'rotation': (localRotQ.x, localRotQ.y, localRotQ.z, localRotQ.w),
+                'scale': tuple(b2u_scale(*bone.localScale)),
+                'tag': "BONE",
+                'parent': slots[bone.parent.name] if bone.parent is not None else self.slot}
+
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await super().instantiateAsync(client, context)
+        self.boneSlots = []
+        self.boneNames = []
+        await self.sendBonesAsync(client, context)
+
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await super().updateAsync(client, context)
+        await self.sendBonesAsync(client, context)
+
+    async def sendBonesAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        existing = dict(zip(self.boneNames, self.boneSlots))
+        slots : dict[str, SlotProxy] = {}
+
+        async def sendBone(bone : 'BoneSnapshot') -> SlotProxy:
+            state = self.getBoneState(bone, slots)
+            slot = existing.pop(bone.name, None)
+            if slot is None:
+                return await ID_SlotData.AddSlotAsync(client, context.registry, state)
+            await self.sendChangedAsync(client, context, slot, state)
+            return slot
+
+        # one level of the hierarchy at a time, a slot can only be parented to one that exists
+        levels : dict[int, list['BoneSnapshot']] = {}
+        for bone in self.snapshot.bones:
+            levels.setdefault(bone.depth, []).append(bone)
+        for depth in sorted(levels):
+            level = levels[depth]
+            results = await asyncio.gather(*(sendBone(bone) for bone in level))
+            slots.update((bone.name, slot) for bone, slot in zip(level, results))
+
+        self.boneNames = [bone.name for bone in self.snapshot.bones]
+        self.boneSlots = [slots[name] for name in self.boneNames]
+
+        # bones that were deleted from the armature
+        await self.removeSlotsAsync(client, context, list(existing.values()))
+
+    async def removeSlotsAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', slots : list[SlotProxy]):
+        if len(slots) == 0:
+            return
+        if not hasattr(client, 'remove_slot'):
+            if not ArmatureSlotData.removeWarned:
+                ArmatureSlotData.removeWarned = True
+                logging.getLogger("ResoniteLink").log(logging.WARNING, "Slots can't be removed with this ResoniteLink.py version, deleted bones are left in Resonite")
+            return
+
+        async def remove(slot : SlotProxy):
+            context.registry.shadow.forget(slot.id)
+            try:
+                await client.remove_slot(slot)
+            except Exception:
+                # already gone
+                pass
+
+        await asyncio.gather(*(remove(slot) for slot in slots))
+
+    # used by live sync, once the slots of the bones exist
+    async def sendPoseAsync(self, client : ResoniteLinkWebsocketClient, registry : SlotRegistry) -> int:
+        slots = dict(zip(self.boneNames, self.boneSlots))
+        results = await asyncio.gather(*(
+            ID_SlotData.SendChangedAsync(client, slots[bone.name], self.getBoneState(bone, slots), registry) for bone in self.snapshot.bones
+        ))
+        return sum(results)
+
+
 class MeshObjectSlotData(ObjectSlotData):
 
-    def __init__(self, obj : bpy.types.Object):
+    componentAttrs = ['meshRenderer', 'proxyRenderer', 'lodGroup'] + ObjectSlotData.componentAttrs
+    componentListAttrs = ['chunkRenderers']
+
+    # fraction of the screen height below which the next level is shown, the preview is culled below the last one
+    lodTransitionHeights = [0.15, 0.01]
+    lodGroupWarned = False
+
+    def __init__(self, obj : 'ObjectSnapshot'):
         super().__init__(obj)
         self.meshData : MeshAssetSlotData = None
         self.matData : list[MaterialAssetSlotData] = [] 
         self.meshRenderer : ComponentProxy = None
+        self.chunkRenderers : list[ComponentProxy] = [] # renderers of every chunk after the first one, if the mesh was split
+        self.proxyRenderer : ComponentProxy = None # renders the preview when the levels are kept as an LOD group
+        self.lodGroup : ComponentProxy = None
         self.hidden = False
+        self.skinned = False # the renderers are SkinnedMeshRenderers
 
     @classmethod
-    def Get(cls, obj : bpy.types.Object) -> 'MeshObjectSlotData':
-        res = super().Get(obj)
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'MeshObjectSlotData':
+        res = super().Get(registry, key)
         return res
 
-    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    def toMappingEntry(self) -> dict:
+        entry = super().toMappingEntry()
+        entry['skinned'] = self.skinned
+        return entry
 
-        await super().instantiateAsync(client, context)
+    def restoreFromMapping(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> bool:
+        entry = context.registry.mapping.entries.get(self.snapshot.mappingKey, None)
+        if not super().restoreFromMapping(client, context):
+            return False
+        self.skinned = entry.get('skinned', False)
+        return True
 
-        matRefList = [
-            Reference(
-                target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Material>",
-                target_id=matData.matComp.id
-            ) for matData in self.matData
-        ]
+    def rendererType(self) -> str:
+        return "[FrooxEngine]FrooxEngine.SkinnedMeshRenderer" if self.skinned else "[FrooxEngine]FrooxEngine.MeshRenderer"
+
+    # the slots the bones of the mesh are bound to, in the order of its bones
+    def getBoneSlotIds(self, context : 'SceneSnapshot') -> tuple[str, ...]:
+        meshSnapshot = self.meshData.snapshot
+        armatureData = ArmatureSlotData.Get(context.registry, meshSnapshot.armature.key)
+        boneSlotIds = armatureData.boneSlotIds() if isinstance(armatureData, ArmatureSlotData) else {}
+        # bone 0 is this slot, bones without a slot stay with it as well
+        return (self.slot.id,) + tuple(boneSlotIds.get(name, self.slot.id) for name in meshSnapshot.boneNames[1:])
 
-        if len(matRefList) == 0:
-            if MaterialAssetSlotData.defaultMaterial == None:
+    async def getMaterialIdsAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', materialIndices : list[int] = None) -> tuple[str, ...]:
+        matDataList = self.matData
+        if materialIndices is not None:
+            # a chunk or preview only has submeshes for the materials it uses
+            matDataList = [self.matData[i] if i < len(self.matData) else None for i in materialIndices]
+
+        if len(matDataList) == 0 or None in matDataList:
+            if context.registry.defaultMaterial == None:
                 await MaterialAssetSlotData.AddDefaultMaterialAsync(client, context)
-            matRefList = [
-                Reference(
-                    target_id=MaterialAssetSlotData.defaultMaterial.id,
-                    target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Material>"
-                )
-            ]
-
-        self.meshRenderer = await self.slot.add_component(
-            "[FrooxEngine]FrooxEngine.MeshRenderer",
-            Mesh=Reference(
-                target_id=self.meshData.meshComp.id,
-                target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Mesh>"
-            ),
-            Materials=SyncList(
-                *matRefList
-            ),
-            Enabled=Field_Bool(value=not self.hidden)
+        if len(matDataList) == 0:
+            matDataList = [None]
+
+        return tuple(matData.matComp.id if matData is not None else context.registry.defaultMaterial.id for matData in matDataList)
+
+    async def getRendererStateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', chunk : int = 0, preview : bool = False) -> dict[str, Any]:
+        if preview:
+            meshComp = self.meshData.proxyComp
+            materialIndices = self.meshData.proxyMaterials
+        else:
+            meshComp = self.meshData.renderComps()[chunk]
+            renderMaterials = self.meshData.renderMaterials()
+            materialIndices = renderMaterials[chunk] if len(renderMaterials) > 0 else None
+        state = {
+            'Mesh': meshComp.id,
+            'Materials': await self.getMaterialIdsAsync(client, context, materialIndices),
+            'Enabled': not self.hidden
+        }
+        if self.skinned and not preview:
+            state['Bones'] = self.getBoneSlotIds(context)
+        return state
+
+    async def instantiateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+
+        await super().instantiateAsync(client, context)
+        await self.addRenderersAsync(client, context)
+
+    async def addRenderersAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        self.skinned = self.meshData.snapshot.armature is not None
+        self.meshRenderer = await ID_SlotData.AddComponentAsync(
+            client,
+            context.registry,
+            self.slot,
+            self.rendererType(),
+            await self.getRendererStateAsync(client, context)
         )
+        self.chunkRenderers = []
+        self.proxyRenderer = None
+        self.lodGroup = None
+        await self.setChunkRenderersAsync(client, context)
     
-    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
+    async def updateAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
         await super().updateAsync(client, context)
 
-        matRefList = [
-            Reference(target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Material>",
-                    target_id=matData.matComp.id
-            ) for matData in self.matData
-        ]
+        if self.skinned != (self.meshData.snapshot.armature is not None):
+            await self.replaceRenderersAsync(client, context)
+            return
+        await self.sendChangedAsync(client, context, self.meshRenderer, await self.getRendererStateAsync(client, context))
+        await self.setChunkRenderersAsync(client, context)
 
-        if len(matRefList) == 0:
-            if MaterialAssetSlotData.defaultMaterial == None:
-                await MaterialAssetSlotData.AddDefaultMaterialAsync(client, context)
-            matRefList = [
-                Reference(
-                    target_id=MaterialAssetSlotData.defaultMaterial.id,
-                    target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Material>"
-                )
-            ]
-
-        await self.meshRenderer.update_members(
-            Mesh=Reference(
-                target_id=self.meshData.meshComp.id,
-                target_type="[FrooxEngine]FrooxEngine.IAssetProvider<[FrooxEngine]FrooxEngine.Mesh>"
-            ),
-            Materials=SyncList(
-                *matRefList
-            ),
-            Enabled=Field_Bool(value=not self.hidden)
-        )
+    # A renderer can't change its type, the renderers are made again once the object starts or stops being deformed by an armature
+    async def replaceRenderersAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        components = [self.meshRenderer, self.proxyRenderer, self.lodGroup] + self.chunkRenderers
+        for comp in components:
+            if comp is None:
+                continue
+            if hasattr(client, 'remove_component'):
+                await client.remove_component(comp)
+            else:
+                await self.sendChangedAsync(client, context, comp, {'Enabled': False})
+            context.registry.shadow.forget(comp.id)
+        await self.addRenderersAsync(client, context)
 
-    async def addOrUpdateMaterialAsync(self, mat : bpy.types.Material, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
-        matSlotData = MaterialAssetSlotData.Get(mat)
-        if matSlotData is None:
-            matSlotData = MaterialAssetSlotData(mat)
-            ID_SlotData.Add(mat, matSlotData)
-            await matSlotData.instantiateAsync(client, context)
+    # one more MeshRenderer on the slot for every further chunk of a split mesh
+    async def setChunkRenderersAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        chunkCount = len(self.meshData.renderComps())
+
+        async def setRenderer(chunk : int) -> ComponentProxy:
+            state = await self.getRendererStateAsync(client, context, chunk)
+            if chunk - 1 < len(self.chunkRenderers):
+                await self.sendChangedAsync(client, context, self.chunkRenderers[chunk - 1], state)
+                return self.chunkRenderers[chunk - 1]
+            return await ID_SlotData.AddComponentAsync(client, context.registry, self.slot, self.rendererType(), state)
+
+        renderers = list(await asyncio.gather(*(setRenderer(chunk) for chunk in range(1, chunkCount))))
+
+        # the mesh has fewer chunks than before
+        for renderer in self.chunkRenderers[len(renderers):]:
+            await self.sendChangedAsync(client, context, renderer, {'Enabled': False})
+            renderers.append(renderer)
+        self.chunkRenderers = renderers
+
+    # called once the full mesh replaced the preview
+    async def showFullMeshAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        await self.sendChangedAsync(client, context, self.meshRenderer, await self.getRendererStateAsync(client, context))
+        await self.setChunkRenderersAsync(client, context)
+        if context.lodMode == 'LOD_GROUP':
+            await self.setLodGroupAsync(client, context)
+
+    async def setLodGroupAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        if 'SyncObject' not in globals() or 'Field_Float' not in globals():
+            # older versions of ResoniteLink.py can't describe the LOD list, the preview was swapped out instead
+            if not MeshObjectSlotData.lodGroupWarned:
+                MeshObjectSlotData.lodGroupWarned = True
+                logging.getLogger("ResoniteLink").log(logging.WARNING, "LOD groups are not supported by this ResoniteLink.py version, previews are swapped out instead")
+            return
+
+        previewState = await self.getRendererStateAsync(client, context, preview=True)
+        if self.proxyRenderer is None:
+            self.proxyRenderer = await ID_SlotData.AddComponentAsync(client, context.registry, self.slot, "[FrooxEngine]FrooxEngine.MeshRenderer", previewState)
         else:
-            try:
-                await matSlotData.updateAsync(client, context)
-            except: 
-                await matSlotData.instantiateAsync(client, context)
-        
+            await self.sendChangedAsync(client, context, self.proxyRenderer, previewState)
+
+        levels = [[self.meshRenderer] + self.chunkRenderers, [self.proxyRenderer]]
+        state = {
+            'LODs': tuple(
+                (height, tuple(renderer.id for renderer in renderers)) for height, renderers in zip(MeshObjectSlotData.lodTransitionHeights, levels)
+            )
+        }
+        if self.lodGroup is None:
+            self.lodGroup = await ID_SlotData.AddComponentAsync(client, context.registry, self.slot, "[FrooxEngine]FrooxEngine.LODGroup", state)
+        else:
+            await self.sendChangedAsync(client, context, self.lodGroup, state)
+
+    async def hideAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        renderers = [self.meshRenderer] + self.chunkRenderers
+        if self.proxyRenderer is not None:
+            renderers.append(self.proxyRenderer)
+        for renderer in renderers:
+            await self.sendChangedAsync(client, context, renderer, {'Enabled': False})
+
+    async def addOrUpdateMaterialAsync(self, mat : 'MaterialSnapshot', client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        matSlotData = await MaterialAssetSlotData.AddOrUpdateAsync(mat, client, context)
         self.matData.append(matSlotData)
     
-    async def addOrUpdateMeshAsync(self, mesh : bpy.types.Mesh, client : ResoniteLinkWebsocketClient, context : bpy.types.Context):
-        meshSlotData = MeshAssetSlotData.Get(mesh)
-        if meshSlotData is None:
-            meshSlotData = MeshAssetSlotData(mesh)
-            ID_SlotData.Add(mesh, meshSlotData)
-            await meshSlotData.instantiateAsync(client, context)
-        else:
-            try:
-                await meshSlotData.updateAsync(client, context)
-            except: 
-                await meshSlotData.instantiateAsync(client, context)
-        
+    async def addOrUpdateMeshAsync(self, mesh : 'MeshSnapshot', client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot'):
+        meshSlotData = await MeshAssetSlotData.AddOrUpdateAsync(mesh, client, context)
         self.meshData = meshSlotData
         
 
 class SceneSlotData(ID_SlotData):
 
     @classmethod
-    def Get(cls, scene : bpy.types.Scene) -> 'SceneSlotData':
-        return super().Get(scene)
+    def Get(cls, registry : SlotRegistry, key : Hashable) -> 'SceneSlotData':
+        return super().Get(registry, key)
 
 
 def b2u_coords(x, y, z):
@@ -572,4 +1449,24 @@ def b2u_euler2quaternion(e):
         The output Unity quaternion
     """
     
-    return Euler((e.x, -e.z, e.y), "XYZ").to_quaternion()
\ No newline at end of file
+    return Euler((e.x, -e.z, e.y), "XYZ").to_quaternion()
+
+def b2u_matrix(m):
+    """
+    Convert a Blender transform matrix to a Unity transform matrix.
+
+    Goes through the same conversions as the transforms of slots, so that matrices match the slots they describe.
+
+    Parameters
+    ----------
+    m : mathutils.Matrix
+        The input Blender 4x4 matrix
+
+    Returns
+    -------
+    m : mathutils.Matrix
+        The output Unity 4x4 matrix
+    """
+
+    rotation = b2u_euler2quaternion(m.to_euler("XZY"))
+    return Matrix.LocRotScale(Vector(b2u_coords(*m.translation)), rotation, Vector(b2u_scale(*m.to_scale())))
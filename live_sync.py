@@ -0,0 +1,147 @@
+# Blender Imports
+import bpy
+
+# Other imports
+import time
+import asyncio
+import logging
+import threading
+
+# Add-on file imports
+from .interop import *
+from .dirty_tracking import *
+from .scene_snapshot import *
+from .main_thread import *
+
+class LiveSync():
+    """
+    Streams object transforms and armature poses to Resonite while they are being edited.
+
+    A timer on the main thread samples the transforms of the objects that moved, at a fixed rate.
+    Every sample replaces the previous one for the same slot, and each slot only ever has one update in flight,
+    so when Resonite can't keep up the intermediate states are dropped instead of queueing up.
+    Geometry and shading edits are collected separately and only sent once they stopped changing for a while,
+    so that a sculpt stroke doesn't upload a mesh on every tick.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.logger = logging.getLogger("ResoniteLink")
+        self.running = False
+        self.lock = threading.Lock()
+
+        self.latest : dict[str, tuple[ObjectSlotData, ObjectSnapshot]] = {} # slot id -> newest transform not sent yet
+        self.inFlight : set[str] = set()
+        self.pendingEdits = DirtySet()
+        self.lastEditTime = 0.0
+
+        self.sentCount = 0
+        self.droppedCount = 0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.controller.dirtyTracker.take() # everything before now was sent already
+        MainThreadTimers.Register(self.tick)
+        self.logger.log(logging.INFO, "Live sync started")
+
+    def stop(self):
+        self.running = False
+        self.logger.log(logging.INFO, f"Live sync stopped, {self.sentCount} transforms sent, {self.droppedCount} dropped")
+
+    def tick(self) -> float:
+        # runs on the main thread
+        scene = bpy.context.scene
+        if not self.running or self.controller.shutdown or not self.controller.clientStarted:
+            self.running = False
+            return None
+
+        dirty = self.controller.dirtyTracker.take()
+        now = time.perf_counter()
+
+        samples = {}
+        captured = {}
+        for name in dirty.transform:
+            obj = scene.objects.get(name, None)
+            if obj is None:
+                continue
+            objectSlotData = ObjectSlotData.Get(self.controller.registry, SlotRegistry.idKey(obj))
+            if dirty.isTransformOnly(name) and objectSlotData is not None and objectSlotData.slot is not None:
+                samples[objectSlotData.slot.id] = (objectSlotData, ObjectSnapshot.Capture(obj, scene, captured))
+            else:
+                # not sent yet, needs the full path
+                dirty.geometry.add(name)
+
+        # Posing an armature only moves the slots of its bones, Resonite deforms the skinned meshes following them.
+        # The meshes report a geometry change along with the armature, which doesn't need to be sent.
+        posed = set()
+        for name in list(dirty.geometry):
+            obj = scene.objects.get(name, None)
+            if obj is None or obj.type != "ARMATURE":
+                continue
+            armatureSlotData = ObjectSlotData.Get(self.controller.registry, SlotRegistry.idKey(obj))
+            if not isinstance(armatureSlotData, ArmatureSlotData) or armatureSlotData.slot is None:
+                continue
+            objSnapshot = ObjectSnapshot.Capture(obj, scene, captured)
+            if not armatureSlotData.poseMatches(objSnapshot.bones):
+                continue # bones were added or removed, needs the full path
+            samples[armatureSlotData.slot.id] = (armatureSlotData, objSnapshot)
+            dirty.geometry.discard(name)
+            posed.add(obj)
+        for name in list(dirty.geometry) if len(posed) > 0 else []:
+            obj = scene.objects.get(name, None)
+            meshObjectSlotData = ObjectSlotData.Get(self.controller.registry, SlotRegistry.idKey(obj)) if obj is not None else None
+            if isinstance(meshObjectSlotData, MeshObjectSlotData) and meshObjectSlotData.skinned and findArmature(obj) in posed:
+                dirty.geometry.discard(name)
+
+        if len(dirty.geometry) + len(dirty.shading) + len(dirty.materials) > 0:
+            self.pendingEdits.geometry |= dirty.geometry
+            self.pendingEdits.shading |= dirty.shading
+            self.pendingEdits.materials |= dirty.materials
+            self.lastEditTime = now
+
+        if len(samples) > 0:
+            self.lock.acquire()
+            for slotId, sample in samples.items():
+                if slotId in self.latest:
+                    self.droppedCount += 1
+                self.latest[slotId] = sample
+            self.lock.release()
+            self.controller.loop.call_soon_threadsafe(self.pump)
+
+        # geometry is only sent once it stopped changing
+        if len(self.pendingEdits) > 0 and now - self.lastEditTime >= scene.ResoniteLink_live_geometry_delay:
+            if self.controller.queueSend(incremental=True, dirty=self.pendingEdits):
+                self.pendingEdits = DirtySet()
+
+        return 1.0 / scene.ResoniteLink_live_rate
+
+    def pump(self):
+        # runs on the websocket thread, starts an update for every slot that has a new sample and nothing in flight
+        self.lock.acquire()
+        ready = [slotId for slotId in self.latest if slotId not in self.inFlight]
+        batch = [(slotId, *self.latest.pop(slotId)) for slotId in ready]
+        self.inFlight.update(ready)
+        self.lock.release()
+
+        for slotId, objectSlotData, objSnapshot in batch:
+            asyncio.get_running_loop().create_task(self.sendAsync(slotId, objectSlotData, objSnapshot))
+
+    async def sendAsync(self, slotId : str, objectSlotData : ObjectSlotData, objSnapshot : ObjectSnapshot):
+        try:
+            objectSlotData.snapshot = objSnapshot
+            # only what moved, the slot was sent in full before live sync started
+            registry = SlotRegistry.ForScene(objSnapshot.sceneKey)
+            sent = await ID_SlotData.SendChangedAsync(self.controller.batcher, objectSlotData.slot, objectSlotData.getSlotState(), registry)
+            if isinstance(objectSlotData, ArmatureSlotData):
+                sent = await objectSlotData.sendPoseAsync(self.controller.batcher, registry) > 0 or sent
+            if sent:
+                self.sentCount += 1
+        except Exception as e:
+            self.logger.log(logging.WARNING, f"Live transform update failed: {e}")
+        finally:
+            self.lock.acquire()
+            self.inFlight.discard(slotId)
+            self.lock.release()
+            self.pump() # send whatever arrived while this one was in flight
@@ -0,0 +1,53 @@
+# Blender Imports
+import bpy
+
+# Other imports
+import time
+import threading
+from collections.abc import Callable
+
+class MainThreadTimers():
+    """
+    Runs functions on the main thread like bpy.app.timers does, every timer of the add-on is registered here.
+
+    Blender doesn't run any timers while a script started with --python is running. Headless runs set headless
+    and call RunPending() from their own loop on the main thread instead.
+    """
+
+    headless = False
+    pending : list[tuple[float, Callable[[], float]]] = [] # due time, function
+    lock = threading.Lock()
+
+    # can be called from any thread
+    @classmethod
+    def Register(cls, func : Callable[[], float], firstInterval : float = 0.0):
+        if not cls.headless:
+            bpy.app.timers.register(func, first_interval=firstInterval)
+            return
+        cls.lock.acquire()
+        cls.pending.append((time.perf_counter() + firstInterval, func))
+        cls.lock.release()
+
+    @classmethod
+    def RunPending(cls) -> int:
+        """
+        Run the timers that are due, only call this on the main thread.
+
+        Like with bpy.app.timers, a timer that returns a number of seconds runs again after that long.
+
+        Returns
+        -------
+        ran : int
+            The number of timers that ran
+        """
+
+        now = time.perf_counter()
+        cls.lock.acquire()
+        due = [func for dueTime, func in cls.pending if dueTime <= now]
+        cls.pending = [(dueTime, func) for dueTime, func in cls.pending if dueTime > now]
+        cls.lock.release()
+        for func in due:
+            interval = func()
+            if interval is not None:
+                cls.Register(func, interval)
+        return len(due)
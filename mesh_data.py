@@ -0,0 +1,613 @@
+# Blender Imports
+import bpy
+
+# Other imports
+import hashlib
+import numpy as np
+
+# Vectorized mesh extraction.
+# Everything here reads the mesh in bulk with foreach_get instead of going through RNA per loop,
+# which is what made the original per-loop extraction take minutes on meshes with millions of corners.
+# That one is kept in benchmarks/legacy_extraction.py, tests/test_mesh_data.py checks that both give the same result.
+
+class MeshArrays():
+    """Raw per-element arrays read from an evaluated mesh, before any deduplication"""
+
+    def __init__(self):
+        self.positions : np.ndarray = None # float32 (vertCount, 3)
+        self.loopVerts : np.ndarray = None # int32 (loopCount,)
+        self.normals : np.ndarray = None # float32 (loopCount, 3)
+        self.tangents : np.ndarray = None # float32 (loopCount, 3) or None
+        self.bitangentSigns : np.ndarray = None # float32 (loopCount,) or None
+        self.uvs : list[np.ndarray] = [] # float32 (loopCount, 2) per uv layer
+        self.colors : np.ndarray = None # float32 (vertCount or loopCount, 4) or None
+        self.colorDomain = 'CORNER'
+        self.triLoops : np.ndarray = None # int32 (triCount, 3)
+        self.triMaterials : np.ndarray = None # int32 (triCount,)
+        self.polyCount = 0
+        self.boneIndices : np.ndarray = None # int32 (vertCount, 4) or None if the mesh isn't skinned
+        self.boneWeights : np.ndarray = None # float32 (vertCount, 4), strongest first, summing up to 1
+        self.boneNames : list[str] = [] # every bone the indices refer to, the first one is the renderer's own slot
+        self.bindPoses : np.ndarray = None # float32 (boneCount, 4, 4) in Resonite's coordinate space
+
+
+class MeshBuffers():
+    """Deduplicated vertex buffers of a mesh, already converted to Resonite's coordinate space"""
+
+    def __init__(self):
+        self.positions : np.ndarray = None # float32 (n, 3)
+        self.normals : np.ndarray = None # float32 (n, 3)
+        self.tangents : np.ndarray = None # float32 (n, 4) or None
+        self.colors : np.ndarray = None # float32 (n, 4) or None
+        self.uvs : list[np.ndarray] = [] # float32 (n, 2) per uv layer
+        self.submeshes : list[np.ndarray] = [] # uint32 triangle indices per material, sorted by material index
+        self.submeshMaterials : list[int] = [] # material index of every submesh
+        self.boneIndices : np.ndarray = None # int32 (n, 4) or None
+        self.boneWeights : np.ndarray = None # float32 (n, 4) or None
+        self.boneNames : list[str] = []
+        self.bindPoses : np.ndarray = None # float32 (boneCount, 4, 4) or None
+
+    @property
+    def vertexCount(self) -> int:
+        return len(self.positions)
+
+
+def readFloats(collection, attr : str, count : int, width : int) -> np.ndarray:
+    arr = np.empty(count * width, dtype=np.float32)
+    collection.foreach_get(attr, arr)
+    return arr.reshape(count, width) if width > 1 else arr
+
+def readInts(collection, attr : str, count : int, width : int = 1) -> np.ndarray:
+    arr = np.empty(count * width, dtype=np.int32)
+    collection.foreach_get(attr, arr)
+    return arr.reshape(count, width) if width > 1 else arr
+
+def readMeshArrays(mesh : bpy.types.Mesh) -> MeshArrays:
+    """
+    Bulk-read everything needed to export a mesh.
+
+    Parameters
+    ----------
+    mesh : bpy.types.Mesh
+        The evaluated mesh to read
+
+    Returns
+    -------
+    arrays : MeshArrays
+        The raw per-vertex, per-loop and per-triangle arrays of the mesh
+    """
+
+    # Calculate custom normals
+    if (hasattr(mesh, 'calc_normals_split')):
+        # Old method (4.0)
+        mesh.calc_normals_split()
+
+    # Triangulate the evaluated mesh
+    mesh.calc_loop_triangles()
+
+    vertCount = len(mesh.vertices)
+    loopCount = len(mesh.loops)
+    polyCount = len(mesh.polygons)
+    triCount = len(mesh.loop_triangles)
+
+    # tangent calculation only works for tris and quads, also it needs a UV map
+    loopTotals = readInts(mesh.polygons, "loop_total", polyCount)
+    hasTangents = not np.any((loopTotals < 3) | (loopTotals > 4)) and len(mesh.uv_layers) > 0
+    if hasTangents:
+        mesh.calc_tangents()
+
+    arrays = MeshArrays()
+    arrays.polyCount = polyCount
+    arrays.positions = readFloats(mesh.vertices, "co", vertCount, 3)
+    arrays.loopVerts = readInts(mesh.loops, "vertex_index", loopCount)
+    arrays.normals = readFloats(mesh.loops, "normal", loopCount, 3)
+    if hasTangents:
+        arrays.tangents = readFloats(mesh.loops, "tangent", loopCount, 3)
+        arrays.bitangentSigns = readFloats(mesh.loops, "bitangent_sign", loopCount, 1)
+    arrays.uvs = [readFloats(layer.data, "uv", loopCount, 2) for layer in mesh.uv_layers]
+
+    # Get vertex color attributes (Limited to the first color group)
+    if (hasattr(mesh, 'color_attributes')):
+        # New way with color attributes
+        if (len(mesh.color_attributes) > 0):
+            colorAttr = mesh.color_attributes[0]
+            arrays.colorDomain = colorAttr.domain
+            arrays.colors = readFloats(colorAttr.data, "color", len(colorAttr.data), 4)
+    else:
+        # Old way with vertex colors
+        if (len(mesh.vertex_colors) > 0):
+            arrays.colors = readFloats(mesh.vertex_colors[0].data, "color", loopCount, 4)
+
+    arrays.triLoops = readInts(mesh.loop_triangles, "loops", triCount, 3)
+    if (hasattr(mesh, 'loop_triangle_polygons')):
+        triPolys = readInts(mesh.loop_triangle_polygons, "value", triCount)
+    else:
+        triPolys = readInts(mesh.loop_triangles, "polygon_index", triCount)
+    arrays.triMaterials = readInts(mesh.polygons, "material_index", polyCount)[triPolys]
+
+    # Clean up data
+    if (hasattr(mesh, 'calc_normals_split')):
+        mesh.free_normals_split()
+
+    if hasTangents:
+        mesh.free_tangents()
+
+    return arrays
+
+def buildMeshBuffers(arrays : MeshArrays) -> MeshBuffers:
+    """
+    Deduplicate the corners of a triangulated mesh into unique vertices and split them into submeshes.
+
+    Vertices are numbered in order of first use and submeshes are sorted by material index,
+    so the result is identical to hashing every corner into a dictionary one by one.
+
+    Parameters
+    ----------
+    arrays : MeshArrays
+        The raw arrays of the mesh
+
+    Returns
+    -------
+    buffers : MeshBuffers
+        The deduplicated vertex buffers and triangle indices
+    """
+
+    # Corner loop indices in triangle order (reverse winding order)
+    corners = arrays.triLoops[:, ::-1].ravel()
+    cornerVerts = arrays.loopVerts[corners]
+
+    # Gather the attributes that make a vertex unique for every corner
+    attrs = [arrays.normals[corners]]
+    attrs += [uv[corners] for uv in arrays.uvs]
+    if arrays.colors is not None:
+        attrs.append(arrays.colors[cornerVerts if arrays.colorDomain == 'POINT' else corners])
+    if arrays.tangents is not None:
+        attrs.append(arrays.tangents[corners])
+
+    # Pack them into one fixed-size record per corner, compared bit for bit.
+    # Adding 0.0 folds -0.0 onto 0.0, since those compare equal as floats but not as bits.
+    keys = np.concatenate(
+        [cornerVerts.view(np.uint32)[:, None]] + [(attr + np.float32(0.0)).view(np.uint32) for attr in attrs],
+        axis=1
+    )
+    keys = np.ascontiguousarray(keys)
+    records = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+
+    _, first, inverse = np.unique(records, return_index=True, return_inverse=True)
+
+    # np.unique orders vertices by their bytes, renumber them by first appearance instead
+    order = np.argsort(first, kind='stable')
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    indices = remap[inverse.reshape(-1)].astype(np.uint32)
+    src = corners[first[order]] # loop that provides the data of each unique vertex
+
+    buffers = MeshBuffers()
+    buffers.positions = b2u_coords_array(arrays.positions[arrays.loopVerts[src]])
+    buffers.normals = b2u_coords_array(arrays.normals[src])
+    if arrays.tangents is not None:
+        buffers.tangents = np.empty((len(src), 4), dtype=np.float32)
+        buffers.tangents[:, :3] = b2u_coords_array(arrays.tangents[src])
+        buffers.tangents[:, 3] = -arrays.bitangentSigns[src]
+    if arrays.colors is not None:
+        buffers.colors = arrays.colors[arrays.loopVerts[src] if arrays.colorDomain == 'POINT' else src]
+    buffers.uvs = [uv[src] for uv in arrays.uvs]
+    if arrays.boneIndices is not None:
+        # weights belong to the vertex, which is part of every corner's key already
+        srcVerts = arrays.loopVerts[src]
+        buffers.boneIndices = arrays.boneIndices[srcVerts]
+        buffers.boneWeights = arrays.boneWeights[srcVerts]
+        buffers.boneNames = arrays.boneNames
+        buffers.bindPoses = arrays.bindPoses
+
+    # Split the triangles by material, keeping their original order within each material
+    triCount = len(arrays.triLoops)
+    if triCount > 0:
+        triOrder = np.argsort(arrays.triMaterials, kind='stable')
+        sortedMats = arrays.triMaterials[triOrder]
+        bounds = np.flatnonzero(np.diff(sortedMats)) + 1
+        tris = indices.reshape(triCount, 3)[triOrder]
+        buffers.submeshes = [group.ravel() for group in np.split(tris, bounds)]
+        buffers.submeshMaterials = sortedMats[np.concatenate(([0], bounds))].tolist()
+
+    return buffers
+
+class MeshPayload():
+    """
+    A mesh as the packed little-endian blocks that ResoniteLink sends as the binary payload of a raw mesh import.
+
+    Positions, normals, tangents, colors, every UV channel and the bone weights are one block each, and the triangle
+    indices one block per submesh. ImportMeshRawData of ResoniteLink.py keeps its data in the same blocks and sends them
+    in that order. Bone weights are boneWeightCount (int32 bone index, float32 weight) pairs per vertex.
+    """
+
+    def __init__(self):
+        self.vertexCount = 0
+        self.positions : bytes = b"" # float3 per vertex
+        self.normals : bytes = b"" # float3 per vertex
+        self.tangents : bytes = None # float4 per vertex or None
+        self.colors : bytes = None # float4 per vertex or None
+        self.uvs : list[bytes] = [] # one block per uv channel
+        self.uvChannelDimensions : list[int] = []
+        self.boneWeights : bytes = None # None if the mesh isn't skinned
+        self.boneWeightCount = 0
+        self.boneNames : list[str] = []
+        self.bindPoses : list[tuple[float, ...]] = [] # 16 floats per bone, row by row
+        self.submeshes : list[bytes] = [] # int32 triangle indices per submesh
+        self.submeshTriangleCounts : list[int] = []
+
+    @property
+    def byteSize(self) -> int:
+        blocks = [self.positions, self.normals, self.tangents, self.colors, self.boneWeights] + self.uvs + self.submeshes
+        return sum(len(block) for block in blocks if block is not None)
+
+
+def packBlock(arr : np.ndarray, dtype : str) -> bytes:
+    # a single copy if the array already has the right type and layout, which it usually has
+    return np.ascontiguousarray(arr, dtype=dtype).tobytes()
+
+def encodeMeshPayload(buffers : MeshBuffers) -> MeshPayload:
+    """
+    Pack the buffers of a mesh into the blocks of a raw mesh import without creating an object per element.
+
+    Parameters
+    ----------
+    buffers : MeshBuffers
+        The deduplicated vertex buffers and triangle indices
+
+    Returns
+    -------
+    payload : MeshPayload
+        The packed blocks and the header values that describe them
+    """
+
+    payload = MeshPayload()
+    payload.vertexCount = buffers.vertexCount
+    payload.positions = packBlock(buffers.positions, '<f4')
+    payload.normals = packBlock(buffers.normals, '<f4')
+    if buffers.tangents is not None:
+        payload.tangents = packBlock(buffers.tangents, '<f4')
+    if buffers.colors is not None:
+        payload.colors = packBlock(buffers.colors, '<f4')
+    payload.uvs = [packBlock(uv, '<f4') for uv in buffers.uvs]
+    payload.uvChannelDimensions = [uv.shape[1] for uv in buffers.uvs]
+    if buffers.boneIndices is not None:
+        payload.boneWeightCount = buffers.boneIndices.shape[1]
+        payload.boneNames = list(buffers.boneNames)
+        payload.bindPoses = [tuple(pose.ravel().tolist()) for pose in buffers.bindPoses]
+        skin = np.empty((buffers.vertexCount, payload.boneWeightCount * 2), dtype='<i4')
+        skin[:, 0::2] = buffers.boneIndices
+        skin.view('<f4')[:, 1::2] = buffers.boneWeights
+        payload.boneWeights = skin.tobytes()
+    payload.submeshes = [packBlock(indices, '<i4') for indices in buffers.submeshes]
+    payload.submeshTriangleCounts = [len(indices) // 3 for indices in buffers.submeshes]
+    return payload
+
+def extractMeshBuffers(mesh : bpy.types.Mesh) -> MeshBuffers:
+    return buildMeshBuffers(readMeshArrays(mesh))
+
+def b2u_coords_array(v : np.ndarray) -> np.ndarray:
+    """
+    Convert an array of Blender coordinates to Unity coordinates.
+
+    Parameters
+    ----------
+    v : numpy.ndarray
+        The Blender coordinates, shape (n, 3)
+
+    Returns
+    -------
+    v : numpy.ndarray
+        The converted Unity coordinates, shape (n, 3)
+    """
+
+    out = np.empty(v.shape, dtype=np.float32)
+    out[:, 0] = -v[:, 0]
+    out[:, 1] = v[:, 2]
+    out[:, 2] = -v[:, 1]
+    return out
+
+def meshFingerprint(arrays : MeshArrays) -> str:
+    """
+    Hash the contents of a mesh, so that meshes that were already imported can be recognized.
+    Only looks at the arrays, so it can run away from the main thread.
+
+    Parameters
+    ----------
+    arrays : MeshArrays
+        The raw arrays of the mesh
+
+    Returns
+    -------
+    fingerprint : str
+        A hex digest that only changes when the exported mesh would change
+    """
+
+    h = hashlib.blake2b(digest_size=16)
+    counts = (len(arrays.positions), len(arrays.loopVerts), arrays.polyCount, len(arrays.triLoops), len(arrays.uvs))
+    h.update(repr((counts, arrays.colorDomain, arrays.colors is not None, arrays.tangents is not None, arrays.boneNames)).encode())
+    for arr in (arrays.positions, arrays.loopVerts, arrays.normals, arrays.tangents, arrays.bitangentSigns,
+                *arrays.uvs, arrays.colors, arrays.triLoops, arrays.triMaterials, arrays.boneIndices, arrays.boneWeights, arrays.bindPoses):
+        if arr is not None:
+            h.update(np.ascontiguousarray(arr).data)
+    return h.hexdigest()
+
+# Skinning.
+# Vertex groups are matched to the deforming bones by name, every vertex keeps its strongest influences.
+
+maxBoneInfluences = 4
+
+def readBoneWeights(mesh : bpy.types.Mesh, groupBones : np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Read the vertex group weights of a mesh and reduce them to the strongest influences of every vertex.
+
+    Parameters
+    ----------
+    mesh : bpy.types.Mesh
+        The mesh to read, in its rest pose
+    groupBones : numpy.ndarray
+        int32 (groupCount,), the bone index of every vertex group of the object, -1 for groups that don't deform
+
+    Returns
+    -------
+    boneIndices : numpy.ndarray
+        int32 (vertCount, 4)
+    boneWeights : numpy.ndarray
+        float32 (vertCount, 4)
+    """
+
+    vertCount = len(mesh.vertices)
+    # The group lists have a different length for every vertex and no bulk accessor,
+    # this is the only loop over the vertices, everything after it works on whole arrays
+    groups = [vert.groups for vert in mesh.vertices]
+    counts = np.fromiter((len(vertGroups) for vertGroups in groups), dtype=np.int64, count=vertCount)
+    total = int(counts.sum())
+    groupIndices = np.fromiter((elem.group for vertGroups in groups for elem in vertGroups), dtype=np.int32, count=total)
+    weights = np.fromiter((elem.weight for vertGroups in groups for elem in vertGroups), dtype=np.float32, count=total)
+    vertices = np.repeat(np.arange(vertCount, dtype=np.int32), counts)
+
+    # groups of bones that were deleted, or added after the mapping was built, don't deform
+    valid = groupIndices < len(groupBones)
+    bones = np.full(total, -1, dtype=np.int32)
+    bones[valid] = groupBones[groupIndices[valid]]
+    return reduceBoneWeights(vertices, bones, weights, vertCount)
+
+def reduceBoneWeights(vertices : np.ndarray, bones : np.ndarray, weights : np.ndarray, vertCount : int,
+                      influences : int = maxBoneInfluences) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Keep the strongest influences of every vertex and normalize them, like Blender's armature modifier does.
+
+    Vertices without any influence are bound to bone 0 alone, which is the renderer's own slot,
+    so they stay where they are like they do in Blender.
+
+    Parameters
+    ----------
+    vertices : numpy.ndarray
+        int32 (n,), the vertex of every influence
+    bones : numpy.ndarray
+        int32 (n,), the bone of every influence, negative for influences that are ignored
+    weights : numpy.ndarray
+        float32 (n,)
+    vertCount : int
+        The number of vertices of the mesh
+    influences : int
+        How many influences every vertex keeps
+
+    Returns
+    -------
+    boneIndices : numpy.ndarray
+        int32 (vertCount, influences), unused slots point at bone 0 with a weight of 0
+    boneWeights : numpy.ndarray
+        float32 (vertCount, influences), strongest first, every row sums up to 1
+    """
+
+    keep = (bones >= 0) & (weights > 0)
+    vertices, bones, weights = vertices[keep], bones[keep], weights[keep]
+
+    # strongest first within every vertex, then the position of each influence in its vertex
+    order = np.lexsort((-weights, vertices))
+    vertices, bones, weights = vertices[order], bones[order], weights[order]
+    rank = np.arange(len(vertices)) - np.searchsorted(vertices, vertices, side='left')
+    keep = rank < influences
+
+    boneIndices = np.zeros((vertCount, influences), dtype=np.int32)
+    boneWeights = np.zeros((vertCount, influences), dtype=np.float32)
+    boneIndices[vertices[keep], rank[keep]] = bones[keep]
+    boneWeights[vertices[keep], rank[keep]] = weights[keep]
+
+    totals = boneWeights.sum(axis=1)
+    unweighted = totals <= 0
+    boneWeights[unweighted, 0] = 1.0
+    totals[unweighted] = 1.0
+    boneWeights /= totals[:, None]
+    return boneIndices, boneWeights
+
+# Chunked extraction.
+# Meshes that are too large for one import are split into spatially coherent chunks,
+# each one is deduplicated and encoded on its own so only one chunk is held in memory at a time.
+
+def vertexByteSize(arrays : MeshArrays) -> int:
+    floats = 3 + 3 + (4 if arrays.tangents is not None else 0) + (4 if arrays.colors is not None else 0) + 2 * len(arrays.uvs)
+    if arrays.boneIndices is not None:
+        floats += 2 * arrays.boneIndices.shape[1]
+    return floats * 4
+
+def chunkVertexBudget(arrays : MeshArrays, maxVertices : int, maxBytes : int) -> int:
+    return max(3, min(maxVertices, maxBytes // vertexByteSize(arrays)))
+
+def needsChunking(arrays : MeshArrays, vertexBudget : int) -> bool:
+    # a mesh never has more unique vertices than loops or triangle corners
+    return min(len(arrays.loopVerts), len(arrays.triLoops) * 3) > vertexBudget
+
+def mortonOrder(points : np.ndarray) -> np.ndarray:
+    """
+    Sort points along a Z-order curve, so that points close in the order are close in space.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        float32 (n, 3) points
+
+    Returns
+    -------
+    order : numpy.ndarray
+        The indices that sort the points
+    """
+
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, np.float32(1e-12))
+    cells = ((points - lo) / extent * 1023).astype(np.uint32) # 10 bits per axis
+
+    def spread(v):
+        # insert two zero bits between each of the 10 bits
+        v = (v | (v << 16)) & 0x030000FF
+        v = (v | (v << 8)) & 0x0300F00F
+        v = (v | (v << 4)) & 0x030C30C3
+        v = (v | (v << 2)) & 0x09249249
+        return v
+
+    codes = spread(cells[:, 0]) | (spread(cells[:, 1]) << 1) | (spread(cells[:, 2]) << 2)
+    return np.argsort(codes, kind='stable')
+
+def subsetMeshArrays(arrays : MeshArrays, tris : np.ndarray) -> MeshArrays:
+    # shares the per-vertex and per-loop arrays, only the triangles are copied
+    subset = MeshArrays()
+    subset.__dict__.update(arrays.__dict__)
+    subset.triLoops = arrays.triLoops[tris]
+    subset.triMaterials = arrays.triMaterials[tris]
+    return subset
+
+def iterMeshChunks(arrays : MeshArrays, vertexBudget : int):
+    """
+    Split a mesh into spatially coherent chunks that each have at most vertexBudget vertices.
+
+    Chunks are built lazily, the next one is only deduplicated once the previous one was consumed.
+
+    Parameters
+    ----------
+    arrays : MeshArrays
+        The raw arrays of the whole mesh
+    vertexBudget : int
+        The maximum number of unique vertices per chunk
+
+    Yields
+    ------
+    buffers : MeshBuffers
+        The deduplicated buffers of one chunk
+    """
+
+    # the first corner of every triangle is close enough to its center for ordering
+    firstCorners = arrays.positions[arrays.loopVerts[arrays.triLoops[:, 0]]]
+    order = mortonOrder(firstCorners)
+    del firstCorners
+
+    # most meshes have fewer vertices than triangles, chunks that end up too large are halved
+    pending = [order[i:i + vertexBudget] for i in range(0, len(order), vertexBudget)]
+    pending.reverse()
+    while len(pending) > 0:
+        tris = pending.pop()
+        buffers = buildMeshBuffers(subsetMeshArrays(arrays, tris))
+        if buffers.vertexCount > vertexBudget and len(tris) > 1:
+            half = len(tris) // 2
+            pending.append(tris[half:])
+            pending.append(tris[:half])
+            continue
+        yield buffers
+
+# Proxy meshes.
+# A coarse version of a mesh that is sent before the full one, so the layout of a scene shows up quickly.
+
+def decimateMeshArrays(arrays : MeshArrays, targetVertices : int) -> MeshArrays:
+    """
+    Simplify a mesh by clustering its vertices on a uniform grid.
+
+    Vertices in the same cell are merged into one at their average position, triangles that collapse are dropped.
+    Every corner of a cluster gets the same normal, UV and color, so the clusters are the vertices of the result.
+    This is much cruder than Blender's decimate modifier but runs on the arrays alone, away from the main thread.
+
+    Parameters
+    ----------
+    arrays : MeshArrays
+        The raw arrays of the mesh
+    targetVertices : int
+        The maximum number of vertices of the simplified mesh
+
+    Returns
+    -------
+    arrays : MeshArrays
+        The raw arrays of the simplified mesh, or the input if it is small enough already
+    """
+
+    # loose vertices are left out, every cluster needs a loop to take its UVs and colors from
+    usedVerts = np.unique(arrays.loopVerts)
+    positions = arrays.positions[usedVerts]
+    targetVertices = max(4, min(targetVertices, 1000000))
+    if len(positions) <= targetVertices or len(arrays.triLoops) == 0:
+        return arrays
+
+    lo = positions.min(axis=0)
+    extent = max(float((positions.max(axis=0) - lo).max()), 1e-12)
+
+    def cluster(cellSize : float):
+        cells = ((positions - lo) / cellSize).astype(np.int64)
+        dims = cells.max(axis=0) + 1
+        ids = cells[:, 0] + dims[0] * (cells[:, 1] + dims[1] * cells[:, 2])
+        unique, inverse = np.unique(ids, return_inverse=True)
+        return len(unique), inverse.reshape(-1)
+
+    # Search for the smallest cell size that gets under the target, between a line and a volume worth of cells
+    lower = np.log(extent / targetVertices)
+    upper = np.log(extent / targetVertices ** (1 / 3) * 2)
+    best = cluster(np.exp(upper))
+    for _ in range(8):
+        middle = (lower + upper) / 2
+        attempt = cluster(np.exp(middle))
+        if attempt[0] <= targetVertices:
+            best = attempt
+            upper = middle
+        else:
+            lower = middle
+    clusterCount, clusters = best
+
+    counts = np.bincount(clusters, minlength=clusterCount).astype(np.float32)
+    centers = np.empty((clusterCount, 3), dtype=np.float32)
+    for axis in range(3):
+        centers[:, axis] = np.bincount(clusters, weights=positions[:, axis], minlength=clusterCount) / counts
+
+    vertClusters = np.zeros(len(arrays.positions), dtype=np.int64) # loose vertices are never looked up
+    vertClusters[usedVerts] = clusters
+    loopClusters = vertClusters[arrays.loopVerts]
+
+    # the first loop of every cluster provides its UVs and colors
+    loopCount = len(loopClusters)
+    firstLoop = np.empty(clusterCount, dtype=np.int64)
+    firstLoop[loopClusters[::-1]] = np.arange(loopCount - 1, -1, -1)
+
+    normals = np.zeros((clusterCount, 3), dtype=np.float32)
+    for axis in range(3):
+        normals[:, axis] = np.bincount(loopClusters, weights=arrays.normals[:, axis], minlength=clusterCount)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals /= np.where(lengths > 0, lengths, 1)
+
+    triClusters = loopClusters[arrays.triLoops]
+    keep = (triClusters[:, 0] != triClusters[:, 1]) & (triClusters[:, 1] != triClusters[:, 2]) & (triClusters[:, 0] != triClusters[:, 2])
+
+    result = MeshArrays()
+    result.positions = centers
+    result.loopVerts = loopClusters.astype(np.int32)
+    result.normals = normals[loopClusters]
+    result.uvs = [uv[firstLoop][loopClusters] for uv in arrays.uvs]
+    if arrays.colors is not None:
+        loopColors = arrays.colors[arrays.loopVerts] if arrays.colorDomain == 'POINT' else arrays.colors
+        result.colors = loopColors[firstLoop][loopClusters]
+    if arrays.boneIndices is not None:
+        # every cluster follows the bones of the vertex that provides its attributes
+        firstVerts = arrays.loopVerts[firstLoop]
+        result.boneIndices = arrays.boneIndices[firstVerts]
+        result.boneWeights = arrays.boneWeights[firstVerts]
+        result.boneNames = arrays.boneNames
+        result.bindPoses = arrays.bindPoses
+    result.triLoops = arrays.triLoops[keep]
+    result.triMaterials = arrays.triMaterials[keep]
+    result.polyCount = len(result.triLoops)
+    return result
@@ -0,0 +1,520 @@
+# Blender Imports
+import bpy
+
+# Other imports
+import time
+import asyncio
+import logging
+import concurrent.futures
+import numpy as np
+from typing import Any
+from collections.abc import Hashable
+
+# Add-on file imports
+from .mesh_data import *
+from .texture_data import *
+from .slot_mapping import *
+from .interop import *
+from .dirty_tracking import *
+from .send_stats import *
+from .main_thread import *
+
+# Object types that store mesh data
+meshObjectTypes = ["MESH", "CURVE", "SURFACE", "META", "FONT", "CURVES", "POINTCLOUD", "VOLUME", "GREASEPENCIL"]
+
+def findArmature(obj : bpy.types.Object) -> bpy.types.Object:
+    """The armature that deforms an object through its vertex groups, or None"""
+
+    for modifier in obj.modifiers:
+        if modifier.type == 'ARMATURE' and modifier.show_viewport and modifier.use_vertex_groups \
+                and modifier.object is not None and modifier.object.type == 'ARMATURE':
+            return modifier.object
+    # parented with armature deform, without a modifier
+    if obj.parent is not None and obj.parent_type == 'ARMATURE' and obj.parent.type == 'ARMATURE':
+        return obj.parent
+    return None
+
+# Everything the websocket thread needs from Blender is captured here, on the main thread.
+# The snapshots only hold plain values and NumPy arrays. The IDs they were taken from are kept for the scheduler
+# and are never read from outside the main thread, the slot data registry uses the key captured along with them.
+
+class IDSnapshot():
+    """Values of a Blender ID captured on the main thread"""
+
+    def __init__(self, id : bpy.types.ID):
+        self.id = id
+        self.key : Hashable = SlotRegistry.idKey(id)
+        self.name : str = id.name
+        self.idType : str = id.id_type
+        self.mappingKey : str = SlotMapping.idKey(id)
+
+
+class MaterialSnapshot(IDSnapshot):
+
+    # material members that can show an image, and the Principled BSDF inputs the image is found on
+    textureInputs = {'AlbedoTexture': "Base Color", 'NormalMap': "Normal"}
+
+    def __init__(self, mat : bpy.types.Material):
+        super().__init__(mat)
+        color = MaterialSnapshot.findNodeValue(mat, "Base Color") # ShaderNodeBsdfPrincipled
+        self.baseColor : tuple[float, float, float, float] = (1,1,1,1) if color is None else tuple(color)
+        # material member -> image, turned into textures by the capture so that each image is only read once
+        self.images : dict[str, bpy.types.Image] = {}
+        for member, inputName in MaterialSnapshot.textureInputs.items():
+            image = MaterialSnapshot.findImage(mat, inputName)
+            if image is not None:
+                self.images[member] = image
+        self.textures : dict[str, TextureSnapshot] = {}
+        if 'AlbedoTexture' in self.images:
+            # the color of a linked input is unused, and Resonite multiplies the texture with it
+            self.baseColor = (1,1,1,1)
+
+    @staticmethod
+    def findNodeValue(mat : bpy.types.Material, nodeName : str) -> Any:
+        if mat.node_tree is None:
+            return None
+        for node in mat.node_tree.nodes: # https://docs.blender.org/api/current/bpy.types.ShaderNode.html#shadernode-nodeinternal
+            for input in node.inputs:
+                if input.name == nodeName:
+                    return input.default_value
+        return None
+
+    @staticmethod
+    def findImage(mat : bpy.types.Material, inputName : str) -> bpy.types.Image:
+        if mat.node_tree is None:
+            return None
+        for node in mat.node_tree.nodes:
+            if node.type == 'BSDF_PRINCIPLED':
+                return MaterialSnapshot.followImage(node.inputs.get(inputName, None))
+        return None
+
+    @staticmethod
+    def followImage(socket : bpy.types.NodeSocket) -> bpy.types.Image:
+        # walks back over the link into the socket, through normal map and reroute nodes, to an image texture node
+        if socket is None or not socket.is_linked:
+            return None
+        node = socket.links[0].from_node
+        if node.type == 'TEX_IMAGE':
+            return node.image
+        if node.type == 'NORMAL_MAP':
+            return MaterialSnapshot.followImage(node.inputs.get("Color", None))
+        if node.type == 'REROUTE':
+            return MaterialSnapshot.followImage(node.inputs[0])
+        return None
+
+
+class TextureSnapshot(IDSnapshot):
+    """An image used by materials, whose pixels are read in a later tick like the arrays of a mesh"""
+
+    def __init__(self, image : bpy.types.Image, maxSize : int):
+        super().__init__(image)
+        self.width, self.height = image.size
+        self.maxSize = maxSize
+        self.isNormalMap = False
+        self.ready : concurrent.futures.Future = concurrent.futures.Future()
+
+    def capture(self):
+        self.ready.set_result(readImageArrays(self.id))
+
+    async def arraysAsync(self) -> ImageArrays:
+        return await asyncio.wrap_future(self.ready)
+
+
+class MeshSnapshot(IDSnapshot):
+    """
+    An evaluated mesh whose arrays are read in a later tick, after the rest of the scene was handed over.
+    Meshes that only exist while iterating the depsgraph instances have no source object and are read right away.
+
+    A mesh is keyed on its original mesh data only while it is the evaluated copy every user of that data shares.
+    Modifiers give an object a mesh of its own, and generated geometry is a new ID every time it is evaluated,
+    those are keyed on the object they belong to, so linked duplicates with different modifiers don't share a slot.
+    """
+
+    def __init__(self, mesh : bpy.types.Mesh, obj : bpy.types.Object, owner : tuple[Hashable, str] = None):
+        super().__init__(mesh)
+        if owner is not None:
+            # key and mapping key of the object the mesh belongs to
+            self.key = (owner[0], "MESH")
+            self.mappingKey = f"{owner[1]}:MESH"
+        self.sourceObject = obj # original object the mesh is evaluated from, or None
+        self.vertexCount = len(mesh.vertices)
+        self.instanceCount = 0 # objects and instances using this mesh
+        self.armature : ObjectSnapshot = None # the armature deforming the mesh, None if it's static
+        self.ready : concurrent.futures.Future = concurrent.futures.Future()
+        if obj is None:
+            self.ready.set_result(readMeshArrays(mesh))
+
+    def capture(self, depsgraph : bpy.types.Depsgraph):
+        # evaluate again, the mesh from the previous tick may have been freed since
+        mesh = self.sourceObject.evaluated_get(depsgraph).data
+        self.ready.set_result(readMeshArrays(mesh))
+
+    async def arraysAsync(self) -> MeshArrays:
+        return await asyncio.wrap_future(self.ready)
+
+
+class SkinnedMeshSnapshot(MeshSnapshot):
+    """
+    The rest pose of a mesh deformed by an armature, read along with the weights of its vertex groups.
+
+    The weights depend on the vertex groups of the object and the bind poses on where it sits relative to the armature,
+    so a skinned mesh belongs to one object, even if the object shares its mesh data with others.
+    Modifiers aren't applied, the armature would deform the mesh out of its rest pose.
+    """
+
+    def __init__(self, mesh : bpy.types.Mesh, obj : bpy.types.Object, objSnapshot : 'ObjectSnapshot', armature : 'ObjectSnapshot'):
+        super().__init__(mesh, obj)
+        self.id = ("SKINNED", mesh, obj)
+        self.key = ("SKINNED", self.key, objSnapshot.key)
+        self.mappingKey = f"SKINNED:{self.mappingKey}:{objSnapshot.mappingKey}"
+        self.armature = armature
+
+        # bone 0 is the slot of the renderer itself, it holds the vertices no bone deforms
+        deformBones = [bone for bone in armature.bones if bone.deform]
+        self.boneNames = [objSnapshot.name] + [bone.name for bone in deformBones]
+        boneIndices = {bone.name: i + 1 for i, bone in enumerate(deformBones)}
+        self.groupBones = np.array([boneIndices.get(group.name, -1) for group in obj.vertex_groups], dtype=np.int32)
+
+        # the rest pose of every bone relative to the object, inverted, in Resonite's coordinate space
+        toObject = obj.matrix_world.inverted_safe() @ armature.matrixWorld
+        self.bindPoses = np.empty((len(self.boneNames), 4, 4), dtype=np.float32)
+        self.bindPoses[0] = np.identity(4)
+        for i, bone in enumerate(deformBones):
+            self.bindPoses[i + 1] = np.array(b2u_matrix(toObject @ bone.restMatrix).inverted_safe())
+
+    def capture(self, depsgraph : bpy.types.Depsgraph):
+        mesh = self.sourceObject.data
+        arrays = readMeshArrays(mesh)
+        arrays.boneIndices, arrays.boneWeights = readBoneWeights(mesh, self.groupBones)
+        arrays.boneNames = self.boneNames
+        arrays.bindPoses = self.bindPoses
+        self.ready.set_result(arrays)
+
+
+class BoneSnapshot():
+    """The pose of a bone, relative to its parent bone or to the armature"""
+
+    def __init__(self, poseBone : bpy.types.PoseBone, parent : 'BoneSnapshot'):
+        self.name : str = poseBone.name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.deform : bool = poseBone.bone.use_deform
+        self.restMatrix = poseBone.bone.matrix_local.copy() # armature space
+        matrix = poseBone.matrix if poseBone.parent is None else poseBone.parent.matrix.inverted_safe() @ poseBone.matrix
+        self.localPos = matrix.translation.to_tuple()
+        self.localEuler = matrix.to_euler("XZY")
+        self.localScale = matrix.to_scale().to_tuple()
+
+
+class ObjectSnapshot(IDSnapshot):
+
+    def __init__(self, obj : bpy.types.Object, scene : bpy.types.Scene, parent : 'ObjectSnapshot'):
+        super().__init__(obj)
+        self.scene = scene
+        self.sceneKey : Hashable = SlotRegistry.idKey(scene)
+        self.parent = parent
+        self.type : str = obj.type
+        self.sessionUid : int = obj.session_uid
+        self.hideRender : bool = obj.hide_render
+        self.setLocalMatrix(obj.matrix_local)
+        self.hasGeometry = obj.type in meshObjectTypes
+        self.mesh : MeshSnapshot = None # None for hidden objects and empty meshes
+        self.materials : list[MaterialSnapshot] = []
+        self.transformOnly = False # only the transform changed and the slot exists already
+        self.matrixWorld = obj.matrix_world.copy()
+        self.bones : list[BoneSnapshot] = ObjectSnapshot.CaptureBones(obj) if obj.type == "ARMATURE" else []
+
+    def setLocalMatrix(self, matrix):
+        self.localPos = matrix.translation.to_tuple()
+        self.localEuler = matrix.to_euler("XZY")
+        self.localScale = matrix.to_scale().to_tuple() # could use obj.scale here which seems to preserve negative scale
+
+    @staticmethod
+    def CaptureBones(obj : bpy.types.Object) -> list[BoneSnapshot]:
+        # parents before their children
+        bones = []
+        stack = [(poseBone, None) for poseBone in reversed(obj.pose.bones) if poseBone.parent is None]
+        while len(stack) > 0:
+            poseBone, parent = stack.pop()
+            bone = BoneSnapshot(poseBone, parent)
+            bones.append(bone)
+            stack += [(child, bone) for child in reversed(poseBone.children)]
+        return bones
+
+    @classmethod
+    def Capture(cls, obj : bpy.types.Object, scene : bpy.types.Scene, captured : dict = None) -> 'ObjectSnapshot':
+        # parents are captured along with their children, each object only once
+        if captured is None:
+            captured = {}
+        snapshot = captured.get(obj, None)
+        if snapshot is None:
+            parent = ObjectSnapshot.Capture(obj.parent, scene, captured) if obj.parent is not None else None
+            snapshot = ObjectSnapshot(obj, scene, parent)
+            captured[obj] = snapshot
+        return snapshot
+
+
+class InstanceSnapshot(ObjectSnapshot):
+    """
+    An object instanced by geometry nodes, particles or a collection instance.
+    Instances have no ID of their own, they are keyed on the object that generated them and their persistent id.
+    """
+
+    def __init__(self, inst : bpy.types.DepsgraphObjectInstance, scene : bpy.types.Scene, parent : ObjectSnapshot):
+        persistentId = tuple(inst.persistent_id)
+        self.id = ("INSTANCE", parent.id, persistentId)
+        self.key = ("INSTANCE", parent.key, persistentId)
+        self.name : str = inst.object.name
+        self.idType = "OBJECT"
+        self.mappingKey = f"INSTANCE:{parent.mappingKey}:{','.join(str(i) for i in persistentId)}"
+        self.scene = scene
+        self.sceneKey = parent.sceneKey
+        self.parent = parent
+        self.type : str = inst.object.type
+        self.sessionUid : int = inst.object.session_uid
+        self.hideRender = False
+        # slots of instances are children of the instancer's slot
+        self.setLocalMatrix(inst.parent.matrix_world.inverted_safe() @ inst.matrix_world)
+        self.hasGeometry = inst.object.type in meshObjectTypes
+        self.mesh : MeshSnapshot = None
+        self.materials : list[MaterialSnapshot] = []
+        self.transformOnly = False
+        self.matrixWorld = inst.matrix_world.copy()
+        self.bones : list[BoneSnapshot] = [] # instanced armatures are only placed, not posed
+
+
+class SceneSnapshot(IDSnapshot):
+    """Immutable description of a scene, stands in for the context on the websocket thread"""
+
+    def __init__(self, scene : bpy.types.Scene, stats : SendStats = None):
+        super().__init__(scene)
+        self.scene = scene
+        self.registry = SlotRegistry.ForScene(self.key)
+        self.stats = stats if stats is not None else SendStats()
+        self.traceDir : str = bpy.path.abspath(scene.ResoniteLink_trace_dir) if scene.ResoniteLink_trace_dir != "" else None
+        self.maxInFlight : int = scene.ResoniteLink_max_in_flight
+        self.chunkVertexBudget : int = scene.ResoniteLink_chunk_vertex_budget
+        self.chunkByteBudget : int = scene.ResoniteLink_chunk_size_mb * 1024 * 1024
+        self.lodMode : str = scene.ResoniteLink_lod_mode
+        self.lodRatio : float = scene.ResoniteLink_lod_ratio
+        self.lodMinVertices : int = scene.ResoniteLink_lod_min_vertices
+        self.textureMaxSize : int = scene.ResoniteLink_texture_max_size
+        self.textureCacheDir : str = bpy.path.abspath(scene.ResoniteLink_texture_cache_dir) if scene.ResoniteLink_texture_cache_dir != "" else defaultTextureCacheDir()
+        self.mappingData : str = scene.get(SlotMapping.propName, "{}")
+        self.objects : list[ObjectSnapshot] = [] # in the order they should be sent
+        self.materials : dict[bpy.types.Material, MaterialSnapshot] = {}
+        self.meshes : dict[bpy.types.Mesh | tuple, MeshSnapshot] = {} # skinned meshes by their id, they aren't shared
+        self.textures : dict[bpy.types.Image, TextureSnapshot] = {}
+        self.changedMaterials : list[MaterialSnapshot] = [] # previously sent materials that changed on their own
+        self.complete = True # every object was captured, not only the changed ones
+        self.sceneObjectKeys : set[Hashable] = set() # keys of every object in the scene, even if it wasn't captured
+        self.visitedKeys : set[Hashable] = set() # objects whose instances were all captured
+        self.slotsValidated = False # set by the send once it checked which slots and components still exist
+
+
+class SnapshotCapture():
+    """
+    Captures a SceneSnapshot on the main thread.
+
+    The hierarchy, transforms and materials are captured in the first timer tick and handed over right away.
+    Mesh arrays and image pixels are read in the following ticks, a few per tick, and each one is handed over
+    as soon as it is read, so the websocket thread uploads one mesh while the next one is being read.
+    """
+
+    def __init__(self, scene : bpy.types.Scene, dirty : DirtySet = None, tickBudget : float = 0.02, stats : SendStats = None, skinning : bool = True):
+        self.scene = scene
+        self.dirty = dirty # only capture what changed, None captures everything
+        self.skinning = skinning # capture armature deformed meshes in their rest pose with their weights, instead of as they're posed
+        self.stats = stats if stats is not None else SendStats()
+        self.tickBudget = tickBudget # seconds of mesh reading per tick, keeps the UI responsive
+        self.structure : concurrent.futures.Future = concurrent.futures.Future()
+        self.pendingMeshes : list[MeshSnapshot] = []
+        self.pendingTextures : list[TextureSnapshot] = []
+        self.logger = logging.getLogger("ResoniteLink")
+
+    # can be called from any thread
+    async def captureAsync(self) -> SceneSnapshot:
+        MainThreadTimers.Register(self.tick)
+        return await asyncio.wrap_future(self.structure)
+
+    def tick(self) -> float:
+        # runs on the main thread
+        try:
+            if not self.structure.done():
+                with self.stats.phase("capture scene", "main"):
+                    self.structure.set_result(self.captureStructure())
+            else:
+                deadline = time.perf_counter() + self.tickBudget
+                depsgraph = self.evaluateDepsgraph()
+                while len(self.pendingMeshes) > 0 and time.perf_counter() < deadline:
+                    meshSnapshot = self.pendingMeshes.pop(0)
+                    try:
+                        with self.stats.phase("read mesh", "main", mesh=meshSnapshot.name, vertices=meshSnapshot.vertexCount):
+                            meshSnapshot.capture(depsgraph)
+                    except Exception as e:
+                        meshSnapshot.ready.set_exception(e)
+                # images are read once the meshes are, most of them only need a few uploads before a material shows them
+                while len(self.pendingMeshes) == 0 and len(self.pendingTextures) > 0 and time.perf_counter() < deadline:
+                    textureSnapshot = self.pendingTextures.pop(0)
+                    try:
+                        with self.stats.phase("read image", "main", image=textureSnapshot.name, pixels=textureSnapshot.width * textureSnapshot.height):
+                            textureSnapshot.capture()
+                    except Exception as e:
+                        textureSnapshot.ready.set_exception(e)
+        except Exception as e:
+            if not self.structure.done():
+                self.structure.set_exception(e)
+            for pending in self.pendingMeshes + self.pendingTextures:
+                pending.ready.set_exception(e)
+            self.pendingMeshes = []
+            self.pendingTextures = []
+        return 0.0 if len(self.pendingMeshes) > 0 or len(self.pendingTextures) > 0 else None
+
+    def evaluateDepsgraph(self) -> bpy.types.Depsgraph:
+        # evaluates whatever changed since the last call, which is where modifiers and geometry nodes run
+        with self.stats.phase("evaluate depsgraph", "main"):
+            return bpy.context.evaluated_depsgraph_get()
+
+    def captureStructure(self) -> SceneSnapshot:
+        scene = self.scene
+        snapshot = SceneSnapshot(scene, self.stats)
+        depsgraph = self.evaluateDepsgraph()
+        captured : dict[bpy.types.Object, ObjectSnapshot] = {}
+
+        objects = scene.objects
+        snapshot.sceneObjectKeys = {SlotRegistry.idKey(obj) for obj in scene.objects}
+        if self.dirty is not None:
+            snapshot.complete = False
+            # Only visit what the depsgraph reported as changed
+            names = self.dirty.objectNames()
+            objects = [obj for obj in scene.objects if obj.name_full in names]
+            for mat in bpy.data.materials:
+                if mat.name_full in self.dirty.materials and MaterialAssetSlotData.Get(snapshot.registry, SlotRegistry.idKey(mat)) is not None:
+                    snapshot.changedMaterials.append(self.captureMaterial(snapshot, mat))
+
+        for obj in objects:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.log(logging.DEBUG, f"{obj.name}, {obj.type}")
+                self.logger.log(logging.DEBUG, f"- track axis: {obj.track_axis}")
+                self.logger.log(logging.DEBUG, f"- up axis: {obj.up_axis}")
+                self.logger.log(logging.DEBUG, f"- hide render: {obj.hide_render}")
+                self.logger.log(logging.DEBUG, f"- hide viewport: {obj.hide_viewport}") # doesn't update?
+                self.logger.log(logging.DEBUG, f"- visible: {obj.visible_get()}")
+
+            objSnapshot = ObjectSnapshot.Capture(obj, scene, captured)
+            snapshot.objects.append(objSnapshot)
+
+            if self.dirty is not None and self.dirty.isTransformOnly(obj.name_full):
+                objectSlotData = ObjectSlotData.Get(snapshot.registry, objSnapshot.key)
+                if objectSlotData is not None and objectSlotData.slot is not None:
+                    objSnapshot.transformOnly = True
+                    continue
+            snapshot.visitedKeys.add(objSnapshot.key)
+
+            # Grease pencil technically could work but needs extra code to handle it
+            if not objSnapshot.hasGeometry or obj.type == "GREASEPENCIL" or obj.hide_render:
+                continue
+
+            armature = findArmature(obj) if self.skinning and obj.type == "MESH" else None
+            if armature is not None:
+                self.captureSkinnedMesh(snapshot, objSnapshot, obj, ObjectSnapshot.Capture(armature, scene, captured))
+                continue
+
+            # Evaluate mesh data with all current modifiers
+            eval_obj : bpy.types.Object = obj.evaluated_get(depsgraph)
+            self.captureMesh(snapshot, objSnapshot, eval_obj.data, obj, depsgraph)
+
+        # Geometry node, particle and collection instances aren't in scene.objects.
+        # Instances of the same geometry share the same evaluated mesh, which is only captured and sent once.
+        instanceCount = 0
+        for inst in depsgraph.object_instances:
+            if not inst.is_instance:
+                continue
+            instancer : bpy.types.Object = inst.parent.original
+            if self.dirty is not None and instancer.name_full not in names:
+                continue
+            parentSnapshot = ObjectSnapshot.Capture(instancer, scene, captured)
+            if parentSnapshot.transformOnly:
+                continue # instances move along with the instancer's slot
+
+            instSnapshot = InstanceSnapshot(inst, scene, parentSnapshot)
+            snapshot.objects.append(instSnapshot)
+            instanceCount += 1
+
+            if not instSnapshot.hasGeometry or instSnapshot.type == "GREASEPENCIL":
+                continue
+
+            # instanced objects can be evaluated again later, generated geometry only exists during this iteration
+            mesh : bpy.types.Mesh = inst.object.data
+            source = inst.object.original if mesh.original is not None and mesh.original == inst.object.original.data else None
+            self.captureMesh(snapshot, instSnapshot, mesh, source, depsgraph)
+
+        if instanceCount > 0:
+            self.logger.log(logging.INFO, f"{instanceCount} instances, {len(snapshot.meshes)} unique meshes")
+
+        # renderers of skinned meshes point at the bone slots, the armature is sent even if only the mesh changed
+        listed = {objSnapshot.key for objSnapshot in snapshot.objects}
+        for meshSnapshot in snapshot.meshes.values():
+            if meshSnapshot.armature is not None and meshSnapshot.armature.key not in listed:
+                snapshot.objects.append(meshSnapshot.armature)
+                listed.add(meshSnapshot.armature.key)
+
+        return snapshot
+
+    def captureMesh(self, snapshot : SceneSnapshot, objSnapshot : ObjectSnapshot, mesh : bpy.types.Mesh, source : bpy.types.Object, depsgraph : bpy.types.Depsgraph):
+        if len(mesh.vertices) == 0:
+            return # can happen in the case of metaballs- one of them will contain the whole mesh and the rest will be empty
+
+        objSnapshot.materials = [self.captureMaterial(snapshot, mat) for mat in mesh.materials if mat is not None]
+
+        meshSnapshot = snapshot.meshes.get(mesh, None)
+        if meshSnapshot is None:
+            owner = None
+            if source is None:
+                # generated geometry, the first object it was captured for keeps it
+                owner = (objSnapshot.key, objSnapshot.mappingKey)
+            elif mesh != source.data.evaluated_get(depsgraph):
+                # the modifiers of the source object made a mesh of its own
+                owner = (SlotRegistry.idKey(source), SlotMapping.idKey(source))
+            meshSnapshot = MeshSnapshot(mesh, source, owner)
+            snapshot.meshes[mesh] = meshSnapshot
+            if source is not None:
+                self.pendingMeshes.append(meshSnapshot)
+        meshSnapshot.instanceCount += 1
+        objSnapshot.mesh = meshSnapshot
+
+    def captureSkinnedMesh(self, snapshot : SceneSnapshot, objSnapshot : ObjectSnapshot, obj : bpy.types.Object, armature : ObjectSnapshot):
+        mesh : bpy.types.Mesh = obj.data
+        if len(mesh.vertices) == 0:
+            return
+
+        objSnapshot.materials = [self.captureMaterial(snapshot, mat) for mat in mesh.materials if mat is not None]
+
+        meshSnapshot = SkinnedMeshSnapshot(mesh, obj, objSnapshot, armature)
+        snapshot.meshes[meshSnapshot.id] = meshSnapshot
+        self.pendingMeshes.append(meshSnapshot)
+        meshSnapshot.instanceCount += 1
+        objSnapshot.mesh = meshSnapshot
+
+    def captureMaterial(self, snapshot : SceneSnapshot, mat : bpy.types.Material) -> MaterialSnapshot:
+        matSnapshot = snapshot.materials.get(mat, None)
+        if matSnapshot is None:
+            matSnapshot = MaterialSnapshot(mat)
+            snapshot.materials[mat] = matSnapshot
+            for member, image in matSnapshot.images.items():
+                textureSnapshot = self.captureTexture(snapshot, image)
+                if textureSnapshot is not None:
+                    textureSnapshot.isNormalMap = textureSnapshot.isNormalMap or member == 'NormalMap'
+                    matSnapshot.textures[member] = textureSnapshot
+        return matSnapshot
+
+    def captureTexture(self, snapshot : SceneSnapshot, image : bpy.types.Image) -> TextureSnapshot:
+        # images shared by materials are only read and sent once
+        textureSnapshot = snapshot.textures.get(image, None)
+        if textureSnapshot is None:
+            if image.size[0] == 0 or image.size[1] == 0:
+                return None # the file is missing, or it's a render result that wasn't rendered yet
+            textureSnapshot = TextureSnapshot(image, snapshot.textureMaxSize)
+            snapshot.textures[image] = textureSnapshot
+            self.pendingTextures.append(textureSnapshot)
+        return textureSnapshot
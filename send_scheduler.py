@@ -0,0 +1,144 @@
+# Other imports
+import time
+import asyncio
+import heapq
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+
+# Add-on file imports
+from .send_stats import *
+
+class SendJob():
+
+    def __init__(self, key : Hashable, factory : Callable[[], Awaitable], deps : list[Hashable], priority : int, order : int, label : str):
+        self.key = key
+        self.label = label # shown in the send stats
+        self.factory = factory
+        self.deps = deps
+        self.priority = priority # lower runs first
+        self.order = order # jobs of the same priority run in the order they were added
+        self.dependents : list['SendJob'] = []
+        self.remaining = 0 # dependencies that haven't finished yet
+        self.error : Exception = None
+
+
+class SendScheduler():
+    """
+    Runs the jobs of a send concurrently, each one as soon as the jobs it depends on are done.
+
+    The number of jobs in flight is bounded, and the bound adapts to the round-trip time of the requests the jobs make,
+    which the CommandBatcher reports through recordLatency: it grows by one for every request that completes about
+    as fast as the fastest request of its type did, and halves whenever a request takes much longer than that,
+    so a slow Resonite host isn't flooded. Whole jobs aren't measured, a job that extracts and uploads a large mesh
+    takes long without the host being any slower.
+    Among the jobs that are ready, the ones with the lowest priority value are started first.
+    """
+
+    def __init__(self, maxInFlight : int = 16, minInFlight : int = 1, slowdownFactor : float = 3.0, minSlowLatency : float = 0.05, stats : SendStats = None):
+        self.stats = stats
+        self.jobs : dict[Hashable, SendJob] = {}
+        self.addedCount = 0
+        self.maxInFlight = max(maxInFlight, minInFlight)
+        self.minInFlight = minInFlight
+        self.slowdownFactor = slowdownFactor
+        self.minSlowLatency = minSlowLatency
+        self.limit = self.minInFlight # slow start
+        self.inFlight = 0
+        self.peakInFlight = 0
+        self.baselineLatency : dict[Hashable, float] = {}
+        self.logger = logging.getLogger("ResoniteLink")
+
+    def __contains__(self, key : Hashable) -> bool:
+        return key in self.jobs
+
+    def add(self, key : Hashable, factory : Callable[[], Awaitable], deps : list[Hashable] = None, priority : int = 0, label : str = None):
+        """Adds a job, dependencies that are never added are ignored"""
+        self.addedCount += 1
+        self.jobs[key] = SendJob(key, factory, list(deps) if deps is not None else [], priority, self.addedCount, label if label is not None else str(key))
+
+    # can be called by anything running on the event loop of the send
+    def recordLatency(self, kind : Hashable, latency : float):
+        baseline = min(self.baselineLatency.get(kind, latency), latency)
+        self.baselineLatency[kind] = baseline
+        if latency > self.minSlowLatency and latency > baseline * self.slowdownFactor:
+            self.limit = max(self.minInFlight, self.limit // 2)
+        else:
+            self.limit = min(self.maxInFlight, self.limit + 1)
+
+    async def runAsync(self) -> dict[Hashable, Exception]:
+        """
+        Runs all added jobs.
+
+        Returns
+        -------
+        failures : dict
+            The exception of every job that failed or was skipped because a dependency failed
+        """
+
+        for job in self.jobs.values():
+            job.deps = [dep for dep in job.deps if dep in self.jobs and dep != job.key]
+            job.remaining = len(job.deps)
+            for dep in job.deps:
+                self.jobs[dep].dependents.append(job)
+
+        ready = [(job.priority, job.order, job) for job in self.jobs.values() if job.remaining == 0]
+        heapq.heapify(ready)
+        pending = len(self.jobs)
+        slotFreed = asyncio.Condition()
+        tasks : set[asyncio.Task] = set()
+        failures : dict[Hashable, Exception] = {}
+
+        async def runJob(job : SendJob):
+            SendStats.currentJob.set(job.key) # only affects this task
+            start = time.perf_counter()
+            try:
+                await job.factory()
+            except Exception as e:
+                job.error = e
+            duration = time.perf_counter() - start
+            if self.stats is not None:
+                self.stats.recordJob(job.key, job.label, start, duration, job.error is not None)
+            async with slotFreed:
+                self.inFlight -= 1
+                finished(job)
+                slotFreed.notify_all()
+
+        def finished(job : SendJob):
+            nonlocal pending
+            # a failure skips everything that depends on it, however long the chain, so this doesn't recurse
+            done = [job]
+            while done:
+                job = done.pop()
+                pending -= 1
+                if job.error is not None:
+                    failures[job.key] = job.error
+                for dependent in job.dependents:
+                    if job.error is not None and dependent.error is None:
+                        dependent.error = RuntimeError(f"Dependency {job.key} failed")
+                    dependent.remaining -= 1
+                    if dependent.remaining == 0:
+                        if dependent.error is None:
+                            heapq.heappush(ready, (dependent.priority, dependent.order, dependent))
+                        else:
+                            done.append(dependent)
+
+        async with slotFreed:
+            while pending > 0:
+                while ready and self.inFlight < self.limit:
+                    _, _, job = heapq.heappop(ready)
+                    self.inFlight += 1
+                    self.peakInFlight = max(self.peakInFlight, self.inFlight)
+                    task = asyncio.create_task(runJob(job))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if pending > 0 and self.inFlight == 0 and not ready:
+                    # only jobs waiting on each other are left
+                    for job in self.jobs.values():
+                        if job.remaining > 0:
+                            failures[job.key] = RuntimeError(f"Dependency cycle at {job.key}")
+                    break
+                if pending > 0:
+                    await slotFreed.wait()
+
+        self.logger.log(logging.INFO, f"Sent {len(self.jobs)} jobs, peak {self.peakInFlight} in flight, final limit {self.limit}")
+        return failures
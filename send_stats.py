@@ -0,0 +1,196 @@
+# Other imports
+import json
+import time
+import threading
+import contextlib
+import contextvars
+from collections.abc import Hashable
+
+class SendSpan():
+
+    def __init__(self, name : str, category : str, start : float, duration : float, thread : str, job : Hashable, args : dict):
+        self.name = name
+        self.category = category
+        self.start = start # perf_counter seconds
+        self.duration = duration
+        self.thread = thread # "main" or "websocket"
+        self.job = job # key of the scheduler job the span was recorded in, or None
+        self.args = args
+
+
+class SendStats():
+    """
+    Timings and request counts of one send.
+
+    Spans are recorded from the main thread while the scene is captured and from the websocket thread afterwards.
+    Scheduler jobs run concurrently, so the job a span belongs to is tracked in a context variable that every job sets
+    in its own task. Phase totals are summed over concurrent jobs and can add up to more than the duration of the send.
+    """
+
+    currentJob : contextvars.ContextVar = contextvars.ContextVar("ResoniteLinkSendJob", default=None)
+
+    def __init__(self, incremental : bool = False):
+        self.incremental = incremental
+        self.startTime = time.perf_counter()
+        self.startWallTime = time.time()
+        self.endTime : float = None
+        self.lock = threading.Lock()
+        self.spans : list[SendSpan] = []
+        self.jobLabels : dict[Hashable, str] = {}
+        self.jobTimes : dict[Hashable, float] = {}
+        self.requestCounts : dict[str, int] = {} # websocket requests by operation
+        self.requestTimes : dict[str, float] = {} # summed round trip times by operation
+        self.failedRequests = 0
+        self.skippedUpdates = 0 # updates that weren't sent because nothing in them changed
+        self.bytesSent = 0 # mesh and texture payloads, everything else is small in comparison
+
+    @contextlib.contextmanager
+    def phase(self, name : str, thread : str = "websocket", **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, thread, **args)
+
+    def record(self, name : str, start : float, duration : float, thread : str = "websocket", category : str = "phase", **args):
+        span = SendSpan(name, category, start, duration, thread, SendStats.currentJob.get(), args)
+        self.lock.acquire()
+        self.spans.append(span)
+        self.lock.release()
+
+    def recordJob(self, key : Hashable, label : str, start : float, duration : float, failed : bool):
+        self.lock.acquire()
+        self.jobLabels[key] = label
+        self.jobTimes[key] = duration
+        self.spans.append(SendSpan(label, "job", start, duration, "websocket", key, {'failed': failed}))
+        self.lock.release()
+
+    def countRequest(self, method : str, duration : float, failed : bool = False):
+        self.lock.acquire()
+        self.requestCounts[method] = self.requestCounts.get(method, 0) + 1
+        self.requestTimes[method] = self.requestTimes.get(method, 0.0) + duration
+        if failed:
+            self.failedRequests += 1
+        self.lock.release()
+
+    def countSkipped(self):
+        self.lock.acquire()
+        self.skippedUpdates += 1
+        self.lock.release()
+
+    def addBytes(self, byteCount : int):
+        self.lock.acquire()
+        self.bytesSent += byteCount
+        self.lock.release()
+
+    def finish(self):
+        self.endTime = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.endTime if self.endTime is not None else time.perf_counter()) - self.startTime
+
+    @property
+    def requestCount(self) -> int:
+        return sum(self.requestCounts.values())
+
+    def phaseTotals(self) -> dict[str, float]:
+        totals = {}
+        for span in self.spans:
+            if span.category == "phase":
+                totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return totals
+
+    def slowestJobs(self, count : int = 5, kinds : tuple = ("object", "mesh", "fullMesh")) -> list[tuple[str, float]]:
+        jobs = [(self.jobLabels[key], duration) for key, duration in self.jobTimes.items() if isinstance(key, tuple) and key[0] in kinds]
+        return sorted(jobs, key=lambda job: job[1], reverse=True)[:count]
+
+    def summaryLines(self) -> list[str]:
+        kind = "Changes" if self.incremental else "Scene"
+        lines = [f"{kind} sent in {self.duration:.2f} s, {self.requestCount} requests, {self.bytesSent / (1024 * 1024):.1f} MiB of meshes and textures"]
+        if self.failedRequests > 0:
+            lines[0] += f", {self.failedRequests} failed"
+        if self.skippedUpdates > 0:
+            lines[0] += f", {self.skippedUpdates} unchanged updates skipped"
+        totals = sorted(self.phaseTotals().items(), key=lambda item: item[1], reverse=True)
+        if len(totals) > 0:
+            lines.append("Phases: " + ", ".join(f"{name} {seconds:.2f} s" for name, seconds in totals))
+        if len(self.requestCounts) > 0:
+            lines.append("Requests: " + ", ".join(f"{method} {count}" for method, count in sorted(self.requestCounts.items(), key=lambda item: item[1], reverse=True)))
+        slowest = self.slowestJobs(3)
+        if len(slowest) > 0:
+            lines.append("Slowest: " + ", ".join(f"{label} {seconds:.2f} s" for label, seconds in slowest))
+        return lines
+
+    def toChromeTrace(self) -> dict:
+        """
+        Convert the spans to the Chrome trace event format, which chrome://tracing and Perfetto can open.
+
+        Concurrent jobs are spread over lanes so that their spans don't overlap,
+        the spans recorded inside a job are shown in the lane of that job.
+
+        Returns
+        -------
+        trace : dict
+            The trace, ready to be written as JSON
+        """
+
+        self.lock.acquire()
+        spans = sorted(self.spans, key=lambda span: span.start)
+        self.lock.release()
+
+        mainLane = 1
+        websocketLane = 2
+        laneEnds : list[float] = [] # end time of the last job in each job lane
+        jobLanes : dict[Hashable, int] = {}
+        for span in spans:
+            if span.category != "job":
+                continue
+            lane = next((i for i, end in enumerate(laneEnds) if end <= span.start), None)
+            if lane is None:
+                lane = len(laneEnds)
+                laneEnds.append(0.0)
+            laneEnds[lane] = span.start + span.duration
+            jobLanes[span.job] = websocketLane + 1 + lane
+
+        def micros(seconds : float) -> float:
+            return round(seconds * 1000000, 3)
+
+        events = [
+            {'name': "thread_name", 'ph': "M", 'pid': 1, 'tid': mainLane, 'args': {'name': "Blender main thread"}},
+            {'name': "thread_name", 'ph': "M", 'pid': 1, 'tid': websocketLane, 'args': {'name': "Websocket thread"}},
+        ]
+        for i in range(len(laneEnds)):
+            events.append({'name': "thread_name", 'ph': "M", 'pid': 1, 'tid': websocketLane + 1 + i, 'args': {'name': f"Jobs {i + 1}"}})
+
+        events.append({
+            'name': "Send", 'cat': "send", 'ph': "X", 'pid': 1, 'tid': websocketLane,
+            'ts': 0, 'dur': micros(self.duration),
+            'args': {
+                'incremental': self.incremental,
+                'requests': dict(self.requestCounts),
+                'requestSeconds': dict(self.requestTimes),
+                'failedRequests': self.failedRequests,
+                'bytesSent': self.bytesSent,
+            }
+        })
+        for span in spans:
+            if span.thread == "main":
+                tid = mainLane
+            else:
+                tid = jobLanes.get(span.job, websocketLane)
+            events.append({
+                'name': span.name, 'cat': span.category, 'ph': "X", 'pid': 1, 'tid': tid,
+                'ts': micros(span.start - self.startTime), 'dur': micros(span.duration),
+                'args': span.args
+            })
+
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': "ms",
+            'otherData': {'startTime': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.startWallTime))},
+        }
+
+    def saveChromeTrace(self, path : str):
+        with open(path, "w") as f:
+            json.dump(self.toChromeTrace(), f, default=str)
@@ -0,0 +1,177 @@
+# Resonitelink Imports
+from resonitelink.proxies.datamodel.slot_proxy import SlotProxy
+from resonitelink import ResoniteLinkWebsocketClient
+
+# Other imports
+import asyncio
+import logging
+from collections.abc import Hashable
+
+# Add-on file imports
+from .interop import *
+from .slot_registry import *
+
+class SessionCleanup():
+    """
+    Deletes what the add-on created in Resonite that nothing in Blender maps to anymore.
+
+    After a send, the slot data of objects that were removed from the scene, and of mesh and material assets
+    no renderer uses anymore, is taken out of the registry and its slots are deleted. Removing a slot removes
+    everything below it, so only the topmost slot of a removed hierarchy is deleted.
+    """
+
+    removeWarned = False
+
+    def __init__(self, registry : SlotRegistry, maxInFlight : int = 16):
+        self.registry = registry
+        self.maxInFlight = maxInFlight
+        self.logger = logging.getLogger("ResoniteLink")
+
+    def isLive(self, key : Hashable, context : 'SceneSnapshot', captured : set[Hashable]) -> bool:
+        if key in captured:
+            return True
+        if isinstance(key, tuple) and key[0] == "INSTANCE":
+            # instances are only captured along with their instancer, the others are still there if it is
+            instancer = key[1]
+            return not context.complete and instancer not in context.visitedKeys and self.isLive(instancer, context, captured)
+        return key in context.sceneObjectKeys
+
+    def collectOrphans(self, context : 'SceneSnapshot') -> list[ID_SlotData]:
+        """
+        Find the slot data of removed objects and unused assets.
+
+        Parameters
+        ----------
+        context : SceneSnapshot
+            The snapshot that was just sent
+
+        Returns
+        -------
+        orphans : list[ID_SlotData]
+            Slot data whose slots can be deleted
+        """
+
+        captured = {objSnapshot.key for objSnapshot in context.objects}
+        objects = [data for data in self.registry.values() if isinstance(data, ObjectSlotData)]
+        orphanObjects = {data.key: data for data in objects if not self.isLive(data.key, context, captured)}
+
+        # a removed object is kept as long as a slot that is still used sits below it, until that one was sent again
+        for data in objects:
+            if data.key in orphanObjects:
+                continue
+            parent = data.snapshot.parent
+            while parent is not None and parent.key in orphanObjects:
+                orphanObjects.pop(parent.key)
+                parent = parent.parent
+
+        # assets are only deleted once no renderer that is kept points at them
+        usedAssets = set()
+        for data in objects:
+            if data.key in orphanObjects or not isinstance(data, MeshObjectSlotData):
+                continue
+            if data.meshData is not None:
+                usedAssets.add(data.meshData.key)
+            usedAssets |= {mat.key for mat in data.matData if mat is not None}
+            usedAssets |= {texture.key for mat in data.matData if mat is not None for texture in mat.snapshot.textures.values()}
+        orphanAssets = [data for data in self.registry.values() if isinstance(data, AssetSlotData) and data.key not in usedAssets]
+        return list(orphanObjects.values()) + orphanAssets
+
+    async def deleteSlotsAsync(self, client : ResoniteLinkWebsocketClient, slotIds : list[str]) -> int:
+        if len(slotIds) == 0:
+            return 0
+        if not hasattr(client, 'remove_slot'):
+            if not SessionCleanup.removeWarned:
+                SessionCleanup.removeWarned = True
+                self.logger.log(logging.WARNING, "Slots can't be removed with this ResoniteLink.py version, removed objects are left in Resonite")
+            return 0
+
+        # the deletes don't depend on each other, only the number of them in flight is limited
+        semaphore = asyncio.Semaphore(self.maxInFlight)
+        async def delete(slotId : str) -> bool:
+            async with semaphore:
+                try:
+                    await client.remove_slot(SlotProxy(client, slotId))
+                    return True
+                except Exception:
+                    # already gone
+                    return False
+
+        results = await asyncio.gather(*(delete(slotId) for slotId in slotIds))
+        return sum(results)
+
+    async def collectAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot', leftovers : dict[str, dict] = None) -> int:
+        """
+        Delete the slots of removed objects and unused assets after a send.
+
+        Parameters
+        ----------
+        client : ResoniteLinkWebsocketClient
+            The client, or the batcher in front of it
+        context : SceneSnapshot
+            The snapshot that was just sent
+        leftovers : dict[str, dict]
+            Slot mapping entries of a previous session that nothing adopted, their slots are deleted as well
+
+        Returns
+        -------
+        removed : int
+            The number of slots that were deleted
+        """
+
+        if not hasattr(client, 'remove_slot'):
+            return await self.deleteSlotsAsync(client, [])
+
+        orphans = self.collectOrphans(context)
+        removedKeys = {data.key for data in orphans}
+        slotIds = []
+        for data in orphans:
+            self.registry.remove(data.key)
+            parent = data.snapshot.parent if isinstance(data, ObjectSlotData) else None
+            if data.slot is not None and (parent is None or parent.key not in removedKeys):
+                slotIds.append(data.slot.id)
+
+        if leftovers is not None:
+            slotIds += [entry['slot'] for entry in leftovers.values() if self.registry.findSlot(entry['slot']) is None]
+
+        removed = await self.deleteSlotsAsync(client, slotIds)
+        if len(orphans) > 0 or removed > 0:
+            self.logger.log(logging.INFO, f"Removed {len(orphans)} orphaned slot data entries, deleted {removed} slots")
+        return removed
+
+    async def compactAsync(self, client : ResoniteLinkWebsocketClient, context : 'SceneSnapshot') -> int:
+        """
+        Delete every slot below the scene root that the registry doesn't know, call this right after a full send.
+
+        Anything added below the scene root by hand in Resonite is deleted too.
+
+        Returns
+        -------
+        removed : int
+            The number of slots that were deleted
+        """
+
+        sceneSlotData = self.registry.get(context.key)
+        if sceneSlotData is None or sceneSlotData.slot is None:
+            return 0
+
+        hierarchy = await SlotHierarchy.QueryAsync(client, sceneSlotData.slot.id)
+        if hierarchy is None:
+            self.logger.log(logging.WARNING, "This ResoniteLink.py version can't list the children of a slot, only the slots recorded by the add-on were cleaned up")
+            return 0
+
+        known = {self.registry.assetsSlotRoot.id if self.registry.assetsSlotRoot is not None else None,
+                 self.registry.defaultMaterialSlot.id if self.registry.defaultMaterialSlot is not None else None}
+        for data in self.registry.values():
+            known.update(SlotRegistry.childSlotIds(data))
+        untracked = []
+        stack = [hierarchy.rootId]
+        while len(stack) > 0:
+            for childId in hierarchy.children.get(stack.pop(), []):
+                if self.registry.findSlot(childId) is None and childId not in known:
+                    untracked.append(childId) # takes its children with it
+                else:
+                    stack.append(childId)
+
+        removed = await self.deleteSlotsAsync(client, untracked)
+        self.logger.log(logging.INFO, f"Compacted the session, deleted {removed} of {len(untracked)} untracked slots below the scene root")
+        return removed
@@ -0,0 +1,172 @@
+# Blender Imports
+import bpy
+
+# Resonitelink Imports
+from resonitelink.proxies.datamodel.slot_proxy import SlotProxy
+from resonitelink.proxies.datamodel.component_proxy import ComponentProxy
+from resonitelink import ResoniteLinkWebsocketClient
+
+# Other imports
+import json
+import asyncio
+import logging
+import threading
+
+# Add-on file imports
+from .main_thread import *
+
+class SlotMapping():
+    """
+    Persistent record of the slots, components and mesh assets that were created in Resonite.
+
+    The mapping is stored as JSON in a custom property of the scene, so it is saved with the .blend file and
+    lets a new session adopt what a previous one created instead of sending everything again.
+    """
+
+    propName = "ResoniteLink_mapping"
+    version = 1
+
+    def __init__(self):
+        # id key -> {'slot': slot id, 'components': {attribute name: component id}, ...}
+        self.entries : dict[str, dict] = {}
+        # mesh fingerprint -> asset url
+        self.assets : dict[str, str] = {}
+        self.validated = False
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def idKey(id : bpy.types.ID) -> str:
+        # evaluated datablocks have no identity of their own, use the original they were evaluated from,
+        # meshes that modifiers or geometry nodes made are keyed on their object by MeshSnapshot
+        orig = id.original if id.original is not None else id
+        return f"{orig.id_type}:{orig.name_full}"
+
+    # data is the JSON stored in the scene property, read on the main thread
+    def load(self, data : str):
+        self.lock.acquire()
+        self.entries = {}
+        self.assets = {}
+        try:
+            data = json.loads(data)
+            if data.get("version", None) == SlotMapping.version:
+                self.entries = data.get("slots", {})
+                self.assets = data.get("assets", {})
+        except ValueError:
+            logging.getLogger("ResoniteLink").log(logging.WARNING, "Ignoring unreadable slot mapping stored in the scene")
+        self.validated = False
+        self.lock.release()
+
+    def save(self, scene : bpy.types.Scene, entries : dict[str, dict], assets : dict[str, str]):
+        self.lock.acquire()
+        self.entries = entries
+        self.assets = assets
+        data = json.dumps({"version": SlotMapping.version, "slots": entries, "assets": assets})
+        self.lock.release()
+
+        # ID properties may only be written from the main thread
+        def write():
+            scene[SlotMapping.propName] = data
+            return None
+        MainThreadTimers.Register(write)
+
+    def take(self, key : str) -> dict:
+        self.lock.acquire()
+        entry = self.entries.pop(key, None)
+        self.lock.release()
+        return entry
+
+    def filterExisting(self, slotIds : set[str], componentIds : set[str] = None):
+        """
+        Drop the entries whose slot is gone, like validateAsync but with ids that were read already.
+
+        Parameters
+        ----------
+        slotIds : set[str]
+            Every slot that exists below the scene root, including the root
+        componentIds : set[str]
+            Every component on those slots, None if they aren't known and every component is assumed to exist
+        """
+
+        self.lock.acquire()
+        total = len(self.entries)
+        def exists(entry : dict) -> bool:
+            if entry['slot'] not in slotIds:
+                return False
+            if not all(slotId in slotIds for ids in entry.get('slotLists', {}).values() for slotId in ids):
+                return False
+            if componentIds is None:
+                return True
+            # an incomplete slot isn't adopted, it's deleted along with the other leftovers once everything was sent
+            compIds = list(entry.get('components', {}).values()) + [compId for compIds in entry.get('componentLists', {}).values() for compId in compIds]
+            return all(compId in componentIds for compId in compIds)
+
+        entries = {key: entry for key, entry in self.entries.items() if exists(entry)}
+        self.entries = entries
+        self.validated = True
+        self.lock.release()
+
+        logging.getLogger("ResoniteLink").log(logging.INFO, f"Slot mapping: adopted {len(entries)} of {total} recorded slots")
+
+    # the entries no slot data adopted, called once everything was sent
+    def takeAll(self) -> dict[str, dict]:
+        self.lock.acquire()
+        entries = self.entries
+        self.entries = {}
+        self.lock.release()
+        return entries
+
+    def clear(self):
+        self.lock.acquire()
+        self.entries = {}
+        self.validated = False
+        self.lock.release()
+
+    async def validateAsync(self, client : ResoniteLinkWebsocketClient):
+        """Check every recorded slot and component in one go and drop the ones that no longer exist"""
+
+        async def exists(coro) -> bool:
+            try:
+                await coro
+                return True
+            except Exception:
+                return False
+
+        self.lock.acquire()
+        entries = dict(self.entries)
+        self.lock.release()
+
+        keys = list(entries.keys())
+        slotChecks = [exists(client.get_slot(SlotProxy(client, entries[key]['slot']))) for key in keys]
+        compKeys = [(key, attr) for key in keys for attr in entries[key].get('components', {})]
+        compChecks = [exists(client.get_component(ComponentProxy(client, entries[key]['components'][attr]))) for key, attr in compKeys]
+        listKeys = [(key, attr, compId) for key in keys for attr, compIds in entries[key].get('componentLists', {}).items() for compId in compIds]
+        listChecks = [exists(client.get_component(ComponentProxy(client, compId))) for _, _, compId in listKeys]
+        slotListKeys = [(key, attr, slotId) for key in keys for attr, slotIds in entries[key].get('slotLists', {}).items() for slotId in slotIds]
+        slotListChecks = [exists(client.get_slot(SlotProxy(client, slotId))) for _, _, slotId in slotListKeys]
+
+        results = await asyncio.gather(*slotChecks, *compChecks, *listChecks, *slotListChecks)
+        slotResults = results[:len(keys)]
+        compResults = results[len(keys):len(keys) + len(compKeys)]
+        listResults = results[len(keys) + len(compKeys):len(keys) + len(compKeys) + len(listKeys)]
+        slotListResults = results[len(keys) + len(compKeys) + len(listKeys):]
+
+        for (key, attr), ok in zip(compKeys, compResults):
+            if not ok:
+                entries[key]['components'].pop(attr)
+        # a list is only adopted if all of its components still exist
+        for (key, attr, _), ok in zip(listKeys, listResults):
+            if not ok:
+                entries[key]['componentLists'].pop(attr, None)
+        for (key, attr, _), ok in zip(slotListKeys, slotListResults):
+            if not ok:
+                entries[key]['slotLists'].pop(attr, None)
+        for key, ok in zip(keys, slotResults):
+            if not ok:
+                entries.pop(key)
+
+        self.lock.acquire()
+        self.entries = entries
+        self.validated = True
+        self.lock.release()
+
+        logging.getLogger("ResoniteLink").log(logging.INFO, f"Slot mapping: adopted {len(entries)} of {len(keys)} recorded slots")
@@ -0,0 +1,374 @@
+# Blender Imports
+import bpy
+
+# Resonitelink Imports
+from resonitelink.proxies.datamodel.slot_proxy import SlotProxy
+from resonitelink.proxies.datamodel.component_proxy import ComponentProxy
+from resonitelink import ResoniteLinkWebsocketClient
+
+# Other imports
+import threading
+from typing import Any
+from collections.abc import Hashable
+
+# Add-on file imports
+from .slot_mapping import *
+
+class SlotHierarchy():
+    """The ids of a slot and of every slot and component below it, read with a single request"""
+
+    def __init__(self, rootId : str):
+        self.rootId = rootId
+        self.exists = False # False if the root slot is gone, and everything that was below it
+        self.slotIds : set[str] = set()
+        self.componentIds : set[str] = None # None if the response didn't list the components
+        self.children : dict[str, list[str]] = {}
+
+    @classmethod
+    async def QueryAsync(cls, client : ResoniteLinkWebsocketClient, rootId : str) -> 'SlotHierarchy':
+        """
+        Read the hierarchy below a slot.
+
+        Returns
+        -------
+        hierarchy : SlotHierarchy
+            The ids below the root, or None if this ResoniteLink.py version can't read a hierarchy
+        """
+
+        hierarchy = SlotHierarchy(rootId)
+        try:
+            root = await client.get_slot(SlotProxy(client, rootId), depth=-1)
+        except TypeError:
+            return None
+        except Exception:
+            return hierarchy
+
+        hierarchy.exists = True
+        if getattr(root, 'components', None) is not None:
+            hierarchy.componentIds = set()
+        stack = [root]
+        while len(stack) > 0:
+            slot = stack.pop()
+            hierarchy.slotIds.add(slot.id)
+            if hierarchy.componentIds is not None:
+                hierarchy.componentIds |= {comp.id for comp in getattr(slot, 'components', None) or []}
+            children = getattr(slot, 'children', None) or []
+            hierarchy.children[slot.id] = [child.id for child in children]
+            stack += children
+        return hierarchy
+
+    def hasComponents(self, componentIds : list[str]) -> bool:
+        return self.componentIds is None or all(componentId in self.componentIds for componentId in componentIds)
+
+    def descendants(self, slotId : str) -> list[str]:
+        result = []
+        stack = list(self.children.get(slotId, []))
+        while len(stack) > 0:
+            childId = stack.pop()
+            result.append(childId)
+            stack += self.children.get(childId, [])
+        return result
+
+
+class ShadowState():
+    """
+    The member values last sent for every slot and component, so that updates only carry what changed.
+
+    Values are kept as plain Python values, proxies by their id. Members listed in the tolerances are float tuples
+    that count as unchanged as long as every element stays within the tolerance of what was sent, the difference to
+    the sent value is what's measured, so small steps still add up to an update eventually.
+    A value is recorded as it's sent, messages are handled in order, and forgotten again if the request fails.
+    """
+
+    # absolute tolerance per member, members that aren't listed have to match exactly
+    tolerances : dict[str, float] = {
+        'position': 1e-5,
+        'rotation': 1e-6,
+        'scale': 1e-6,
+    }
+
+    def __init__(self):
+        self.sent : dict[str, dict[str, Any]] = {} # slot or component id -> member -> value
+
+    @staticmethod
+    def plain(value : Any) -> Any:
+        if isinstance(value, (SlotProxy, ComponentProxy)):
+            return value.id
+        if isinstance(value, (list, tuple)):
+            return tuple(ShadowState.plain(element) for element in value)
+        return value
+
+    @staticmethod
+    def matches(sent : Any, value : Any, tolerance : float) -> bool:
+        if tolerance is None or not isinstance(sent, tuple) or not isinstance(value, tuple) or len(sent) != len(value):
+            return sent == value
+        return all(abs(a - b) <= tolerance for a, b in zip(sent, value))
+
+    def changed(self, targetId : str, state : dict[str, Any]) -> dict[str, Any]:
+        """
+        Pick the members that differ from what was last sent.
+
+        Parameters
+        ----------
+        targetId : str
+            Id of the slot or component
+        state : dict[str, Any]
+            The values the members should have
+
+        Returns
+        -------
+        changed : dict[str, Any]
+            The members of the state that need to be sent
+        """
+
+        sent = self.sent.get(targetId, None)
+        if sent is None:
+            return dict(state)
+        return {name: value for name, value in state.items()
+                if name not in sent or not ShadowState.matches(sent[name], ShadowState.plain(value), ShadowState.tolerances.get(name, None))}
+
+    def record(self, targetId : str, state : dict[str, Any]):
+        sent = self.sent.get(targetId, None)
+        if sent is None:
+            sent = {}
+            self.sent[targetId] = sent
+        for name, value in state.items():
+            sent[name] = ShadowState.plain(value)
+
+    def forget(self, targetId : str):
+        self.sent.pop(targetId, None)
+
+
+class SlotRegistry():
+    """
+    The slot data of one scene, keyed on the session_uid of the IDs it was created for.
+
+    The session_uid of an ID stays the same across renames and undo steps, which replace the Python objects
+    of every ID, so slot data isn't lost and sent again just because Blender reallocated the ID.
+    Objects generated by instancing are keyed on a tuple that contains the key of their instancer.
+
+    Lookups don't take the lock. Writers build the entry and its reverse index entries under the lock,
+    single dict lookups and stores are atomic, so the websocket thread never waits for the main thread or
+    the other way around. Clearing swaps in new dicts, readers still holding the old ones finish with those.
+    """
+
+    registries : dict[Hashable, 'SlotRegistry'] = {}
+    registriesLock = threading.Lock()
+
+    def __init__(self, sceneKey : Hashable):
+        self.sceneKey = sceneKey
+        self.lock = threading.Lock()
+        self.entries : dict[Hashable, Any] = {} # id key -> ID_SlotData
+        self.bySlot : dict[str, Any] = {} # slot id -> ID_SlotData
+        self.byComponent : dict[str, Any] = {} # component id -> ID_SlotData, rebuilt by reindexComponents
+        # slots and components created in previous sessions
+        self.mapping = SlotMapping()
+        # slots shared by every asset of the scene
+        self.assetsSlotRoot : SlotProxy = None
+        self.defaultMaterialSlot : SlotProxy = None
+        self.defaultMaterial : ComponentProxy = None
+        self.staleCount = 0 # entries the last validation found gone from Resonite
+        # what was last sent to every slot and component of the scene
+        self.shadow = ShadowState()
+
+    @staticmethod
+    def idKey(id : bpy.types.ID | Hashable) -> Hashable:
+        """
+        Key of an ID in the registry, only call this with an ID on the main thread.
+
+        Parameters
+        ----------
+        id : bpy.types.ID | Hashable
+            The ID, or a key that was built already, which is returned as is
+
+        Returns
+        -------
+        key : Hashable
+            (id type, session_uid) of the original ID
+        """
+
+        if isinstance(id, (tuple, str)):
+            return id
+        # evaluated datablocks share the session_uid of their original, go through it anyway to get the type right,
+        # meshes that modifiers or geometry nodes made are keyed on their object by MeshSnapshot
+        orig = id.original if id.original is not None else id
+        return (orig.id_type, orig.session_uid)
+
+    @classmethod
+    def ForScene(cls, scene : bpy.types.Scene | Hashable) -> 'SlotRegistry':
+        sceneKey = SlotRegistry.idKey(scene)
+        registry = SlotRegistry.registries.get(sceneKey, None)
+        if registry is None:
+            SlotRegistry.registriesLock.acquire()
+            registry = SlotRegistry.registries.get(sceneKey, None)
+            if registry is None:
+                registry = SlotRegistry(sceneKey)
+                SlotRegistry.registries[sceneKey] = registry
+            SlotRegistry.registriesLock.release()
+        return registry
+
+    @classmethod
+    def ClearAll(cls):
+        SlotRegistry.registriesLock.acquire()
+        registries = list(SlotRegistry.registries.values())
+        SlotRegistry.registriesLock.release()
+        for registry in registries:
+            registry.clear()
+
+    @classmethod
+    def DropDeleted(cls, scenes : list[bpy.types.Scene]):
+        """Forget the registries of scenes that aren't in the list anymore, only call this on the main thread"""
+        sceneKeys = {SlotRegistry.idKey(scene) for scene in scenes}
+        SlotRegistry.registriesLock.acquire()
+        dropped = [SlotRegistry.registries.pop(key) for key in list(SlotRegistry.registries) if key not in sceneKeys]
+        SlotRegistry.registriesLock.release()
+        for registry in dropped:
+            registry.clear()
+
+    # can be called from any thread
+    def get(self, key : Hashable) -> Any:
+        return self.entries.get(key, None)
+
+    def findSlot(self, slotId : str) -> Any:
+        return self.bySlot.get(slotId, None)
+
+    def findComponent(self, componentId : str) -> Any:
+        return self.byComponent.get(componentId, None)
+
+    def add(self, key : Hashable, data : Any):
+        self.lock.acquire()
+        previous = self.entries.get(key, None)
+        if previous is not None and previous is not data:
+            self.unindex(previous)
+            previous.registry = None
+        data.registry = self
+        self.entries[key] = data
+        if data.slot is not None:
+            self.bySlot[data.slot.id] = data
+        self.lock.release()
+
+    def remove(self, key : Hashable) -> Any:
+        self.lock.acquire()
+        data = self.entries.pop(key, None)
+        if data is not None:
+            self.unindex(data)
+            data.registry = None
+            if data.slot is not None:
+                self.shadow.forget(data.slot.id)
+            for targetId in SlotRegistry.componentIds(data) + SlotRegistry.childSlotIds(data):
+                self.shadow.forget(targetId)
+        self.lock.release()
+        return data
+
+    def clear(self):
+        """Forget everything sent for this scene, the registries of other scenes are kept"""
+
+        self.lock.acquire()
+        for data in self.entries.values():
+            data.registry = None
+        self.entries = {}
+        self.bySlot = {}
+        self.byComponent = {}
+        self.assetsSlotRoot = None
+        self.defaultMaterialSlot = None
+        self.defaultMaterial = None
+        self.shadow = ShadowState()
+        self.lock.release()
+
+    def values(self) -> list[Any]:
+        self.lock.acquire()
+        values = list(self.entries.values())
+        self.lock.release()
+        return values
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # called by ID_SlotData whenever its slot is replaced
+    def indexSlot(self, data : Any, oldSlot : SlotProxy, newSlot : SlotProxy):
+        self.lock.acquire()
+        if oldSlot is not None and self.bySlot.get(oldSlot.id, None) is data:
+            self.bySlot.pop(oldSlot.id)
+        if newSlot is not None:
+            self.bySlot[newSlot.id] = data
+        self.lock.release()
+
+    def reindexComponents(self):
+        """Rebuild the component index, components are created and replaced in too many places to track them one by one"""
+
+        self.lock.acquire()
+        byComponent = {}
+        for data in self.entries.values():
+            for componentId in SlotRegistry.componentIds(data):
+                byComponent[componentId] = data
+        self.byComponent = byComponent
+        self.lock.release()
+
+    # must hold the lock
+    def unindex(self, data : Any):
+        if data.slot is not None and self.bySlot.get(data.slot.id, None) is data:
+            self.bySlot.pop(data.slot.id)
+        for componentId in SlotRegistry.componentIds(data):
+            if self.byComponent.get(componentId, None) is data:
+                self.byComponent.pop(componentId)
+
+    def markStale(self, hierarchy : SlotHierarchy) -> list[str]:
+        """
+        Drop the slots of the entries that are gone from Resonite, so that the send creates them again right away.
+
+        Entries whose slot exists but is missing one of its components, or one of the further slots
+        it made below its own, are created again as well, along with everything below their slot.
+
+        Parameters
+        ----------
+        hierarchy : SlotHierarchy
+            What exists below the scene root
+
+        Returns
+        -------
+        slotIds : list[str]
+            Slots of those incomplete entries, they need to be deleted before anything is sent
+        """
+
+        stale = {}
+        incomplete = []
+        for data in self.values():
+            if data.slot is None:
+                continue
+            if data.slot.id not in hierarchy.slotIds:
+                stale[data.key] = data
+            elif not hierarchy.hasComponents(SlotRegistry.componentIds(data)) \
+                    or not all(slotId in hierarchy.slotIds for slotId in SlotRegistry.childSlotIds(data)):
+                stale[data.key] = data
+                incomplete.append(data.slot.id)
+
+        # deleting an incomplete slot takes the slots below it with it
+        below = set()
+        for slotId in incomplete:
+            below.update(hierarchy.descendants(slotId))
+        for data in self.values():
+            if data.slot is not None and data.slot.id in below:
+                stale[data.key] = data
+
+        for data in stale.values():
+            data.slot = None
+        if self.assetsSlotRoot is not None and (self.assetsSlotRoot.id not in hierarchy.slotIds or self.assetsSlotRoot.id in below):
+            self.assetsSlotRoot = None
+        if self.defaultMaterial is not None and (self.defaultMaterialSlot.id not in hierarchy.slotIds or self.defaultMaterialSlot.id in below
+                                                 or not hierarchy.hasComponents([self.defaultMaterial.id])):
+            self.defaultMaterialSlot = None
+            self.defaultMaterial = None
+
+        self.staleCount = len(stale)
+        return [slotId for slotId in incomplete if slotId not in below]
+
+    @staticmethod
+    def componentIds(data : Any) -> list[str]:
+        ids = [getattr(data, attr).id for attr in data.componentAttrs if getattr(data, attr, None) is not None]
+        for attr in data.componentListAttrs:
+            ids += [comp.id for comp in getattr(data, attr, [])]
+        return ids
+
+    @staticmethod
+    def childSlotIds(data : Any) -> list[str]:
+        return [slot.id for attr in data.slotListAttrs for slot in getattr(data, attr, [])]
@@ -0,0 +1,12 @@
+# Other imports
+import os
+import pytest
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The add-on folder is a package itself, pytest would import its __init__.py before running the tests inside it,
+# which needs ResoniteLink.py. It is collected as a plain folder, the tests load the modules they need on their own.
+def pytest_collect_directory(path, parent):
+    if str(path) == repoDir:
+        return pytest.Dir.from_parent(parent, path=path)
+    return None
@@ -0,0 +1,68 @@
+"""
+Shared setup of the tests, they run without Blender on the stand-in bpy from benchmarks/bpy_standin.py.
+
+    python -m pytest tests
+
+Modules that import ResoniteLink.py are only tested when it is installed, those tests are skipped otherwise.
+"""
+
+# Other imports
+import os
+import sys
+import types
+import importlib
+import importlib.util
+import pytest
+
+testsDir = os.path.dirname(os.path.abspath(__file__))
+repoDir = os.path.dirname(testsDir)
+sys.path.insert(0, os.path.join(repoDir, "benchmarks"))
+
+# Benchmark imports
+import bpy_standin
+bpy_standin.install()
+
+addonPackage = "resonitelink_addon"
+
+def importAddonModule(name : str) -> types.ModuleType:
+    # the add-on uses relative imports, load its modules as a package without running __init__.py and registering anything
+    if addonPackage not in sys.modules:
+        package = types.ModuleType(addonPackage)
+        package.__path__ = [repoDir]
+        sys.modules[addonPackage] = package
+    return importlib.import_module(f"{addonPackage}.{name}")
+
+def importLinkModule(name : str) -> types.ModuleType:
+    pytest.importorskip("resonitelink", reason="ResoniteLink.py is not installed")
+    return importAddonModule(name)
+
+
+@pytest.fixture(scope="session")
+def mesh_data() -> types.ModuleType:
+    return importAddonModule("mesh_data")
+
+@pytest.fixture(scope="session")
+def send_scheduler() -> types.ModuleType:
+    return importAddonModule("send_scheduler")
+
+@pytest.fixture(scope="session")
+def command_batcher() -> types.ModuleType:
+    return importLinkModule("command_batcher")
+
+@pytest.fixture(scope="session")
+def slot_registry() -> types.ModuleType:
+    return importLinkModule("slot_registry")
+
+@pytest.fixture(scope="session")
+def slot_mapping() -> types.ModuleType:
+    return importLinkModule("slot_mapping")
+
+@pytest.fixture(scope="session")
+def addon() -> types.ModuleType:
+    # the whole add-on with its __init__.py, under a name of its own so that it doesn't replace the bare package
+    pytest.importorskip("resonitelink", reason="ResoniteLink.py is not installed")
+    spec = importlib.util.spec_from_file_location("resonitelink_addon_full", os.path.join(repoDir, "__init__.py"), submodule_search_locations=[repoDir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,54 @@
+# Other imports
+import numpy as np
+
+
+def reduce(mesh_data, influences : list[list[tuple[int, float]]], count : int = 4):
+    # (bone, weight) pairs per vertex
+    vertices = np.array([v for v, vertInfluences in enumerate(influences) for _ in vertInfluences], dtype=np.int32)
+    bones = np.array([bone for vertInfluences in influences for bone, _ in vertInfluences], dtype=np.int32)
+    weights = np.array([weight for vertInfluences in influences for _, weight in vertInfluences], dtype=np.float32)
+    return mesh_data.reduceBoneWeights(vertices, bones, weights, len(influences), count)
+
+
+def test_strongest_influences_are_kept_and_normalized(mesh_data):
+    boneIndices, boneWeights = reduce(mesh_data, [
+        [(1, 0.1), (2, 0.4), (3, 0.2), (4, 0.3), (5, 0.05)],
+        [(2, 0.5), (1, 0.5)],
+        [(3, 2.0)],
+    ])
+    assert boneIndices.shape == (3, 4) and boneWeights.shape == (3, 4)
+    assert boneIndices[0].tolist() == [2, 4, 3, 1]
+    np.testing.assert_allclose(boneWeights[0], [0.4, 0.3, 0.2, 0.1], rtol=1e-6)
+    # ties keep both bones, unused slots point at bone 0 with no weight
+    assert sorted(boneIndices[1, :2].tolist()) == [1, 2]
+    np.testing.assert_allclose(boneWeights[1], [0.5, 0.5, 0.0, 0.0])
+    assert boneIndices[2].tolist() == [3, 0, 0, 0]
+    np.testing.assert_allclose(boneWeights[2], [1.0, 0.0, 0.0, 0.0])
+    np.testing.assert_allclose(boneWeights.sum(axis=1), 1.0, rtol=1e-6)
+
+def test_ignored_and_missing_influences_bind_to_the_renderer(mesh_data):
+    boneIndices, boneWeights = reduce(mesh_data, [
+        [],
+        [(-1, 0.7), (2, 0.0)],
+        [(-1, 0.9), (4, 0.3)],
+    ])
+    # bone 0 is the renderer's own slot, vertices nothing deforms stay where they are
+    assert boneIndices[:2].tolist() == [[0, 0, 0, 0], [0, 0, 0, 0]]
+    np.testing.assert_allclose(boneWeights[:2], [[1.0, 0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 0.0]])
+    # ignored groups don't take part in the normalization
+    assert boneIndices[2, 0] == 4
+    np.testing.assert_allclose(boneWeights[2], [1.0, 0.0, 0.0, 0.0])
+
+def test_influence_count(mesh_data):
+    rng = np.random.default_rng(1)
+    influences = [[(int(bone), float(weight)) for bone, weight in zip(rng.permutation(20)[:n] + 1, rng.random(n) + 0.01)]
+                  for n in rng.integers(0, 12, 500)]
+    for count in [1, 2, 4, 8]:
+        boneIndices, boneWeights = reduce(mesh_data, influences, count)
+        assert boneIndices.shape == (500, count)
+        np.testing.assert_allclose(boneWeights.sum(axis=1), 1.0, rtol=1e-5)
+        for v, vertInfluences in enumerate(influences):
+            # the kept weights are the strongest ones, in order
+            strongest = sorted((weight for _, weight in vertInfluences), reverse=True)[:count]
+            kept = boneWeights[v, :len(strongest)] * sum(strongest) if len(strongest) > 0 else []
+            np.testing.assert_allclose(kept, strongest, rtol=1e-5)
@@ -0,0 +1,43 @@
+# Benchmark imports
+from meshes import quadGrid, icosphere
+
+
+def triangleCorners(buffers) -> list[tuple]:
+    # the corner positions of every triangle, which don't depend on how the vertices were numbered
+    corners = [buffers.positions[indices.reshape(-1, 3)].round(5) for indices in buffers.submeshes]
+    return [tuple(tri.ravel().tolist()) for block in corners for tri in block]
+
+
+def test_chunk_budget_follows_the_byte_budget(mesh_data):
+    arrays = mesh_data.readMeshArrays(quadGrid(10, uvLayers=2, colorDomain='CORNER'))
+    vertexSize = mesh_data.vertexByteSize(arrays)
+    assert mesh_data.chunkVertexBudget(arrays, 1000000, 100 * vertexSize) == 100
+    assert mesh_data.chunkVertexBudget(arrays, 50, 100 * vertexSize) == 50
+    # never fewer vertices than one triangle needs
+    assert mesh_data.chunkVertexBudget(arrays, 1000000, 1) == 3
+
+def test_small_meshes_are_not_chunked(mesh_data):
+    arrays = mesh_data.readMeshArrays(quadGrid(10))
+    assert not mesh_data.needsChunking(arrays, 1000)
+    assert mesh_data.needsChunking(arrays, 50)
+
+def test_chunks_cover_the_mesh_within_the_budget(mesh_data):
+    for mesh in [quadGrid(80, materialCount=3, uvLayers=2, colorDomain='POINT'), icosphere(4, flat=True)]:
+        arrays = mesh_data.readMeshArrays(mesh)
+        whole = mesh_data.buildMeshBuffers(arrays)
+        budget = 1000
+        assert mesh_data.needsChunking(arrays, budget)
+
+        chunks = list(mesh_data.iterMeshChunks(arrays, budget))
+        assert len(chunks) > 1
+        assert all(chunk.vertexCount <= budget for chunk in chunks)
+
+        # every triangle ends up in exactly one chunk, with the same corners as in the whole mesh
+        chunkTriangles = [tri for chunk in chunks for tri in triangleCorners(chunk)]
+        assert len(chunkTriangles) == len(arrays.triLoops)
+        assert sorted(chunkTriangles) == sorted(triangleCorners(whole))
+
+        # the submeshes of a chunk keep the material indices of the whole mesh
+        for chunk in chunks:
+            assert set(chunk.submeshMaterials) <= set(whole.submeshMaterials)
+            assert len(chunk.submeshMaterials) == len(chunk.submeshes)
@@ -0,0 +1,76 @@
+# Other imports
+import asyncio
+import types
+
+
+class FakeClient():
+    """Answers every request after a delay that depends on the method"""
+
+    def __init__(self, delays : dict[str, float] = {}):
+        self.delays = delays
+        self.calls = []
+
+    async def call(self, method : str, *args, **kwargs):
+        self.calls.append((method, args, kwargs))
+        await asyncio.sleep(self.delays.get(method, 0))
+        if kwargs.get("fail", False):
+            raise ValueError(method)
+        return f"{method}{len(self.calls)}"
+
+    async def add_slot(self, **kwargs):
+        return await self.call("add_slot", **kwargs)
+
+    async def update_slot(self, slot, **kwargs):
+        return await self.call("update_slot", slot, **kwargs)
+
+    async def send_message(self, message):
+        return await self.call("send_message", message)
+
+    async def get_slot(self, slot):
+        return await self.call("get_slot", slot)
+
+
+class ImportMeshRawData():
+    """Messages are counted by the name of their type, this one stands in for the mesh import"""
+
+
+def test_updates_of_a_batch_are_merged(command_batcher):
+    client = FakeClient()
+    batcher = command_batcher.CommandBatcher(client)
+    slot = types.SimpleNamespace(id="slot")
+
+    async def send():
+        return await asyncio.gather(batcher.update_slot(slot, name="a"), batcher.update_slot(slot, position=1), batcher.add_slot(name="b"),
+                                    batcher.update_slot(slot, name="c", fail=False))
+    results = asyncio.run(send())
+    assert [method for method, _, _ in client.calls] == ["update_slot", "add_slot"]
+    assert client.calls[0][2] == {"name": "c", "position": 1, "fail": False}
+    assert results[0] == results[1] == results[3]
+    assert batcher.mergedCount == 2
+
+def test_failures_only_reach_their_caller(command_batcher):
+    batcher = command_batcher.CommandBatcher(FakeClient())
+
+    async def send():
+        return await asyncio.gather(batcher.add_slot(fail=True), batcher.add_slot(name="ok"), return_exceptions=True)
+    failed, ok = asyncio.run(send())
+    assert isinstance(failed, ValueError)
+    assert ok.startswith("add_slot")
+    assert len(batcher.failures) == 1
+
+def test_request_latency_is_reported(command_batcher):
+    client = FakeClient({"update_slot": 0.02, "send_message": 0.05})
+    batcher = command_batcher.CommandBatcher(client)
+    latencies = []
+    batcher.latencyListener = lambda method, seconds: latencies.append((method, seconds))
+    slot = types.SimpleNamespace(id="slot")
+
+    async def send():
+        await batcher.update_slot(slot, name="a")
+        await batcher.get_slot(slot)
+        await batcher.send_message(ImportMeshRawData())
+        await asyncio.gather(batcher.add_slot(fail=True), return_exceptions=True)
+    asyncio.run(send())
+    # imports take as long as their upload and failures aren't answers, neither is reported
+    assert [method for method, _ in latencies] == ["update_slot", "get_slot"]
+    assert latencies[0][1] >= 0.02
@@ -0,0 +1,60 @@
+# Other imports
+import types
+import asyncio
+import bpy
+
+
+class StoppingClient():
+
+    def __init__(self):
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+def test_failed_actions_keep_the_loop_running(addon):
+    controller = addon.ResoniteLinkController(bpy.types.Scene("ActionScene", []))
+    controller.client = StoppingClient()
+    ran = []
+
+    async def failing():
+        raise RuntimeError("dropped request")
+
+    async def working():
+        ran.append(controller.actionFailed)
+        controller.requestShutdown()
+
+    async def run():
+        loop = asyncio.create_task(controller.mainLoopAsync(controller.client))
+        while controller.actionQueue is None:
+            await asyncio.sleep(0)
+        assert controller.queueAction(failing)
+        assert controller.queueAction(working)
+        await asyncio.wait_for(loop, 5.0)
+
+    asyncio.run(run())
+    # the action after the failed one still ran, and saw the failure
+    assert ran == [True]
+    assert "dropped request" in controller.lastError
+    assert not controller.actionFailed
+    assert controller.pendingActions == 0
+    assert controller.client.stopped
+
+def test_empty_frame_range_bakes_nothing(addon):
+    controller = addon.ResoniteLinkController(bpy.types.Scene("BakeScene", []))
+    scene = types.SimpleNamespace(frame_start=10, frame_end=5, ResoniteLink_bake_step=1, objects=[],
+                                  render=types.SimpleNamespace(fps=24, fps_base=1.0))
+    bake = controller.bakeAnimation(scene)
+    assert bake.tracks == {}
+    assert bake.duration == 0.0
+
+def test_send_animation_cancels_on_an_empty_frame_range(addon):
+    scene = bpy.types.Scene("ReversedRangeScene", [])
+    scene.frame_start = 10
+    scene.frame_end = 5
+    operator = addon.SendAnimationOperator()
+    reports = []
+    operator.report = lambda kind, message: reports.append((kind, message))
+    assert operator.execute(types.SimpleNamespace(scene=scene)) == {'CANCELLED'}
+    assert reports[0][0] == {'ERROR'}
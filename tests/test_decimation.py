@@ -0,0 +1,61 @@
+# Other imports
+import numpy as np
+
+# Benchmark imports
+from meshes import quadGrid, icosphere
+
+
+def addLooseVertices(arrays, positions : np.ndarray):
+    arrays.positions = np.concatenate([arrays.positions, positions.astype(np.float32)])
+    if arrays.colors is not None and arrays.colorDomain == 'POINT':
+        arrays.colors = np.concatenate([arrays.colors, np.ones((len(positions), 4), dtype=np.float32)])
+    return arrays
+
+def checkDecimated(mesh_data, arrays, result, targetVertices : int):
+    assert len(result.positions) <= targetVertices
+    # every vertex is used, and all indices point into the arrays
+    assert len(np.unique(result.loopVerts)) == len(result.positions)
+    assert len(result.triLoops) == 0 or result.triLoops.max() < len(result.loopVerts)
+    assert np.isfinite(result.positions).all() and np.isfinite(result.normals).all()
+    for uv in result.uvs:
+        assert len(uv) == len(result.loopVerts)
+    buffers = mesh_data.buildMeshBuffers(result)
+    assert buffers.vertexCount <= targetVertices
+    assert sum(len(indices) for indices in buffers.submeshes) == 3 * len(result.triLoops)
+
+
+def test_decimation_reduces_vertices(mesh_data):
+    for mesh in [quadGrid(100, materialCount=3, uvLayers=2, colorDomain='CORNER'), icosphere(4)]:
+        arrays = mesh_data.readMeshArrays(mesh)
+        result = mesh_data.decimateMeshArrays(arrays, 500)
+        checkDecimated(mesh_data, arrays, result, 500)
+        assert len(result.triLoops) > 0
+
+def test_decimation_ignores_loose_vertices(mesh_data):
+    arrays = mesh_data.readMeshArrays(quadGrid(200, colorDomain='POINT'))
+    # far away from the grid, so they get clusters of their own
+    arrays = addLooseVertices(arrays, np.array([[5.0, 5.0, 5.0], [-3.0, 2.0, 1.0]]))
+    result = mesh_data.decimateMeshArrays(arrays, 1000)
+    checkDecimated(mesh_data, arrays, result, 1000)
+    assert result.positions.max() <= 1.0
+
+def test_loose_vertices_dont_count_towards_the_target(mesh_data):
+    arrays = mesh_data.readMeshArrays(quadGrid(10))
+    arrays = addLooseVertices(arrays, np.random.default_rng(0).random((5000, 3)))
+    # only the 100 vertices of the grid are used, nothing to simplify
+    assert mesh_data.decimateMeshArrays(arrays, 200) is arrays
+
+def test_decimation_of_degenerate_meshes(mesh_data):
+    # every vertex at the same spot, all triangles collapse
+    arrays = mesh_data.readMeshArrays(quadGrid(60))
+    arrays.positions[:] = 0.25
+    result = mesh_data.decimateMeshArrays(arrays, 100)
+    assert len(result.positions) == 1
+    assert len(result.triLoops) == 0
+    assert mesh_data.buildMeshBuffers(result).vertexCount == 0
+
+    # a flat line of vertices, extent along one axis only
+    arrays = mesh_data.readMeshArrays(quadGrid(60))
+    arrays.positions[:, 1:] = 0.0
+    result = mesh_data.decimateMeshArrays(arrays, 100)
+    checkDecimated(mesh_data, arrays, result, 100)
@@ -0,0 +1,216 @@
+# Other imports
+import json
+import types
+import asyncio
+import pytest
+import numpy as np
+
+# Benchmark imports
+from meshes import quadGrid
+
+# Test imports
+from conftest import importAddonModule, importLinkModule
+
+
+class ComponentClient():
+    """Hands out component ids and records every request"""
+
+    def __init__(self, interop : types.ModuleType):
+        self.interop = interop
+        self.requests : list[tuple] = []
+
+    async def add_component(self, slot, componentType : str, **members):
+        comp = self.interop.ComponentProxy(self, f"C{len(self.requests)}")
+        self.requests.append(("add", comp.id, members))
+        return comp
+
+    async def update_component(self, comp, **members):
+        self.requests.append(("update", comp.id, members))
+
+    async def remove_component(self, comp):
+        self.requests.append(("remove", comp.id, {}))
+
+
+@pytest.fixture(scope="module")
+def interop() -> types.ModuleType:
+    return importLinkModule("interop")
+
+def makeContext(interop : types.ModuleType, name : str) -> types.SimpleNamespace:
+    return types.SimpleNamespace(registry=interop.SlotRegistry(name), stats=importAddonModule("send_stats").SendStats(), slotsValidated=True)
+
+def makeMeshBuffers(mesh_data : types.ModuleType) -> 'mesh_data.MeshBuffers':
+    buffers = mesh_data.extractMeshBuffers(quadGrid(5, materialCount=3, uvLayers=2, colorDomain='CORNER', seed=1))
+    assert buffers.tangents is not None and buffers.colors is not None and len(buffers.submeshes) > 1
+    return buffers
+
+def makeMeshSlotData(interop : types.ModuleType) -> 'interop.MeshAssetSlotData':
+    meshSlotData = interop.MeshAssetSlotData(types.SimpleNamespace(id=None, key="Mesh", name="Mesh"))
+    meshSlotData._slot = interop.SlotProxy(None, "S0")
+    return meshSlotData
+
+
+def test_mesh_urls_go_through_the_shadow_state(interop):
+    context = makeContext(interop, "MeshUrlScene")
+    client = ComponentClient(interop)
+    meshSlotData = makeMeshSlotData(interop)
+
+    asyncio.run(meshSlotData.setMeshUrlsAsync(client, context, ["a", "b"]))
+    assert [request[0] for request in client.requests] == ["add", "add"]
+    chunkId = meshSlotData.chunkComps[0].id
+    assert context.registry.shadow.sent[chunkId] == {'URL': "b"}
+
+    # the same urls again aren't sent, only the chunk that changed is
+    client.requests.clear()
+    asyncio.run(meshSlotData.setMeshUrlsAsync(client, context, ["a", "b"]))
+    assert client.requests == []
+    asyncio.run(meshSlotData.setMeshUrlsAsync(client, context, ["a", "c"]))
+    assert [(kind, compId) for kind, compId, _ in client.requests] == [("update", chunkId)]
+
+    # a chunk that's dropped is forgotten with its component
+    client.requests.clear()
+    asyncio.run(meshSlotData.setMeshUrlsAsync(client, context, ["a"]))
+    assert client.requests == [("remove", chunkId, {})]
+    assert chunkId not in context.registry.shadow.sent
+    assert meshSlotData.chunkComps == []
+
+def test_released_preview_is_forgotten(interop):
+    context = makeContext(interop, "PreviewScene")
+    client = ComponentClient(interop)
+    meshSlotData = makeMeshSlotData(interop)
+
+    async def run():
+        meshSlotData.proxyComp = await interop.ID_SlotData.AddComponentAsync(
+            client, context.registry, meshSlotData.slot, "[FrooxEngine]FrooxEngine.StaticMesh", {'URL': "preview"}
+        )
+        proxyId = meshSlotData.proxyComp.id
+        assert context.registry.shadow.sent[proxyId] == {'URL': "preview"}
+        await meshSlotData.releaseProxyAsync(client, context)
+        return proxyId
+
+    proxyId = asyncio.run(run())
+    assert client.requests[-1] == ("remove", proxyId, {})
+    assert proxyId not in context.registry.shadow.sent
+    assert meshSlotData.proxyComp is None
+
+def test_mesh_message_matches_the_model_objects(interop):
+    mesh_data = importAddonModule("mesh_data")
+    buffers = makeMeshBuffers(mesh_data)
+    message = interop.MeshAssetSlotData.meshPayloadToMessage(mesh_data.encodeMeshPayload(buffers))
+
+    # the same mesh through the setters of the library, one model object per element
+    rows = lambda arr, cls: [cls(*row) for row in arr.tolist()]
+    expected = interop.ImportMeshRawData(
+        uv_channel_dimensions=[2] * len(buffers.uvs),
+        submeshes=[interop.TriangleSubmeshRawData(triangle_count=len(indices) // 3, init_indices=indices.tolist()) for indices in buffers.submeshes],
+        init_positions=rows(buffers.positions, interop.Float3),
+        init_normals=rows(buffers.normals, interop.Float3),
+        init_tangents=rows(buffers.tangents, interop.Float4),
+        init_colors=rows(buffers.colors, interop.Color),
+        init_uvs=[uv.ravel().tolist() for uv in buffers.uvs]
+    )
+    assert bytes(message.raw_binary_payload) == bytes(expected.raw_binary_payload)
+
+    encoder = pytest.importorskip("resonitelink").ResoniteLinkJSONEncoder
+    encoded = json.loads(json.dumps(message, cls=encoder))
+    assert encoded == json.loads(json.dumps(expected, cls=encoder))
+    assert encoded['vertexCount'] == buffers.vertexCount
+    assert encoded['hasTangents'] and encoded['hasColors']
+
+def test_mesh_import_sends_the_message(interop):
+    mesh_data = importAddonModule("mesh_data")
+    buffers = makeMeshBuffers(mesh_data)
+    context = makeContext(interop, "ImportScene")
+    messages = []
+
+    class ImportClient():
+        async def send_message(self, message):
+            messages.append(message)
+            return interop.AssetData(asset_url="resdb:///mesh")
+
+    url = asyncio.run(makeMeshSlotData(interop).importMeshAsync(ImportClient(), context, lambda: buffers))
+    assert url == "resdb:///mesh"
+    assert isinstance(messages[0], interop.ImportMeshRawData)
+    assert messages[0].vertex_count == buffers.vertexCount
+
+def test_skinned_mesh_message_matches_the_model_objects(interop):
+    resonitelink = pytest.importorskip("resonitelink")
+    mesh_data = importAddonModule("mesh_data")
+    buffers = makeMeshBuffers(mesh_data)
+
+    # vertex groups with 1 to 6 influences, group 2 doesn't deform
+    influences = [[(group, 1.0 / (group + 1)) for group in range(v % 6 + 1)] for v in range(buffers.vertexCount)]
+    mesh = types.SimpleNamespace(vertices=[
+        types.SimpleNamespace(groups=[types.SimpleNamespace(group=group, weight=weight) for group, weight in vertInfluences])
+        for vertInfluences in influences
+    ])
+    groupBones = np.array([1, 2, -1, 3, 4, 5], dtype=np.int32)
+    buffers.boneIndices, buffers.boneWeights = mesh_data.readBoneWeights(mesh, groupBones)
+    buffers.boneNames = ["Root"] + [f"Bone{i}" for i in range(1, 6)]
+    buffers.bindPoses = np.tile(np.identity(4, dtype=np.float32), (6, 1, 1))
+    buffers.bindPoses[1, 0, 3] = 2.0
+    message = interop.MeshAssetSlotData.meshPayloadToMessage(mesh_data.encodeMeshPayload(buffers))
+
+    # the setter of the library only takes a single weight per vertex, the getter reads all of them back
+    expected = [resonitelink.BoneWeightRawData(bone_index=index, weight=weight)
+                for index, weight in zip(buffers.boneIndices.ravel().tolist(), buffers.boneWeights.ravel().tolist())]
+    assert message.bone_weight_count == 4
+    assert message.bone_weights == expected
+
+    encoder = resonitelink.ResoniteLinkJSONEncoder
+    encoded = json.loads(json.dumps(message, cls=encoder))
+    assert encoded['boneWeightCount'] == 4
+    assert [bone['name'] for bone in encoded['bones']] == buffers.boneNames
+    assert encoded['bones'][1]['bindPose'] == json.loads(json.dumps(interop.Float4x4(*buffers.bindPoses[1].ravel().tolist()), cls=encoder))
+    assert encoded['bones'][1]['bindPose']['m03'] == 2.0
+
+def test_identical_meshes_sent_together_share_the_import(interop):
+    mesh_data = importAddonModule("mesh_data")
+    arrays = mesh_data.readMeshArrays(quadGrid(6, seed=7))
+    context = makeContext(interop, "SharedImportScene")
+    context.chunkVertexBudget = 1 << 20
+    context.chunkByteBudget = 1 << 30
+    messages = []
+
+    class ImportClient(ComponentClient):
+        async def send_message(self, message):
+            messages.append(message)
+            await asyncio.sleep(0.01)
+            return interop.AssetData(asset_url=f"resdb:///mesh{len(messages)}")
+
+    async def arraysAsync():
+        return arrays
+
+    client = ImportClient(interop)
+    meshSlotDatas = []
+    for name in ["A", "B"]:
+        meshSlotData = interop.MeshAssetSlotData(types.SimpleNamespace(id=None, key=name, name=name, arraysAsync=arraysAsync))
+        meshSlotData._slot = interop.SlotProxy(None, f"S{name}")
+        meshSlotDatas.append(meshSlotData)
+
+    async def send():
+        await asyncio.gather(*(meshSlotData.sendMeshAsync(client, context) for meshSlotData in meshSlotDatas))
+    asyncio.run(send())
+
+    assert len(messages) == 1
+    assert [context.registry.shadow.sent[meshSlotData.meshComp.id] for meshSlotData in meshSlotDatas] == [{'URL': "resdb:///mesh1"}] * 2
+    assert interop.MeshAssetSlotData.uploads == {}
+
+def test_default_material_goes_through_the_shadow_state(interop):
+    context = makeContext(interop, "DefaultMaterialScene")
+    context.key = "DefaultMaterialScene"
+    sceneSlotData = interop.SceneSlotData(types.SimpleNamespace(id=None, key=context.key, name=context.key))
+    sceneSlotData._slot = interop.SlotProxy(None, "Root")
+    context.registry.add(context.key, sceneSlotData)
+
+    class SlotClient(ComponentClient):
+        async def add_slot(self, **members):
+            slot = self.interop.SlotProxy(self, f"S{len(self.requests)}")
+            self.requests.append(("addSlot", slot.id, members))
+            return slot
+
+    client = SlotClient(interop)
+    asyncio.run(interop.MaterialAssetSlotData.AddDefaultMaterialAsync(client, context))
+    assert [request[0] for request in client.requests] == ["addSlot", "addSlot", "add"]
+    registry = context.registry
+    assert registry.shadow.sent[registry.defaultMaterialSlot.id] == {'name': "Default Material (Debug)", 'parent': registry.assetsSlotRoot.id}
+    assert registry.shadow.sent[registry.defaultMaterial.id] == {}
@@ -0,0 +1,22 @@
+# Other imports
+import numpy as np
+import pytest
+
+# Benchmark imports
+from meshes import benchmarkMeshes, legacyMeshes, quadGrid, icosphere
+from legacy_extraction import collectMeshDataLegacy, meshBuffersToLegacyData
+
+referenceMeshes = {
+    **{f"legacy_{name}": mesh for name, mesh in legacyMeshes().items()},
+    **{name: mesh for name, mesh in benchmarkMeshes(0.01).items()},
+    "multi_uv": quadGrid(12, materialCount=3, uvLayers=2, colorDomain='CORNER', seed=3),
+}
+
+
+@pytest.mark.parametrize("name", list(referenceMeshes))
+def test_extraction_matches_legacy(mesh_data, name):
+    mesh = referenceMeshes[name]
+    expected = collectMeshDataLegacy(mesh)
+    actual = meshBuffersToLegacyData(mesh_data.extractMeshBuffers(mesh))
+    for key in expected:
+        assert actual[key] == expected[key], key
@@ -0,0 +1,67 @@
+# Other imports
+import types
+import pytest
+import bpy
+
+# Benchmark imports
+from meshes import quadGrid
+
+# Test imports
+from conftest import importLinkModule
+
+
+class ModifiedObject(bpy.types.Object):
+    """An object whose modifiers give it a mesh of its own, evaluated from its original mesh data"""
+
+    def __init__(self, name : str, data : bpy.types.Mesh, evaluated : bpy.types.Mesh):
+        super().__init__(name, data)
+        evaluated.original = data
+        self.evaluated = types.SimpleNamespace(data=evaluated, original=self)
+
+    def evaluated_get(self, depsgraph : bpy.types.Depsgraph) -> types.SimpleNamespace:
+        return self.evaluated
+
+
+@pytest.fixture(scope="module")
+def scene_snapshot() -> types.ModuleType:
+    return importLinkModule("scene_snapshot")
+
+def captureMeshes(scene_snapshot : types.ModuleType, objects : list[bpy.types.Object]) -> dict[str, 'scene_snapshot.MeshSnapshot']:
+    capture = scene_snapshot.SnapshotCapture(bpy.types.Scene("MeshKeyScene", objects))
+    snapshot = capture.captureStructure()
+    return {objSnapshot.name: objSnapshot.mesh for objSnapshot in snapshot.objects}
+
+
+def test_linked_duplicates_share_their_mesh(scene_snapshot):
+    mesh = quadGrid(4)
+    meshes = captureMeshes(scene_snapshot, [bpy.types.Object("A", mesh), bpy.types.Object("B", mesh)])
+    assert meshes["A"] is meshes["B"]
+    assert meshes["A"].key == scene_snapshot.SlotRegistry.idKey(mesh)
+
+def test_modified_duplicates_get_a_mesh_each(scene_snapshot):
+    mesh = quadGrid(4)
+    plain = bpy.types.Object("Plain", mesh)
+    modified = [ModifiedObject(name, mesh, quadGrid(3, seed=i)) for i, name in enumerate(["ModifiedA", "ModifiedB"])]
+    meshes = captureMeshes(scene_snapshot, [plain] + modified)
+
+    keys = {name: meshSnapshot.key for name, meshSnapshot in meshes.items()}
+    assert len(set(keys.values())) == 3
+    assert keys["Plain"] == scene_snapshot.SlotRegistry.idKey(mesh)
+    for obj in modified:
+        assert keys[obj.name] == (scene_snapshot.SlotRegistry.idKey(obj), "MESH")
+        assert meshes[obj.name].mappingKey == f"OBJECT:{obj.name}:MESH"
+        assert meshes[obj.name].sourceObject is obj
+
+def test_generated_meshes_belong_to_their_object(scene_snapshot):
+    capture = scene_snapshot.SnapshotCapture(bpy.types.Scene("GeneratedScene", []))
+    snapshot = capture.captureStructure()
+    obj = bpy.types.Object("Generator", quadGrid(2))
+    objSnapshot = scene_snapshot.ObjectSnapshot(obj, snapshot.scene, None)
+
+    # every evaluation makes a new mesh, the key stays the same
+    keys = set()
+    for seed in range(2):
+        capture.captureMesh(snapshot, objSnapshot, quadGrid(3, seed=seed), None, bpy.context.evaluated_depsgraph_get())
+        keys.add(objSnapshot.mesh.key)
+        assert objSnapshot.mesh.ready.done()
+    assert keys == {(objSnapshot.key, "MESH")}
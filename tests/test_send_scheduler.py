@@ -0,0 +1,84 @@
+# Other imports
+import asyncio
+
+
+def runJobs(scheduler, jobs : dict, deps : dict = {}, fail : set = set(), delays : dict = {}) -> tuple[list, dict]:
+    # every job appends its key when it starts and when it ends
+    events = []
+    def job(key):
+        async def run():
+            events.append(("start", key))
+            await asyncio.sleep(delays.get(key, 0))
+            events.append(("end", key))
+            if key in fail:
+                raise ValueError(key)
+        return run
+    for key, priority in jobs.items():
+        scheduler.add(key, job(key), deps.get(key, []), priority)
+    # a job that never finishes would keep the send waiting forever
+    failures = asyncio.run(asyncio.wait_for(scheduler.runAsync(), 10))
+    return events, failures
+
+
+def test_dependencies_finish_first(send_scheduler):
+    scheduler = send_scheduler.SendScheduler(maxInFlight=8)
+    scheduler.limit = 8
+    events, failures = runJobs(scheduler, {"parent": 0, "child": 0, "grandchild": 0, "other": 0},
+                               {"child": ["parent"], "grandchild": ["child", "missing"]}, delays={"parent": 0.01})
+    assert failures == {}
+    assert events.index(("end", "parent")) < events.index(("start", "child"))
+    assert events.index(("end", "child")) < events.index(("start", "grandchild"))
+    # independent jobs don't wait
+    assert events.index(("start", "other")) < events.index(("end", "parent"))
+
+def test_failures_skip_dependents(send_scheduler):
+    scheduler = send_scheduler.SendScheduler()
+    events, failures = runJobs(scheduler, {"a": 0, "b": 0, "c": 0, "d": 0}, {"b": ["a"], "c": ["b"]}, fail={"a"})
+    assert set(failures) == {"a", "b", "c"}
+    assert isinstance(failures["a"], ValueError)
+    assert ("start", "b") not in events and ("start", "c") not in events
+    assert ("end", "d") in events
+
+def test_failures_skip_long_chains(send_scheduler):
+    # deeper than the recursion limit, like a hierarchy of parented objects
+    count = 5000
+    scheduler = send_scheduler.SendScheduler()
+    events, failures = runJobs(scheduler, {i: 0 for i in range(count)}, {i: [i - 1] for i in range(1, count)}, fail={0})
+    assert len(failures) == count
+    assert events == [("start", 0), ("end", 0)]
+
+def test_cycles_are_reported(send_scheduler):
+    scheduler = send_scheduler.SendScheduler()
+    events, failures = runJobs(scheduler, {"a": 0, "b": 0, "c": 0}, {"a": ["b"], "b": ["a"]})
+    assert set(failures) == {"a", "b"}
+    assert events == [("start", "c"), ("end", "c")]
+
+def test_priority_orders_ready_jobs(send_scheduler):
+    scheduler = send_scheduler.SendScheduler(maxInFlight=1)
+    events, _ = runJobs(scheduler, {"late": 1, "first": 0, "second": 0})
+    assert [key for kind, key in events if kind == "start"] == ["first", "second", "late"]
+
+def test_limit_follows_request_latency(send_scheduler):
+    scheduler = send_scheduler.SendScheduler(maxInFlight=4, slowdownFactor=3.0, minSlowLatency=0.05)
+    assert scheduler.limit == 1
+    for _ in range(10):
+        scheduler.recordLatency("update_slot", 0.02)
+    assert scheduler.limit == 4
+    # slower, but below the floor that counts as slow at all
+    scheduler.recordLatency("update_slot", 0.04)
+    assert scheduler.limit == 4
+    scheduler.recordLatency("update_slot", 0.2)
+    assert scheduler.limit == 2
+    # every request type has a baseline of its own
+    scheduler.recordLatency("add_component", 0.2)
+    assert scheduler.limit == 3
+    for _ in range(5):
+        scheduler.recordLatency("update_slot", 1.0)
+    assert scheduler.limit == 1
+
+def test_long_jobs_keep_the_limit(send_scheduler):
+    # only requests are measured, a job that takes long on its own doesn't lower the limit
+    scheduler = send_scheduler.SendScheduler(maxInFlight=4)
+    scheduler.limit = 4
+    runJobs(scheduler, {"quick": 0, "mesh": 0}, delays={"mesh": 0.1})
+    assert scheduler.limit == 4
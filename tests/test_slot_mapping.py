@@ -0,0 +1,91 @@
+# Other imports
+import json
+import asyncio
+import bpy
+
+
+class ExistingClient():
+    """Answers for the slots and components in existing, fails for every other id"""
+
+    def __init__(self, existing : set[str]):
+        self.existing = existing
+
+    async def get_slot(self, slot):
+        if slot.id not in self.existing:
+            raise RuntimeError(f"no slot {slot.id}")
+
+    async def get_component(self, comp):
+        if comp.id not in self.existing:
+            raise RuntimeError(f"no component {comp.id}")
+
+
+entries = {
+    "OBJECT:Cube": {'slot': "S1", 'components': {'meshRenderer': "C1", 'lodGroup': "C2"}, 'componentLists': {'chunkRenderers': ["C3", "C4"]}},
+    "MESH:Cube": {'slot': "S2", 'components': {'meshComp': "C5"}},
+    "OBJECT:Armature": {'slot': "S3", 'slotLists': {'boneSlots': ["S4", "S5"]}},
+    "OBJECT:Gone": {'slot': "S6", 'components': {'meshRenderer': "C6"}},
+}
+assets = {"0123/abc": "resdb:///mesh"}
+
+def loadedMapping(slot_mapping) -> 'slot_mapping.SlotMapping':
+    mapping = slot_mapping.SlotMapping()
+    mapping.load(json.dumps({"version": slot_mapping.SlotMapping.version, "slots": entries, "assets": assets}))
+    return mapping
+
+
+def test_mapping_round_trips_through_the_scene(slot_mapping):
+    scene = bpy.types.Scene("MappingScene", [])
+    mapping = slot_mapping.SlotMapping()
+    mapping.save(scene, json.loads(json.dumps(entries)), dict(assets))
+    # the scene property is written on the main thread
+    assert slot_mapping.SlotMapping.propName not in scene.properties
+    bpy.app.timers.pump()
+
+    loaded = slot_mapping.SlotMapping()
+    loaded.load(scene[slot_mapping.SlotMapping.propName])
+    assert loaded.entries == entries
+    assert loaded.assets == assets
+    assert not loaded.validated
+    assert loaded.take("MESH:Cube") == entries["MESH:Cube"]
+    assert loaded.take("MESH:Cube") is None
+    assert set(loaded.takeAll()) == {"OBJECT:Cube", "OBJECT:Armature", "OBJECT:Gone"}
+    assert loaded.entries == {}
+
+def test_unreadable_mappings_are_ignored(slot_mapping):
+    mapping = slot_mapping.SlotMapping()
+    mapping.load("{not json")
+    assert mapping.entries == {} and mapping.assets == {}
+    mapping.load(json.dumps({"version": slot_mapping.SlotMapping.version + 1, "slots": entries, "assets": assets}))
+    assert mapping.entries == {} and mapping.assets == {}
+
+def test_mapping_keys(slot_mapping):
+    mesh = bpy.types.ID("Cube.001", "MESH")
+    evaluated = bpy.types.ID("Cube.001", "MESH")
+    evaluated.original = mesh
+    assert slot_mapping.SlotMapping.idKey(mesh) == "MESH:Cube.001"
+    assert slot_mapping.SlotMapping.idKey(evaluated) == "MESH:Cube.001"
+
+def test_validation_drops_what_is_gone(slot_mapping):
+    mapping = loadedMapping(slot_mapping)
+    # C4 of the chunk renderers and S5 of the bones are gone, and all of the last object
+    client = ExistingClient({"S1", "S2", "S3", "S4", "C1", "C2", "C3", "C5"})
+    asyncio.run(mapping.validateAsync(client))
+
+    assert mapping.validated
+    assert set(mapping.entries) == {"OBJECT:Cube", "MESH:Cube", "OBJECT:Armature"}
+    assert mapping.entries["OBJECT:Cube"]['components'] == {'meshRenderer': "C1", 'lodGroup': "C2"}
+    # lists are only adopted whole
+    assert mapping.entries["OBJECT:Cube"]['componentLists'] == {}
+    assert mapping.entries["OBJECT:Armature"]['slotLists'] == {}
+
+def test_filtering_with_known_ids(slot_mapping):
+    mapping = loadedMapping(slot_mapping)
+    mapping.filterExisting({"S1", "S2", "S3", "S4", "S5"})
+    # without component ids every component is assumed to exist
+    assert set(mapping.entries) == {"OBJECT:Cube", "MESH:Cube", "OBJECT:Armature"}
+
+    mapping = loadedMapping(slot_mapping)
+    mapping.filterExisting({"S1", "S2", "S3", "S4"}, {"C1", "C2", "C3", "C5"})
+    # incomplete slots aren't adopted at all
+    assert set(mapping.entries) == {"MESH:Cube"}
+    assert mapping.validated
@@ -0,0 +1,74 @@
+# Other imports
+import types
+
+
+def test_shadow_state_sends_what_changed(slot_registry):
+    shadow = slot_registry.ShadowState()
+    state = {'name': "Cube", 'tag': "OBJECT", 'position': (1.0, 2.0, 3.0)}
+    # nothing was sent yet
+    assert shadow.changed("S1", state) == state
+
+    shadow.record("S1", state)
+    assert shadow.changed("S1", state) == {}
+    assert shadow.changed("S1", {**state, 'name': "Sphere"}) == {'name': "Sphere"}
+    # members that were never sent are always sent
+    assert shadow.changed("S1", {'active': True}) == {'active': True}
+    assert shadow.changed("S2", state) == state
+
+    shadow.forget("S1")
+    assert shadow.changed("S1", state) == state
+
+def test_shadow_state_tolerances(slot_registry):
+    shadow = slot_registry.ShadowState()
+    tolerance = slot_registry.ShadowState.tolerances['position']
+    shadow.record("S1", {'position': (0.0, 0.0, 0.0), 'rotation': (0.0, 0.0, 0.0, 1.0), 'weight': 1.0})
+
+    assert shadow.changed("S1", {'position': (tolerance * 0.5, 0.0, -tolerance * 0.5)}) == {}
+    assert shadow.changed("S1", {'position': (0.0, tolerance * 2, 0.0)}) == {'position': (0.0, tolerance * 2, 0.0)}
+    # members without a tolerance have to match exactly
+    assert shadow.changed("S1", {'weight': 1.0 + 1e-9}) == {'weight': 1.0 + 1e-9}
+    # a different length is a change, whatever the tolerance
+    assert shadow.changed("S1", {'rotation': (0.0, 0.0, 1.0)}) == {'rotation': (0.0, 0.0, 1.0)}
+
+def test_small_steps_add_up(slot_registry):
+    shadow = slot_registry.ShadowState()
+    step = slot_registry.ShadowState.tolerances['position'] * 0.4
+    shadow.record("S1", {'position': (0.0, 0.0, 0.0)})
+    # steps below the tolerance are measured against what was sent, not against the previous step
+    sent = []
+    for i in range(1, 6):
+        changed = shadow.changed("S1", {'position': (step * i, 0.0, 0.0)})
+        if len(changed) > 0:
+            shadow.record("S1", changed)
+            sent.append(i)
+    assert sent == [3]
+
+def test_proxies_are_recorded_by_id(slot_registry):
+    shadow = slot_registry.ShadowState()
+    parent = slot_registry.SlotProxy(None, "P1")
+    shadow.record("S1", {'parent': parent, 'targets': [parent, None]})
+    assert shadow.sent["S1"] == {'parent': "P1", 'targets': ("P1", None)}
+    assert shadow.changed("S1", {'parent': slot_registry.SlotProxy(None, "P1"), 'targets': [parent, None]}) == {}
+    assert shadow.changed("S1", {'parent': slot_registry.SlotProxy(None, "P2")}) != {}
+
+def test_registry_keys(slot_registry):
+    mesh = types.SimpleNamespace(id_type="MESH", session_uid=7, original=None)
+    evaluated = types.SimpleNamespace(id_type="MESH", session_uid=7, original=mesh)
+    assert slot_registry.SlotRegistry.idKey(mesh) == ("MESH", 7)
+    assert slot_registry.SlotRegistry.idKey(evaluated) == ("MESH", 7)
+    # keys that were built already are returned as they are
+    assert slot_registry.SlotRegistry.idKey(("INSTANCE", ("OBJECT", 1), (0,))) == ("INSTANCE", ("OBJECT", 1), (0,))
+    assert slot_registry.SlotRegistry.ForScene(("SCENE", 99)) is slot_registry.SlotRegistry.ForScene(("SCENE", 99))
+
+def test_registries_of_deleted_scenes_are_dropped(slot_registry):
+    SlotRegistry = slot_registry.SlotRegistry
+    others = list(SlotRegistry.registries)
+    kept = SlotRegistry.ForScene(("SCENE", 100))
+    deleted = SlotRegistry.ForScene(("SCENE", 101))
+    deleted.add(("OBJECT", 1), types.SimpleNamespace(slot=None, registry=None))
+
+    SlotRegistry.DropDeleted(others + [("SCENE", 100)])
+    assert SlotRegistry.ForScene(("SCENE", 100)) is kept
+    assert ("SCENE", 101) not in SlotRegistry.registries
+    assert deleted.entries == {}
+    assert all(key in SlotRegistry.registries for key in others)
@@ -0,0 +1,269 @@
+# Blender Imports
+import bpy
+
+# Other imports
+import os
+import uuid
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+import concurrent.futures
+import numpy as np
+
+# Texture extraction.
+# Pixels are read in bulk on the main thread, hashing, downscaling and encoding run on a pool of worker threads.
+# NumPy and hashlib release the GIL on large arrays, so several images are processed at the same time.
+
+class ImageArrays():
+    """Pixels read from a Blender image"""
+
+    def __init__(self):
+        self.pixels : np.ndarray = None # float32 (height, width, 4), rows from bottom to top like Blender stores them
+        self.isData = False # non-color data like normal maps, sent without converting colors
+
+    @property
+    def width(self) -> int:
+        return self.pixels.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.pixels.shape[0]
+
+
+class TexturePayload():
+    """A texture downscaled and quantized to 8 bits per channel, RGBA rows in the order Blender stores them"""
+
+    def __init__(self, width : int, height : int, isData : bool, data : bytes):
+        self.width = width
+        self.height = height
+        self.isData = isData
+        self.data = data
+
+    @property
+    def colorProfile(self) -> str:
+        return "Linear" if self.isData else "sRGB"
+
+    @property
+    def byteSize(self) -> int:
+        return len(self.data)
+
+
+def readImageArrays(image : bpy.types.Image) -> ImageArrays:
+    """
+    Bulk-read the pixels of an image, only call this on the main thread.
+
+    Parameters
+    ----------
+    image : bpy.types.Image
+        The image to read, it's loaded if it isn't already
+
+    Returns
+    -------
+    arrays : ImageArrays
+        The pixels expanded to RGBA, or None if the image has no pixels (e.g. its file is missing)
+    """
+
+    width, height = image.size
+    channels = image.channels
+    if width == 0 or height == 0 or channels == 0:
+        return None
+    flat = np.empty(width * height * channels, dtype=np.float32)
+    image.pixels.foreach_get(flat)
+    pixels = flat.reshape(height, width, channels)
+
+    if channels == 1:
+        pixels = np.concatenate([np.repeat(pixels, 3, axis=2), np.ones((height, width, 1), dtype=np.float32)], axis=2)
+    elif channels == 2:
+        pixels = np.concatenate([np.repeat(pixels[:, :, :1], 3, axis=2), pixels[:, :, 1:]], axis=2)
+    elif channels == 3:
+        pixels = np.concatenate([pixels, np.ones((height, width, 1), dtype=np.float32)], axis=2)
+    elif channels > 4:
+        pixels = pixels[:, :, :4]
+
+    arrays = ImageArrays()
+    arrays.pixels = pixels
+    arrays.isData = image.colorspace_settings.is_data
+    return arrays
+
+def textureFingerprint(arrays : ImageArrays) -> str:
+    """
+    Hash the pixels of an image, so that images that were already encoded or imported can be recognized.
+    Only looks at the arrays, so it can run away from the main thread.
+
+    Parameters
+    ----------
+    arrays : ImageArrays
+        The pixels of the image
+
+    Returns
+    -------
+    fingerprint : str
+        A hex digest that only changes when the exported texture would change
+    """
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((arrays.pixels.shape, arrays.isData)).encode())
+    h.update(np.ascontiguousarray(arrays.pixels).data)
+    return h.hexdigest()
+
+def downscalePixels(pixels : np.ndarray, maxSize : int) -> np.ndarray:
+    """
+    Shrink an image by a whole factor until neither side is larger than maxSize.
+
+    Each output pixel is the average of a factor x factor block, the last row and column are repeated
+    to fill the blocks on the edges. Colors are averaged as they are stored, not in linear space.
+
+    Parameters
+    ----------
+    pixels : numpy.ndarray
+        float32 (height, width, 4)
+    maxSize : int
+        The largest width or height the result may have
+
+    Returns
+    -------
+    pixels : numpy.ndarray
+        float32 (height / factor, width / factor, 4), or the input if it's small enough already
+    """
+
+    height, width = pixels.shape[:2]
+    factor = -(-max(width, height) // maxSize)
+    if factor <= 1:
+        return pixels
+    padHeight = -height % factor
+    padWidth = -width % factor
+    if padHeight > 0 or padWidth > 0:
+        pixels = np.pad(pixels, ((0, padHeight), (0, padWidth), (0, 0)), mode='edge')
+    outHeight = pixels.shape[0] // factor
+    outWidth = pixels.shape[1] // factor
+    return pixels.reshape(outHeight, factor, outWidth, factor, 4).mean(axis=(1, 3), dtype=np.float32)
+
+def encodeTexture(arrays : ImageArrays, maxSize : int) -> TexturePayload:
+    """
+    Downscale an image and quantize it to 8 bits per channel.
+
+    Parameters
+    ----------
+    arrays : ImageArrays
+        The pixels of the image
+    maxSize : int
+        The largest width or height the texture may have
+
+    Returns
+    -------
+    payload : TexturePayload
+        The encoded texture
+    """
+
+    pixels = downscalePixels(arrays.pixels, maxSize)
+    quantized = np.clip(pixels * 255.0 + 0.5, 0.0, 255.0).astype(np.uint8)
+    return TexturePayload(pixels.shape[1], pixels.shape[0], arrays.isData, quantized.tobytes())
+
+
+class TextureDiskCache():
+    """
+    Encoded textures stored on disk by fingerprint, so that they aren't downscaled and encoded again in later sessions.
+
+    Every texture is one file with a small header. Files are written to a temporary name and renamed,
+    so a file that exists is always complete. Reading a file refreshes its modification time, once the cache
+    grows past maxBytes the least recently used files are deleted.
+    """
+
+    header = struct.Struct("<4sIIB") # magic, width, height, is data
+    magic = b"RLTX"
+    extension = ".rltex"
+
+    def __init__(self, directory : str, maxBytes : int = 1024 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger("ResoniteLink")
+
+    def path(self, fingerprint : str) -> str:
+        return os.path.join(self.directory, fingerprint.replace("/", "_") + TextureDiskCache.extension)
+
+    def get(self, fingerprint : str) -> TexturePayload:
+        path = self.path(fingerprint)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        if len(data) < TextureDiskCache.header.size:
+            return None
+        magic, width, height, isData = TextureDiskCache.header.unpack_from(data)
+        if magic != TextureDiskCache.magic or len(data) != TextureDiskCache.header.size + width * height * 4:
+            return None
+        return TexturePayload(width, height, bool(isData), data[TextureDiskCache.header.size:])
+
+    def put(self, fingerprint : str, payload : TexturePayload):
+        path = self.path(fingerprint)
+        tempPath = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tempPath, "wb") as f:
+                f.write(TextureDiskCache.header.pack(TextureDiskCache.magic, payload.width, payload.height, int(payload.isData)))
+                f.write(payload.data)
+            os.replace(tempPath, path)
+        except OSError as e:
+            self.logger.log(logging.WARNING, f"Could not write to the texture cache: {e}")
+            try:
+                os.remove(tempPath)
+            except OSError:
+                pass
+            return
+        self.trim()
+
+    def trim(self):
+        # only one thread scans the folder at a time, the others skip it
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(TextureDiskCache.extension):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.maxBytes:
+                    break
+                os.remove(path)
+                total -= size
+        except OSError as e:
+            self.logger.log(logging.WARNING, f"Could not trim the texture cache: {e}")
+        finally:
+            self.lock.release()
+
+
+def defaultTextureCacheDir() -> str:
+    # extensions get a folder of their own that survives updates, older installs fall back to the temp folder
+    try:
+        return bpy.utils.extension_path_user(__package__, path="textures", create=True)
+    except Exception:
+        return os.path.join(tempfile.gettempdir(), "ResoniteLink", "textures")
+
+
+# Hashing and encoding run here, not in the event loop's default executor, so large images don't hold up meshes
+texturePool : concurrent.futures.ThreadPoolExecutor = None
+texturePoolLock = threading.Lock()
+
+def getTexturePool() -> concurrent.futures.ThreadPoolExecutor:
+    global texturePool
+    texturePoolLock.acquire()
+    if texturePool is None:
+        texturePool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(4, (os.cpu_count() or 2) - 1)), thread_name_prefix="ResoniteLinkTexture")
+    pool = texturePool
+    texturePoolLock.release()
+    return pool
+
+def shutdownTexturePool():
+    global texturePool
+    texturePoolLock.acquire()
+    if texturePool is not None:
+        texturePool.shutdown(wait=False, cancel_futures=True)
+        texturePool = None
+    texturePoolLock.release()